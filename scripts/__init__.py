@@ -0,0 +1,78 @@
+"""Sentiment processing for the tracker dashboard
+
+Public names resolve lazily on first access (PEP 562), so importing the
+package or a lightweight name such as get_state_name does not load NumPy,
+matplotlib or TextBlob.
+
+Modules import each other relative to the package, so a script runs from
+the repository root as python -m scripts.<module>.
+"""
+import importlib
+
+_EXPORTS = {
+    # Lookups and keyword tables (no third-party imports)
+    "get_state_name": "lexicon",
+    "get_pakistan_region_code": "lexicon",
+    "STATE_NAMES": "lexicon",
+    "PAKISTAN_REGION_CODES": "lexicon",
+    "URDU_KEYWORDS": "lexicon",
+    "configure_logging": "sentiment_logging",
+    "get_logger": "sentiment_logging",
+
+    # Aggregation API (NumPy)
+    "SentimentDataProcessor": "data_processor",
+    "PakistanSentimentProcessor": "pakistan_data_processor",
+    "TweetColumns": "tweet_columns",
+    "CategoricalDictionary": "categorical",
+    "Tweet": "tweet_record",
+    "compute_engagement_metrics": "engagement_metrics",
+    "SpikeDetector": "spike_detector",
+    "deduplicate": "dedup",
+    "TextIndex": "text_index",
+    "TweetSearchIndex": "tweet_search",
+    "parse_query": "query_language",
+    "StandingQueryMatcher": "standing_queries",
+    "AuthorActivityTracker": "author_activity",
+    "HyperLogLog": "hyperloglog",
+    "KLLSketch": "quantile_sketch",
+    "ScoreDistributionTracker": "quantile_sketch",
+    "SharedColumns": "shared_columns",
+    "TweetStore": "tweet_store",
+    "StreamingAggregator": "streaming_aggregator",
+    "CheckpointedAggregator": "checkpoint",
+    "TweetIdFilter": "bloom_filter",
+    "ScalableBloomFilter": "bloom_filter",
+    "HashedSentimentClassifier": "sentiment_classifier",
+    "Instrumentation": "instrumentation",
+    "IngestPipeline": "ingest_pipeline",
+    "FileReplaySource": "ingest_pipeline",
+    "MockStreamSource": "ingest_pipeline",
+    "StageCache": "stage_cache",
+
+    # Function-style analysis scripts
+    "simulate_twitter_data": "twitter_sentiment",
+    "analyze_sentiment": "twitter_sentiment",
+    "simulate_pakistan_twitter_data": "pakistan_sentiment_analysis",
+    "analyze_pakistan_sentiment": "pakistan_sentiment_analysis",
+    "generate_pakistan_timeline": "pakistan_sentiment_analysis",
+    "generate_pakistan_wordcloud": "pakistan_sentiment_analysis",
+    "generate_pakistan_regions": "pakistan_sentiment_analysis",
+
+    # Plotting (matplotlib, imported on first render)
+    "ChartRenderer": "plotting"
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module_name}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
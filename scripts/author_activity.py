@@ -0,0 +1,197 @@
+import numpy as np
+from .hyperloglog import HyperLogLog, hash64
+from .tweet_record import utc_created_at
+
+MASK64 = (1 << 64) - 1
+
+
+class AuthorActivityTracker:
+    """Bounded-memory per-author activity tracking
+
+    Post counts per author live in a count-min sketch (depth x width uint32
+    counters) and distinct authors per day and region in HyperLogLog
+    sketches, so memory does not grow with the number of users.
+    """
+
+    def __init__(self, width=1 << 16, depth=4, precision=12):
+        self.width = width
+        self.depth = depth
+        self.precision = precision
+        self.counters = np.zeros((depth, width), dtype=np.uint32)
+        self.authors_by_day = {}
+        self.authors_by_region = {}
+        self.total_authors = HyperLogLog(precision)
+
+    def _slots(self, hashed):
+        """Counter column for each sketch row (double hashing)"""
+        h1 = hashed & 0xFFFFFFFF
+        h2 = (hashed >> 32) | 1
+        return [((h1 + row * h2) & MASK64) % self.width for row in range(self.depth)]
+
+    def add(self, tweet):
+        """Record a tweet and return its author's estimated post count so far"""
+        user_id = tweet.get("user_id")
+        if user_id is None:
+            return 1
+
+        hashed = hash64(user_id)
+        slots = self._slots(hashed)
+        rows = np.arange(self.depth)
+        self.counters[rows, slots] += 1
+
+        day = utc_created_at(tweet["created_at"])[:10]
+        region = tweet.get("user_location", "Unknown")
+        if day not in self.authors_by_day:
+            self.authors_by_day[day] = HyperLogLog(self.precision)
+        if region not in self.authors_by_region:
+            self.authors_by_region[region] = HyperLogLog(self.precision)
+        self.authors_by_day[day].add_hash(hashed)
+        self.authors_by_region[region].add_hash(hashed)
+        self.total_authors.add_hash(hashed)
+
+        return int(self.counters[rows, slots].min())
+
+    def add_many(self, tweets):
+        """Record a batch of tweets in one vectorized pass
+
+        Leaves the sketches exactly as add() per tweet would (counters and
+        registers do not depend on order) but returns nothing.
+        """
+        tweets = [tweet for tweet in tweets if tweet.get("user_id") is not None]
+        if not tweets:
+            return
+        users = [tweet["user_id"] for tweet in tweets]
+        hashes = {user: hash64(user) for user in dict.fromkeys(users)}
+        hashed = np.fromiter((hashes[user] for user in users), dtype=np.uint64, count=len(users))
+
+        h1 = hashed & np.uint64(0xFFFFFFFF)
+        h2 = (hashed >> np.uint64(32)) | np.uint64(1)
+        for row in range(self.depth):
+            slots = (h1 + np.uint64(row) * h2) % np.uint64(self.width)
+            self.counters[row] += np.bincount(slots.astype(np.intp), minlength=self.width).astype(np.uint32)
+
+        for sketches, keys in ((self.authors_by_day, [utc_created_at(tweet["created_at"])[:10] for tweet in tweets]),
+                               (self.authors_by_region, [tweet.get("user_location", "Unknown") for tweet in tweets])):
+            rows = {}
+            for row, key in enumerate(keys):
+                rows.setdefault(key, []).append(row)
+            for key, members in rows.items():
+                if key not in sketches:
+                    sketches[key] = HyperLogLog(self.precision)
+                sketches[key].add_hashes(hashed[members])
+        self.total_authors.add_hashes(hashed)
+
+    def activity(self, user_id):
+        """Estimated post count for an author (never an undercount)"""
+        slots = self._slots(hash64(user_id))
+        return int(self.counters[np.arange(self.depth), slots].min())
+
+    def weight(self, user_id, cap=10):
+        """Down-weighting factor so an author contributes at most cap posts in total"""
+        posts = self.activity(user_id)
+        return 1.0 if posts <= cap else cap / posts
+
+    def distinct_authors_by_day(self):
+        return {day: hll.count() for day, hll in sorted(self.authors_by_day.items())}
+
+    def distinct_authors_by_region(self):
+        return {region: hll.count() for region, hll in self.authors_by_region.items()}
+
+    def distinct_authors_between(self, start_day, end_day):
+        """Distinct authors over an inclusive ISO day range, from merged day sketches"""
+        days = [hll for day, hll in self.authors_by_day.items() if start_day <= day <= end_day]
+        return HyperLogLog.union(days, self.precision).count()
+
+    def merge(self, other):
+        """Combine another shard's tracker into this one"""
+        if (other.width, other.depth) != (self.width, self.depth):
+            raise ValueError("Cannot merge trackers with different sketch dimensions")
+        self.counters += other.counters
+        for mine, theirs in ((self.authors_by_day, other.authors_by_day),
+                             (self.authors_by_region, other.authors_by_region)):
+            for key, hll in theirs.items():
+                if key in mine:
+                    mine[key].merge(hll)
+                else:
+                    mine[key] = HyperLogLog.from_bytes(hll.to_bytes())
+        self.total_authors.merge(other.total_authors)
+        return self
+
+    def sketches(self):
+        """Serialized per-day and per-region sketches for the aggregation output"""
+        return {
+            "byDay": {day: hll.to_base64() for day, hll in sorted(self.authors_by_day.items())},
+            "byRegion": {region: hll.to_base64() for region, hll in self.authors_by_region.items()}
+        }
+
+    def state(self):
+        """Copy of the counters and serialized sketches, for checkpoints"""
+        return {
+            "width": self.width,
+            "depth": self.depth,
+            "precision": self.precision,
+            "counters": self.counters.copy(),
+            "byDay": {day: hll.to_bytes() for day, hll in self.authors_by_day.items()},
+            "byRegion": {region: hll.to_bytes() for region, hll in self.authors_by_region.items()},
+            "total": self.total_authors.to_bytes()
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        tracker = cls(state["width"], state["depth"], state["precision"])
+        tracker.counters[:] = state["counters"]
+        tracker.authors_by_day = {day: HyperLogLog.from_bytes(data) for day, data in state["byDay"].items()}
+        tracker.authors_by_region = {region: HyperLogLog.from_bytes(data)
+                                     for region, data in state["byRegion"].items()}
+        tracker.total_authors = HyperLogLog.from_bytes(state["total"])
+        return tracker
+
+    def memory_bytes(self):
+        """Bytes held by the sketches, independent of user cardinality"""
+        sketches = 1 + len(self.authors_by_day) + len(self.authors_by_region)
+        return self.counters.nbytes + sketches * (1 << self.precision)
+
+
+def cap_author_posts(tweets, cap=None, tracker=None):
+    """Track authors in time order, keeping at most cap tweets per author
+
+    Returns the kept tweets in their original order along with the tracker.
+    Without a cap every tweet is kept and the tracker is filled in one
+    vectorized pass.
+    """
+    tracker = tracker or AuthorActivityTracker()
+    if cap is None:
+        tracker.add_many(tweets)
+        return list(tweets), tracker
+    keep = [True] * len(tweets)
+    for index in sorted(range(len(tweets)), key=lambda i: tweets[i]["created_at"]):
+        posts = tracker.add(tweets[index])
+        if posts > cap:
+            keep[index] = False
+    return [t for t, kept in zip(tweets, keep) if kept], tracker
+
+
+def merge_author_sections(sections):
+    """Merge processed_data["authors"] sections from several shards or time windows"""
+    by_day = {}
+    by_region = {}
+    for section in sections:
+        for target, sketches in ((by_day, section["sketches"]["byDay"]),
+                                 (by_region, section["sketches"]["byRegion"])):
+            for key, encoded in sketches.items():
+                sketch = HyperLogLog.from_base64(encoded)
+                if key in target:
+                    target[key].merge(sketch)
+                else:
+                    target[key] = sketch
+
+    return {
+        "distinctAuthors": HyperLogLog.union(by_day.values()).count(),
+        "byDay": {day: hll.count() for day, hll in sorted(by_day.items())},
+        "byRegion": {region: hll.count() for region, hll in by_region.items()},
+        "countedTweets": sum(section["countedTweets"] for section in sections),
+        "sketches": {
+            "byDay": {day: hll.to_base64() for day, hll in sorted(by_day.items())},
+            "byRegion": {region: hll.to_base64() for region, hll in by_region.items()}
+        }
+    }
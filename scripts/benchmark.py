@@ -0,0 +1,198 @@
+import argparse
+import json
+import platform
+import random
+import resource
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+import numpy as np
+from .data_processor import SentimentDataProcessor
+from .pakistan_data_processor import PakistanSentimentProcessor
+from .sentiment_logging import configure_logging, get_logger, quiet
+
+logger = get_logger(__name__)
+
+DEFAULT_SCALES = [10_000, 1_000_000, 10_000_000]
+
+
+def seed_everything(seed):
+    """Seed both random sources used by the generators"""
+    random.seed(seed)
+    np.random.seed(seed)
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far, in MB"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS reports bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def time_stage(name, rows, func, trace_memory=False):
+    """Run one stage quietly and return (result, timing record)"""
+    if trace_memory:
+        tracemalloc.start()
+
+    with quiet():
+        start_wall = time.perf_counter()
+        start_cpu = time.process_time()
+        result = func()
+        wall = time.perf_counter() - start_wall
+        cpu = time.process_time() - start_cpu
+
+    record = {
+        "stage": name,
+        "rows": rows,
+        "wall_seconds": round(wall, 6),
+        "cpu_seconds": round(cpu, 6),
+        "rows_per_second": round(rows / wall) if wall > 0 else None,
+        "peak_rss_mb": round(peak_rss_mb(), 1)
+    }
+    if trace_memory:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        record["peak_traced_mb"] = round(peak / (1024 * 1024), 1)
+
+    return result, record
+
+
+def bench_sentiment_processor(count, trace_memory=False):
+    """Time each stage of SentimentDataProcessor at one scale"""
+    processor = SentimentDataProcessor()
+    processor.query = "benchmark"
+    records = []
+
+    data, record = time_stage("generation", count,
+                              lambda: processor._generate_sample_data(count=count), trace_memory)
+    processor.data = data
+    records.append(record)
+
+    stages = [
+        ("overview", processor._process_overview),
+        ("timeline", processor._process_timeline),
+        ("wordcloud", processor._process_wordcloud),
+        ("regions", processor._process_regions)
+    ]
+    for name, func in stages:
+        _, record = time_stage(name, count, func, trace_memory)
+        records.append(record)
+
+    return records
+
+
+def bench_pakistan_processor(count, trace_memory=False):
+    """Time each stage of PakistanSentimentProcessor (plus keyword scoring) at one scale"""
+    from .pakistan_sentiment_analysis import analyze_pakistan_sentiment
+
+    processor = PakistanSentimentProcessor(data=[])
+    records = []
+
+    data, record = time_stage("generation", count,
+                              lambda: processor._generate_pakistan_data(count=count), trace_memory)
+    processor.data = data
+    records.append(record)
+
+    stages = [
+        ("analyze_pakistan_sentiment", lambda: analyze_pakistan_sentiment(processor.data)),
+        ("overview", processor._process_pakistan_overview),
+        ("timeline", processor._process_pakistan_timeline),
+        ("wordcloud", processor._process_pakistan_wordcloud),
+        ("regions", processor._process_pakistan_regions)
+    ]
+    for name, func in stages:
+        _, record = time_stage(name, count, func, trace_memory)
+        records.append(record)
+
+    return records
+
+
+SUITES = {
+    "SentimentDataProcessor": bench_sentiment_processor,
+    "PakistanSentimentProcessor": bench_pakistan_processor
+}
+
+
+def run_benchmarks(scales=DEFAULT_SCALES, suites=None, seed=42, trace_memory=False):
+    """Run every suite at every scale and return the results document"""
+    results = {
+        "created_at": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "seed": seed,
+        "trace_memory": trace_memory,
+        "runs": []
+    }
+
+    for suite_name in suites or SUITES:
+        for count in scales:
+            seed_everything(seed)
+            logger.info("Benchmarking {} with {:,} tweets", suite_name, count)
+            for record in SUITES[suite_name](count, trace_memory):
+                record["suite"] = suite_name
+                results["runs"].append(record)
+                logger.info("   {:<28} {:>10.3f}s {:>14,} rows/s {:>10.1f} MB", record["stage"],
+                            record["wall_seconds"], record["rows_per_second"] or 0, record["peak_rss_mb"])
+
+    return results
+
+
+def compare_to_baseline(results, baseline, tolerance=0.10):
+    """List stages whose wall time regressed by more than tolerance against a baseline"""
+    previous = {(r["suite"], r["stage"], r["rows"]): r for r in baseline["runs"]}
+    regressions = []
+    for run in results["runs"]:
+        before = previous.get((run["suite"], run["stage"], run["rows"]))
+        if before and before["wall_seconds"] > 0:
+            change = run["wall_seconds"] / before["wall_seconds"] - 1
+            if change > tolerance:
+                regressions.append({
+                    "suite": run["suite"],
+                    "stage": run["stage"],
+                    "rows": run["rows"],
+                    "baseline_seconds": before["wall_seconds"],
+                    "wall_seconds": run["wall_seconds"],
+                    "change_pct": round(change * 100, 1)
+                })
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the sentiment processing stages")
+    parser.add_argument("--scales", type=int, nargs="+", default=DEFAULT_SCALES,
+                        help="Tweet counts to benchmark")
+    parser.add_argument("--suite", choices=list(SUITES), action="append",
+                        help="Suite to run (default: all)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="Record per-stage tracemalloc peaks (slows the stages down)")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", help="Previous results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.10,
+                        help="Allowed slowdown before a stage counts as a regression")
+    args = parser.parse_args()
+    configure_logging()
+
+    results = run_benchmarks(args.scales, args.suite, args.seed, args.trace_memory)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        results["regressions"] = compare_to_baseline(results, baseline, args.tolerance)
+        print(f"\n{len(results['regressions'])} stages regressed by more than {args.tolerance:.0%}")
+        for regression in results["regressions"]:
+            print(f"   {regression['suite']} {regression['stage']} @ {regression['rows']:,}: "
+                  f"{regression['baseline_seconds']:.3f}s -> {regression['wall_seconds']:.3f}s "
+                  f"(+{regression['change_pct']}%)")
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nSaved benchmark results to {args.output}")
+
+    if results.get("regressions"):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
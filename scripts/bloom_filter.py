@@ -0,0 +1,230 @@
+import math
+import numpy as np
+from .hyperloglog import hash64
+from .tweet_record import utc_created_at
+
+MASK32 = 0xFFFFFFFF
+
+
+def hash_pairs(values):
+    """Two 32-bit hashes per value (from one hash64) for double hashing"""
+    hashed = np.fromiter((hash64(value) for value in values), dtype=np.uint64, count=len(values))
+    return hashed & np.uint64(MASK32), (hashed >> np.uint64(32)) | np.uint64(1)
+
+
+class BloomSlice:
+    """Fixed-size Bloom filter sized for capacity items at error_rate"""
+
+    __slots__ = ("bits", "size", "hashes", "capacity", "error_rate", "count")
+
+    def __init__(self, capacity, error_rate):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(int(math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)), 8)
+        self.hashes = max(int(math.ceil(-math.log2(error_rate))), 1)
+        self.bits = np.zeros((self.size + 7) // 8, dtype=np.uint8)
+        self.count = 0
+
+    def _positions(self, h1, h2):
+        steps = np.arange(self.hashes, dtype=np.uint64)
+        return (h1[:, None] + steps[None, :] * h2[:, None]) % np.uint64(self.size)
+
+    def contains(self, h1, h2):
+        positions = self._positions(h1, h2)
+        bits = (self.bits[positions >> np.uint64(3)] >> (positions & np.uint64(7)).astype(np.uint8)) & 1
+        return bits.all(axis=1)
+
+    def add(self, h1, h2):
+        positions = self._positions(h1, h2).ravel()
+        np.bitwise_or.at(self.bits, positions >> np.uint64(3),
+                         np.left_shift(1, (positions & np.uint64(7)).astype(np.uint8)).astype(np.uint8))
+        self.count += len(h1)
+
+
+class ScalableBloomFilter:
+    """Bloom filter that grows by adding slices as it fills (Almeida et al. 2007)
+
+    Slice i holds capacity * growth**i items at error_rate * (1 - tightening)
+    * tightening**i, so the false-positive rate over all slices stays below
+    error_rate however many items are added, at about
+    -log(error_rate) / log(2)**2 bits per item (~15 bits at 0.1%).
+    """
+
+    def __init__(self, capacity=100000, error_rate=0.001, growth=2, tightening=0.5):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.growth = growth
+        self.tightening = tightening
+        self.slices = []
+
+    def __len__(self):
+        return sum(s.count for s in self.slices)
+
+    def _add_slice(self):
+        level = len(self.slices)
+        self.slices.append(BloomSlice(self.capacity * self.growth ** level,
+                                      self.error_rate * (1 - self.tightening) * self.tightening ** level))
+        return self.slices[-1]
+
+    def contains_hashes(self, h1, h2):
+        found = np.zeros(len(h1), dtype=bool)
+        for bloom in self.slices:
+            found |= bloom.contains(h1, h2)
+        return found
+
+    def add_hashes(self, h1, h2):
+        start = 0
+        while start < len(h1):
+            bloom = self.slices[-1] if self.slices and self.slices[-1].count < self.slices[-1].capacity \
+                else self._add_slice()
+            stop = start + bloom.capacity - bloom.count
+            bloom.add(h1[start:stop], h2[start:stop])
+            start = stop
+
+    def add(self, value):
+        self.add_hashes(*hash_pairs([value]))
+
+    def __contains__(self, value):
+        return bool(self.contains_hashes(*hash_pairs([value]))[0])
+
+    def memory_bytes(self):
+        return sum(s.bits.nbytes for s in self.slices)
+
+    def state(self):
+        """Options and slice bit arrays, for checkpoints"""
+        return {
+            "options": (self.capacity, self.error_rate, self.growth, self.tightening),
+            "slices": [(s.capacity, s.error_rate, s.count, s.bits.tobytes()) for s in self.slices]
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        bloom = cls(*state["options"])
+        for capacity, error_rate, count, bits in state["slices"]:
+            s = BloomSlice(capacity, error_rate)
+            s.bits[:] = np.frombuffer(bits, dtype=np.uint8)
+            s.count = count
+            bloom.slices.append(s)
+        return bloom
+
+
+class TweetIdFilter:
+    """Seen-tweet-id filter for exactly-once counting of re-delivered tweets
+
+    Ids are kept in one ScalableBloomFilter per partition_hours window of
+    created_at. A re-delivered tweet carries its original created_at, so
+    it is checked against a single partition. Partitions older than
+    retention_hours before the watermark are dropped; tweets that old pass
+    unchecked (counted as expired), since there is nothing left to check
+    them against. The watermark advances to the watermark_quantile of each
+    batch's partitions, not its newest, so a few skewed future timestamps
+    cannot expire every partition. A new tweet is wrongly suppressed with
+    probability below error_rate; a repeat is never let through while its
+    partition is kept. Tweets without an id always pass.
+    """
+
+    def __init__(self, error_rate=0.001, partition_hours=24, retention_hours=7 * 24, capacity=10000,
+                 watermark_quantile=0.5):
+        self.error_rate = error_rate
+        self.partition_seconds = int(partition_hours * 3600)
+        self.retention_partitions = max(int(math.ceil(retention_hours / partition_hours)), 1)
+        self.capacity = capacity
+        self.watermark_quantile = watermark_quantile
+        self.partitions = {}
+        self.newest = None
+        self.checked = 0
+        self.duplicates = 0
+        self.expired = 0
+
+    def _partitions_of(self, tweets):
+        created_at = np.array([utc_created_at(tweet["created_at"]) for tweet in tweets], dtype="datetime64[s]")
+        return created_at.astype(np.int64) // self.partition_seconds
+
+    def _expire(self):
+        cutoff = self.newest - self.retention_partitions + 1
+        for partition in [p for p in self.partitions if p < cutoff]:
+            del self.partitions[partition]
+        return cutoff
+
+    def fresh(self, tweets):
+        """Boolean mask of tweets not seen before; records them as seen
+
+        Within the batch only the first of several tweets with one id counts
+        as fresh.
+        """
+        fresh = np.ones(len(tweets), dtype=bool)
+        rows = np.array([i for i, tweet in enumerate(tweets) if tweet.get("id") is not None], dtype=np.int64)
+        if not len(rows):
+            return fresh
+        tweets = [tweets[i] for i in rows]
+        h1, h2 = hash_pairs([tweet["id"] for tweet in tweets])
+        partitions = self._partitions_of(tweets)
+        newest = int(np.quantile(partitions, self.watermark_quantile, method="lower"))
+        if self.newest is None or newest > self.newest:
+            self.newest = newest
+        cutoff = self._expire()
+
+        keep = partitions >= cutoff
+        # First occurrence of each id in the batch (a repeat shares its created_at, hence its partition)
+        first = np.zeros(len(rows), dtype=bool)
+        first[np.unique((h2.astype(np.uint64) << np.uint64(32)) | h1, return_index=True)[1]] = True
+        for partition in np.unique(partitions[keep]):
+            members = np.flatnonzero(partitions == partition)
+            bloom = self.partitions.get(int(partition))
+            if bloom is None:
+                bloom = self.partitions[int(partition)] = ScalableBloomFilter(self.capacity, self.error_rate)
+            seen = bloom.contains_hashes(h1[members], h2[members])
+            added = members[~seen & first[members]]
+            bloom.add_hashes(h1[added], h2[added])
+            first[members[seen]] = False
+
+        # Expired tweets cannot be checked, so they pass rather than being dropped as repeats
+        fresh[rows] = first
+        self.checked += len(rows)
+        self.expired += int((~keep & first).sum())
+        self.duplicates += int((~first).sum())
+        return fresh
+
+    def filter(self, tweets):
+        """The tweets not seen before, in order"""
+        mask = self.fresh(tweets)
+        return [tweet for tweet, fresh in zip(tweets, mask) if fresh]
+
+    def memory_bytes(self):
+        return sum(bloom.memory_bytes() for bloom in self.partitions.values())
+
+    def stats(self):
+        stored = sum(len(bloom) for bloom in self.partitions.values())
+        return {
+            "partitions": len(self.partitions),
+            "idsStored": stored,
+            "checked": self.checked,
+            "duplicates": self.duplicates,
+            "expired": self.expired,
+            "bytes": self.memory_bytes(),
+            "bytesPerId": round(self.memory_bytes() / stored, 2) if stored else 0.0
+        }
+
+    def state(self):
+        """Options, counters and every partition's filter, for checkpoints"""
+        return {
+            "options": {
+                "error_rate": self.error_rate,
+                "partition_hours": self.partition_seconds / 3600,
+                "retention_hours": self.retention_partitions * self.partition_seconds / 3600,
+                "capacity": self.capacity,
+                "watermark_quantile": self.watermark_quantile
+            },
+            "newest": self.newest,
+            "counters": (self.checked, self.duplicates, self.expired),
+            "partitions": {partition: bloom.state() for partition, bloom in self.partitions.items()}
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        seen = cls(**state["options"])
+        seen.newest = state["newest"]
+        seen.checked, seen.duplicates, seen.expired = state["counters"]
+        seen.partitions = {partition: ScalableBloomFilter.from_state(saved)
+                           for partition, saved in state["partitions"].items()}
+        return seen
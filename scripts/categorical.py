@@ -0,0 +1,71 @@
+"""Stable string <-> integer code dictionaries for categorical tweet fields
+
+Codes are assigned once, in first-seen order, and never change, so code
+arrays built from different batches (and results merged from them) agree.
+Plain Python only; TweetColumns turns the codes into NumPy arrays.
+"""
+
+SENTIMENT_TYPES = ("positive", "negative", "neutral")
+POSITIVE, NEGATIVE, NEUTRAL = range(len(SENTIMENT_TYPES))
+
+UNKNOWN_LOCATION = "Unknown"
+
+
+class CategoricalDictionary:
+    """Append-only mapping between category values and small integer codes"""
+
+    def __init__(self, values=(), frozen=False, default=None):
+        self.values = []
+        self.codes = {}
+        self.frozen = False
+        self.default = default
+        for value in values:
+            self.encode(value)
+        self.frozen = frozen  # Frozen dictionaries map unknown values to default
+
+    def __len__(self):
+        return len(self.values)
+
+    def __contains__(self, value):
+        return value in self.codes
+
+    def encode(self, value):
+        """Code for value, assigning the next code the first time it is seen"""
+        code = self.codes.get(value)
+        if code is None:
+            if self.frozen:
+                if self.default is None:
+                    raise KeyError(value)
+                return self.default
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def encode_many(self, values):
+        encode = self.encode
+        return [encode(value) for value in values]
+
+    def decode(self, code):
+        return self.values[code]
+
+    def decode_many(self, codes):
+        values = self.values
+        return [values[code] for code in codes]
+
+    def to_list(self):
+        """Values in code order, for persisting alongside encoded state"""
+        return list(self.values)
+
+    @classmethod
+    def from_list(cls, values, frozen=False, default=None):
+        return cls(values, frozen=frozen, default=default)
+
+
+# Fixed sentiment codes shared by every caller; location dictionaries are
+# open-ended, so each build or aggregator owns one (see location_dictionary)
+SENTIMENT_CODES = CategoricalDictionary(SENTIMENT_TYPES, frozen=True, default=NEUTRAL)
+
+
+def location_dictionary():
+    """Fresh location dictionary with UNKNOWN_LOCATION as code 0"""
+    return CategoricalDictionary([UNKNOWN_LOCATION])
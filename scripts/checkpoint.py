@@ -0,0 +1,298 @@
+"""Snapshots plus an append-only batch log for streaming aggregators
+
+CheckpointedAggregator wraps any aggregator with ingest(batch), state()
+and a from_state(state) classmethod (StreamingAggregator by default).
+Every batch is appended to a log segment before it is aggregated; every
+snapshot_every batches the aggregator's state() is captured and a new log
+segment started, and a background thread compresses and writes the
+snapshot and then deletes the segments it covers. Ingestion carries on
+while the snapshot is written.
+
+On restart the latest snapshot is loaded and only the batches logged
+after it are replayed, so recovery time depends on the log since the last
+snapshot, not on the whole history. A record torn by a crash mid-write is
+detected by its checksum and truncated away.
+
+Layout of the directory:
+    snapshot-<sequence>.bin   zlib-compressed pickle of the state covering
+                              batches [0, sequence)
+    batches-<sequence>.log    records for batches from sequence onwards:
+                              a (sequence, length, crc32) header and the
+                              zlib-compressed JSON batch
+"""
+import json
+import os
+import pickle
+import struct
+import sys
+import threading
+import time
+import zlib
+from .sentiment_logging import configure_logging, get_logger
+from .tweet_record import json_default
+
+logger = get_logger(__name__)
+
+SNAPSHOT_MAGIC = b"TWSNAP1\n"
+RECORD_HEADER = struct.Struct("<QII")  # batch sequence, payload length, payload crc32
+
+
+def _sequence_of(name, prefix, suffix):
+    """Sequence number in a snapshot-/batches- file name, or None for other files"""
+    if name.startswith(prefix) and name.endswith(suffix):
+        digits = name[len(prefix):-len(suffix)]
+        if digits.isdigit():
+            return int(digits)
+    return None
+
+
+class BatchLog:
+    """Append-only log of tweet batches, split into segments at each snapshot"""
+
+    def __init__(self, directory, fsync=False):
+        self.directory = directory
+        self.fsync = fsync
+        self.file = None
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, sequence):
+        return os.path.join(self.directory, f"batches-{sequence:012d}.log")
+
+    def segments(self):
+        """(first sequence, path) of every segment, oldest first"""
+        segments = []
+        for name in os.listdir(self.directory):
+            sequence = _sequence_of(name, "batches-", ".log")
+            if sequence is not None:
+                segments.append((sequence, os.path.join(self.directory, name)))
+        return sorted(segments)
+
+    def start_segment(self, sequence):
+        """Direct further appends to the segment beginning at sequence"""
+        self.close()
+        self.file = open(self._path(sequence), "ab")
+
+    def append(self, sequence, batch):
+        payload = zlib.compress(json.dumps(batch, separators=(",", ":"), default=json_default).encode("utf-8"), 1)
+        self.file.write(RECORD_HEADER.pack(sequence, len(payload), zlib.crc32(payload)) + payload)
+        self.file.flush()
+        if self.fsync:
+            os.fsync(self.file.fileno())
+
+    def read(self, path):
+        """Yield (sequence, batch) records; a torn or corrupt tail is truncated away"""
+        with open(path, "r+b") as f:
+            good = 0
+            while True:
+                header = f.read(RECORD_HEADER.size)
+                if not header:
+                    break
+                if len(header) == RECORD_HEADER.size:
+                    sequence, length, crc = RECORD_HEADER.unpack(header)
+                    payload = f.read(length)
+                    if len(payload) == length and zlib.crc32(payload) == crc:
+                        good = f.tell()
+                        yield sequence, json.loads(zlib.decompress(payload))
+                        continue
+                logger.warning("Truncating torn batch log record at byte {} of {}", good, path)
+                f.truncate(good)
+                break
+
+    def prune(self, sequence):
+        """Delete segments holding only batches before sequence"""
+        for first, path in self.segments():
+            if first < sequence:
+                os.remove(path)
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+class CheckpointedAggregator:
+    """An aggregator made restartable by periodic snapshots and a batch log
+
+    Opening a directory recovers whatever it holds: the latest snapshot is
+    restored with aggregator_class.from_state() and the logged batches after
+    it replayed. An empty directory starts a fresh
+    aggregator_class(**options). A snapshot is skipped (retried on the next
+    batch) while the previous one is still being written, so ingest() never
+    waits for the disk. fsync=True makes every logged batch durable before
+    it is aggregated, at the cost of a sync per batch.
+
+    ingest(batch) makes it usable as an IngestPipeline sink.
+    """
+
+    def __init__(self, directory, aggregator_class=None, snapshot_every=100, fsync=False, **options):
+        if aggregator_class is None:
+            from .streaming_aggregator import StreamingAggregator
+            aggregator_class = StreamingAggregator
+        self.directory = directory
+        self.aggregator_class = aggregator_class
+        self.snapshot_every = snapshot_every
+        self.log = BatchLog(directory, fsync)
+        self.sequence = 0
+        self.snapshot_sequence = 0
+        self.snapshots = 0
+        self._writer = None
+        self.aggregator = None
+        self.recovery = self._recover(options)
+
+    def _snapshot_path(self, sequence):
+        return os.path.join(self.directory, f"snapshot-{sequence:012d}.bin")
+
+    def _snapshots(self):
+        """(sequence, path) of every snapshot, newest first"""
+        snapshots = []
+        for name in os.listdir(self.directory):
+            sequence = _sequence_of(name, "snapshot-", ".bin")
+            if sequence is not None:
+                snapshots.append((sequence, os.path.join(self.directory, name)))
+        return sorted(snapshots, reverse=True)
+
+    def _recover(self, options):
+        started = time.perf_counter()
+        for sequence, path in self._snapshots():
+            try:
+                with open(path, "rb") as f:
+                    data = f.read()
+                if not data.startswith(SNAPSHOT_MAGIC):
+                    raise ValueError("not a snapshot file")
+                state = pickle.loads(zlib.decompress(data[len(SNAPSHOT_MAGIC):]))
+            except (OSError, ValueError, zlib.error, pickle.UnpicklingError, EOFError) as error:
+                logger.warning("Skipping unreadable snapshot {}: {}", path, error)
+                continue
+            self.aggregator = self.aggregator_class.from_state(state)
+            self.sequence = self.snapshot_sequence = sequence
+            break
+        else:
+            self.aggregator = self.aggregator_class(**options)
+
+        replayed = tweets = 0
+        for _, path in self.log.segments():
+            for sequence, batch in self.log.read(path):
+                if sequence < self.sequence:
+                    continue
+                if sequence > self.sequence:
+                    raise ValueError(f"Batch log is missing batch {self.sequence} (next is {sequence})")
+                self.aggregator.ingest(batch)
+                self.sequence += 1
+                replayed += 1
+                tweets += len(batch)
+
+        self.log.prune(self.snapshot_sequence)
+        self.log.start_segment(self.sequence)
+        recovery = {
+            "snapshotSequence": self.snapshot_sequence,
+            "replayedBatches": replayed,
+            "replayedTweets": tweets,
+            "seconds": round(time.perf_counter() - started, 3)
+        }
+        if self.sequence:
+            logger.info("Recovered {} batches from {} (snapshot at {}, replayed {} in {:.3f}s)",
+                        self.sequence, self.directory, self.snapshot_sequence, replayed, recovery["seconds"])
+        return recovery
+
+    def ingest(self, batch):
+        """Log the batch, aggregate it and snapshot when due; returns the aggregator's result"""
+        self.log.append(self.sequence, batch)
+        result = self.aggregator.ingest(batch)
+        self.sequence += 1
+        if self.sequence - self.snapshot_sequence >= self.snapshot_every:
+            self.checkpoint()
+        return result
+
+    def checkpoint(self, wait=False):
+        """Snapshot the current state in the background; False if one is still being written"""
+        if self._writer is not None and self._writer.is_alive():
+            if not wait:
+                return False
+            self._writer.join()
+        if self.sequence == self.snapshot_sequence:
+            return True
+
+        # Capture state and switch segments synchronously; the expensive part runs in the writer
+        state = self.aggregator.state()
+        sequence = self.snapshot_sequence = self.sequence
+        self.log.start_segment(sequence)
+        self._writer = threading.Thread(target=self._write_snapshot, args=(sequence, state),
+                                        name="snapshot-writer", daemon=True)
+        self._writer.start()
+        if wait:
+            self._writer.join()
+        return True
+
+    def _write_snapshot(self, sequence, state):
+        started = time.perf_counter()
+        path = self._snapshot_path(sequence)
+        temp = f"{path}.tmp"
+        data = SNAPSHOT_MAGIC + zlib.compress(pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL), 1)
+        with open(temp, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp, path)
+
+        # The snapshot is durable: older snapshots and the segments it covers can go
+        for older, older_path in self._snapshots():
+            if older < sequence:
+                os.remove(older_path)
+        self.log.prune(sequence)
+        self.snapshots += 1
+        logger.info("Wrote snapshot {} ({} bytes) in {:.3f}s", path, len(data), time.perf_counter() - started)
+
+    def close(self, checkpoint=True):
+        """Finish any snapshot in progress (writing a final one by default) and close the log"""
+        if checkpoint:
+            self.checkpoint(wait=True)
+        elif self._writer is not None:
+            self._writer.join()
+        self.log.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def results(self, **options):
+        return self.aggregator.results(**options)
+
+    def stats(self):
+        return {
+            "batches": self.sequence,
+            "snapshotSequence": self.snapshot_sequence,
+            "snapshotsWritten": self.snapshots,
+            "logSegments": len(self.log.segments()),
+            "logBytes": sum(os.path.getsize(path) for _, path in self.log.segments()),
+            "recovery": self.recovery
+        }
+
+
+def main():
+    import tempfile
+    from .ingest_pipeline import MockStreamSource, run_pipeline
+    from .spike_detector import SpikeDetector
+    from .streaming_aggregator import StreamingAggregator
+
+    configure_logging("WARNING")
+    directory = tempfile.mkdtemp(prefix="checkpoints-")
+    detector = SpikeDetector(bucket_minutes=60, z_threshold=4.0, keywords=["imran", "pti", "violence", "arrest"])
+
+    # Stream, then "crash" without a final snapshot: the tail since the last one stays in the log
+    stream = CheckpointedAggregator(directory, snapshot_every=8, spike_detector=detector)
+    source = MockStreamSource(rate=None, count=30000, start="2023-05-06", interval=20)
+    run_pipeline(source, sink=stream, workers=2, batch_size=500)
+    stream.close(checkpoint=False)
+    print(f"Before restart: {json.dumps(stream.stats())}")
+
+    recovered = CheckpointedAggregator(directory, StreamingAggregator)
+    print(f"After restart: {json.dumps(recovered.stats())}")
+    same = recovered.results()["overview"] == stream.results()["overview"]
+    print(f"Recovered overview matches: {same}")
+    recovered.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
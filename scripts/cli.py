@@ -0,0 +1,338 @@
+import argparse
+import csv
+import json
+import os
+import random
+import sys
+from multiprocessing import Pool
+from .scoring import scorer_for
+from .sentiment_logging import configure_logging, get_logger
+from .tweet_record import json_default, to_records
+
+logger = get_logger(__name__)
+
+STAGES = ["generate", "analyze", "aggregate", "export"]
+
+SOURCES = ["pakistan", "pakistan-sim", "us", "us-sim"]
+
+
+def load_tweets(path, records=False):
+    """Read tweets from a JSON array or JSON-lines file, optionally as compact Tweet records"""
+    with open(path, encoding="utf-8") as f:
+        if path.endswith(".json"):
+            tweets = json.load(f)
+        else:
+            tweets = [json.loads(line) for line in f if line.strip()]
+    return to_records(tweets) if records else tweets
+
+
+def save_tweets(tweets, path):
+    """Write tweets as JSON lines"""
+    with open(path, "w", encoding="utf-8") as f:
+        for tweet in tweets:
+            f.write(json.dumps(tweet, ensure_ascii=False, default=json_default))
+            f.write("\n")
+
+
+def file_signature(path):
+    """Cheap change detector for stage inputs: size and modification time"""
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+class StageRunner:
+    """Runs pipeline stages in a work directory, skipping ones whose inputs and params are unchanged"""
+
+    def __init__(self, work_dir, force=False):
+        self.work_dir = work_dir
+        self.force = force
+        self.manifest_path = os.path.join(work_dir, "manifest.json")
+        os.makedirs(work_dir, exist_ok=True)
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path) as f:
+                self.manifest = json.load(f)
+        else:
+            self.manifest = {}
+
+    def path(self, name):
+        return os.path.join(self.work_dir, name)
+
+    def _signature(self, params, inputs, output):
+        return {
+            "params": params,
+            "inputs": {path: file_signature(path) for path in inputs},
+            "output": output
+        }
+
+    def is_current(self, stage, params, inputs, output):
+        """Whether the manifest says output was produced from these params and unchanged inputs"""
+        if not os.path.exists(output) or not all(os.path.exists(path) for path in inputs):
+            return False
+        return self.manifest.get(stage) == self._signature(params, inputs, output)
+
+    def run(self, stage, params, inputs, output, func):
+        """Run func() unless the recorded params/input signatures match and output exists"""
+        if not self.force and self.is_current(stage, params, inputs, output):
+            logger.info("Skipping {} (cached in {})", stage, output)
+            return False
+
+        func()
+        self.manifest[stage] = self._signature(params, inputs, output)
+        with open(self.manifest_path, "w") as f:
+            json.dump(self.manifest, f, indent=2)
+        return True
+
+
+def generate_tweets(args):
+    """Synthetic tweets from one of the built-in generators"""
+    if args.source == "pakistan":
+        from .pakistan_data_processor import PakistanSentimentProcessor
+        processor = PakistanSentimentProcessor(incident_date=args.incident_date, data=[])
+        return processor._generate_pakistan_data(count=args.count, days=args.days)
+    if args.source == "pakistan-sim":
+        from .pakistan_sentiment_analysis import simulate_pakistan_twitter_data
+        return simulate_pakistan_twitter_data(query=args.query, count=args.count,
+                                              start_date=args.start_date, days=args.days)
+    if args.source == "us":
+        from .data_processor import SentimentDataProcessor
+        processor = SentimentDataProcessor()
+        processor.query = args.query
+        return processor._generate_sample_data(count=args.count, days=args.days)
+
+    from .twitter_sentiment import simulate_twitter_data
+    return simulate_twitter_data(args.query, count=args.count, days=args.days)
+
+
+def _score_chunk(job):
+    """Worker entry point: score one chunk of tweets"""
+    source, seed, chunk = job
+    random.seed(seed)
+    return scorer_for(source)(chunk)
+
+
+def analyze_tweets(tweets, source, workers=1, chunk_size=50000, seed=None, shared=False):
+    """Score tweets, fanning chunks out to a process pool when workers > 1
+
+    shared=True hands workers the texts through a shared memory block and
+    has them write scores back there, instead of pickling each chunk of
+    tweet dicts to a worker and back.
+    """
+    if workers <= 1:
+        return scorer_for(source)(tweets)
+    if shared:
+        from .shared_columns import parallel_score
+        return parallel_score(tweets, source, workers, chunk_size, seed)
+
+    base_seed = seed if seed is not None else random.randrange(1 << 30)
+    jobs = [(source, base_seed + i, tweets[start:start + chunk_size])
+            for i, start in enumerate(range(0, len(tweets), chunk_size))]
+    with Pool(workers) as pool:
+        chunks = pool.map(_score_chunk, jobs)
+    return [tweet for chunk in chunks for tweet in chunk]
+
+
+def filter_window(tweets, since=None, until=None):
+    """Keep tweets whose created_at falls in [since, until)"""
+    if not since and not until:
+        return tweets
+    return [t for t in tweets
+            if (not since or t["created_at"] >= since) and (not until or t["created_at"] < until)]
+
+
+def aggregate_tweets(tweets, args, instrumentation=None, cache=None, fingerprint=None):
+    """Run the processor for the chosen source over already-scored tweets"""
+    spike_detector = None
+    if args.spikes:
+        from .spike_detector import SpikeDetector
+        spike_detector = SpikeDetector(bucket_minutes=args.bucket_minutes)
+
+    options = {
+        "data": tweets,
+        "spike_detector": spike_detector,
+        "count_mode": args.count_mode,
+        "author_cap": args.author_cap,
+        "instrumentation": instrumentation,
+        "cache": cache,
+        "fingerprint": fingerprint
+    }
+    if args.source.startswith("pakistan"):
+        from .pakistan_data_processor import PakistanSentimentProcessor
+        return PakistanSentimentProcessor(incident_date=args.incident_date, **options).process_pakistan_data()
+
+    from .data_processor import SentimentDataProcessor
+    processor = SentimentDataProcessor(**options)
+    processor.query = args.query  # Passing query to the constructor would generate data when tweets is empty
+    return processor.process_data()
+
+
+def export_results(results, output, fmt):
+    """Write aggregates as one JSON document or one CSV per tabular section"""
+    directory = os.path.dirname(output)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    if fmt == "json":
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        return [output]
+
+    stem = os.path.splitext(output)[0]
+    paths = []
+    for section in ("timeline", "wordcloud", "regions", "spikes"):
+        rows = results.get(section) or []
+        if not rows:
+            continue
+        path = f"{stem}_{section}.csv"
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+        paths.append(path)
+    return paths
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="Run the sentiment pipeline: generate -> analyze -> aggregate -> export")
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=STAGES,
+                        help="Stages to run, in pipeline order")
+    parser.add_argument("--input", help="Tweets file (.json or .jsonl) used instead of the generate stage")
+    parser.add_argument("--source", choices=SOURCES, default="pakistan",
+                        help="Synthetic generator and matching scorer/processor")
+    parser.add_argument("--query", default="Imran Khan 9th May")
+    parser.add_argument("--count", type=int, default=5000, help="Synthetic tweets to generate")
+    parser.add_argument("--days", type=int, default=14)
+    parser.add_argument("--start-date", default="2023-05-07", help="Start date for pakistan-sim")
+    parser.add_argument("--incident-date", default="2023-05-09")
+    parser.add_argument("--seed", type=int, help="Seed for reproducible generation and scoring")
+    parser.add_argument("--workers", type=int, default=1, help="Processes used for scoring")
+    parser.add_argument("--chunk-size", type=int, default=50000, help="Tweets per scoring task")
+    parser.add_argument("--shared-memory", action="store_true",
+                        help="Pass tweet text to scoring workers through shared memory instead of pickling")
+    parser.add_argument("--records", action="store_true",
+                        help="Hold loaded tweets as __slots__ Tweet records instead of dicts")
+    parser.add_argument("--since", help="Only aggregate tweets created at or after this ISO time")
+    parser.add_argument("--until", help="Only aggregate tweets created before this ISO time")
+    parser.add_argument("--count-mode", choices=["raw", "unique"], default="raw")
+    parser.add_argument("--author-cap", type=int, help="Max tweets counted per author")
+    parser.add_argument("--spikes", action="store_true", help="Run spike detection")
+    parser.add_argument("--bucket-minutes", type=int, default=60)
+    parser.add_argument("--format", choices=["json", "csv"], default="json", help="Export format")
+    parser.add_argument("--output", default="output/processed_data.json")
+    parser.add_argument("--work-dir", default="output/work", help="Where intermediate stage outputs are kept")
+    parser.add_argument("--force", action="store_true", help="Re-run stages even if their outputs are cached")
+    parser.add_argument("--cache-dir", help="Stage result cache shared across runs and time windows")
+    parser.add_argument("--cache-size-mb", type=int, default=256, help="LRU size bound for --cache-dir")
+    parser.add_argument("--profile", action="store_true",
+                        help="Record per-stage timings and memory; writes metrics.json and metrics.prom")
+    parser.add_argument("--cprofile", action="store_true", help="Also capture cProfile output per stage")
+    parser.add_argument("--log-level", default="INFO")
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    configure_logging(args.log_level)
+
+    from .instrumentation import Instrumentation
+    instrumentation = Instrumentation(enabled=args.profile, trace_memory=args.profile,
+                                      profile=args.cprofile, labels={"source": args.source})
+
+    if args.seed is not None:
+        random.seed(args.seed)
+        import numpy as np
+        np.random.seed(args.seed)
+
+    cache = None
+    if args.cache_dir:
+        from .stage_cache import StageCache
+        cache = StageCache(args.cache_dir, max_bytes=args.cache_size_mb << 20)
+
+    runner = StageRunner(args.work_dir, force=args.force)
+    raw_path = args.input or runner.path("tweets.jsonl")
+    scored_path = runner.path("scored.jsonl")
+    aggregate_path = runner.path("aggregates.json")
+    base_params = {"source": args.source, "query": args.query, "seed": args.seed}
+
+    if "generate" in args.stages and not args.input:
+        def generate():
+            with instrumentation.stage("generate", args.count):
+                save_tweets(generate_tweets(args), raw_path)
+        runner.run("generate", dict(base_params, count=args.count, days=args.days,
+                                    start_date=args.start_date, incident_date=args.incident_date),
+                   [], raw_path, generate)
+
+    # Chunks are seeded base_seed + i, so the chunking changes the scores too
+    score_params = dict(base_params, workers=args.workers, chunk_size=args.chunk_size)
+
+    if "analyze" in args.stages:
+        def score():
+            tweets = load_tweets(raw_path, args.records)
+            with instrumentation.stage("analyze", len(tweets)):
+                return analyze_tweets(tweets, args.source, args.workers, args.chunk_size, args.seed,
+                                      args.shared_memory)
+
+        def analyze():
+            if cache is None:
+                tweets = score()
+            else:
+                # Keyed on the raw file's bytes, so a hit skips parsing as well as scoring
+                from .stage_cache import fingerprint_file
+                tweets = cache.fetch("scoring", fingerprint_file(raw_path), score_params, score)
+            save_tweets(tweets, scored_path)
+        runner.run("analyze", score_params, [raw_path], scored_path, analyze)
+
+    if "aggregate" in args.stages:
+        # Scored tweets only count if the manifest ties them to this raw input; otherwise aggregate the input
+        if runner.is_current("analyze", score_params, [raw_path], scored_path):
+            upstream = scored_path
+        else:
+            if os.path.exists(scored_path):
+                logger.warning("Ignoring {}: not scored from the current {} with these params", scored_path, raw_path)
+            if not os.path.exists(raw_path):
+                parser.error(f"aggregate needs {raw_path}; run the generate stage or pass --input")
+            upstream = raw_path
+
+        def aggregate():
+            tweets = filter_window(load_tweets(upstream, args.records), args.since, args.until)
+            if not tweets:
+                logger.warning("No tweets in [{}, {}); aggregates will be empty", args.since, args.until)
+            fingerprint = None
+            if cache is not None:
+                from .stage_cache import fingerprint_file
+                fingerprint = f"{fingerprint_file(upstream)}:{args.since}:{args.until}"
+            results = aggregate_tweets(tweets, args, instrumentation, cache, fingerprint)
+            with open(aggregate_path, "w", encoding="utf-8") as f:
+                json.dump(results, f, ensure_ascii=False)
+        runner.run("aggregate", dict(base_params, since=args.since, until=args.until, count_mode=args.count_mode,
+                                     author_cap=args.author_cap, spikes=args.spikes,
+                                     bucket_minutes=args.bucket_minutes, incident_date=args.incident_date),
+                   [upstream], aggregate_path, aggregate)
+
+    if "export" in args.stages:
+        if not os.path.exists(aggregate_path):
+            parser.error(f"export needs {aggregate_path}; run the aggregate stage first")
+        with open(aggregate_path, encoding="utf-8") as f:
+            results = json.load(f)
+        for path in export_results(results, args.output, args.format):
+            logger.info("Exported {}", path)
+
+    if cache is not None:
+        logger.info("Stage cache: {}", cache.stats())
+    
+    if args.profile:
+        with open(runner.path("metrics.json"), "w") as f:
+            json.dump(instrumentation.snapshot(), f, indent=2)
+        with open(runner.path("metrics.prom"), "w") as f:
+            f.write(instrumentation.to_prometheus())
+        for name in instrumentation.stages:
+            report = instrumentation.profile_report(name)
+            if report:
+                with open(runner.path(f"profile_{name}.txt"), "w") as f:
+                    f.write(report)
+        logger.info("Wrote stage metrics to {}", runner.path("metrics.json"))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,14 +2,57 @@ import json
 import random
 from datetime import datetime, timedelta
 import numpy as np
-from collections import Counter
+from .author_activity import cap_author_posts
+from .categorical import POSITIVE, SENTIMENT_TYPES, UNKNOWN_LOCATION
+from .dedup import deduplicate, unique_voices
+from .engagement_metrics import compute_engagement_metrics
+from .instrumentation import NULL_INSTRUMENTATION
+from .lexicon import get_state_name
+from .sentiment_logging import configure_logging, get_logger
+from .quantile_sketch import ScoreDistributionTracker
+from .stage_cache import fingerprint_tweets
+from .topic_matrix import TopicMembership, positive_trend, term_matrix, topic_word_counts
+from .tweet_columns import TweetColumns
+
+logger = get_logger(__name__)
 
 class SentimentDataProcessor:
     """Process and analyze Twitter sentiment data"""
     
-    def __init__(self, query=None, data=None):
-        """Initialize with either a query to generate data or existing data"""
+    DATE_FORMAT = "%b %d"  # Timeline display dates
+    MIN_REGION_MENTIONS = 5  # Regions with fewer mentions are left out
+    AVG_FOLLOWERS = 500  # Reach assumed for tweets without a follower count
+    
+    def __init__(self, query=None, data=None, spike_detector=None, count_mode="raw", author_cap=None,
+                 instrumentation=None, cache=None, store=None, seen_ids=None, fingerprint=None):
+        """Initialize with either a query to generate data or existing data
+        
+        count_mode "raw" counts every tweet; "unique" collapses retweets and
+        near-duplicates so each duplicate group counts once. author_cap limits
+        how many tweets a single account contributes to the aggregations.
+        instrumentation records per-stage timings (disabled by default).
+        cache is an optional StageCache; timeline, wordcloud and region
+        results are reused from it when the input data is unchanged.
+        store is an optional TweetStore; processed tweets are appended to it
+        under the query, and process_window() answers past windows from it.
+        seen_ids is an optional TweetIdFilter; ingest() drops re-delivered tweets.
+        fingerprint is an optional digest of data computed by the caller
+        (e.g. of the file it was read from), used as the cache key instead
+        of serializing every tweet; ingest() discards it.
+        """
         self.query = query
+        self.spike_detector = spike_detector
+        self.count_mode = count_mode
+        self.author_cap = author_cap
+        self.author_tracker = None
+        self.instrumentation = instrumentation or NULL_INSTRUMENTATION
+        self.cache = cache
+        self.store = store
+        self.seen_ids = seen_ids
+        self.input_fingerprint = fingerprint
+        self._fingerprint = None
+        self._counted = None
+        self._columns = None
         
         if data:
             self.data = data
@@ -18,16 +61,24 @@ class SentimentDataProcessor:
         else:
             self.data = []
             
+        self._reset_sections()
+    
+    def _reset_sections(self):
+        """Empty every output section, as a run over no tweets leaves them"""
         self.processed_data = {
             "overview": {},
             "timeline": [],
             "wordcloud": [],
-            "regions": []
+            "regions": [],
+            "engagement": {},
+            "authors": {},
+            "distribution": {},
+            "spikes": []
         }
     
     def _generate_sample_data(self, count=1000, days=30):
         """Generate sample Twitter data for demonstration"""
-        print(f"Generating sample data for '{self.query}' with {count} tweets over {days} days")
+        logger.info("Generating sample data for '{}' with {} tweets over {} days", self.query, count, days)
         
         tweets = []
         end_date = datetime.now()
@@ -85,6 +136,8 @@ class SentimentDataProcessor:
                 "retweet_count": retweets,
                 "favorite_count": likes,
                 "reply_count": replies,
+                "user_id": int(np.random.zipf(1.3)),
+                "user_followers_count": int(np.random.lognormal(5.5, 1.2)),
                 "sentiment_type": sentiment_type,
                 "sentiment_score": sentiment_score
             }
@@ -96,34 +149,340 @@ class SentimentDataProcessor:
     def process_data(self):
         """Process the data and generate all required metrics"""
         if not self.data:
-            print("No data to process")
+            logger.info("No data to process")
+            self._reset_sections()
             return self.processed_data
         
-        print(f"Processing {len(self.data)} tweets")
+        logger.info("Processing {} tweets", len(self.data))
+        
+        stage = self.instrumentation.stage
+        rows = len(self.data)
+        
+        # Fingerprint the raw input so cached stage results can be matched
+        if self.cache is not None:
+            with stage("fingerprint", rows):
+                self._fingerprint = self.input_fingerprint or fingerprint_tweets(self.data)
+        
+        # Collapse copy-paste campaigns before counting unique voices
+        if self.count_mode == "unique":
+            with stage("dedup", rows):
+                deduplicate(self.data)
+        self._counted = None
+        self._columns = None
+        
+        # Select counted tweets, track authors and encode categorical fields
+        with stage("counting", rows):
+            self._counted_columns()
         
         # Process overview metrics
-        self._process_overview()
+        with stage("overview", rows):
+            self._process_overview()
         
         # Process timeline data
-        self._process_timeline()
+        with stage("timeline", rows):
+            self._cached_stage("timeline", self._process_timeline)
         
         # Process word cloud data
-        self._process_wordcloud()
+        with stage("wordcloud", rows):
+            self._cached_stage("wordcloud", self._process_wordcloud)
         
         # Process region data
-        self._process_regions()
+        with stage("regions", rows):
+            self._cached_stage("regions", self._process_regions)
+        
+        # Process distinct author counts
+        with stage("authors", rows):
+            self._process_authors()
+        
+        # Sentiment score quantiles and histograms per day and region
+        with stage("distribution", rows):
+            self._cached_stage("distribution", self._process_distribution)
+        
+        # Detect volume/sentiment spikes
+        if self.spike_detector:
+            with stage("spikes", rows):
+                self._process_spikes()
+        
+        # Persist the scored tweets for later window queries
+        if self.store is not None:
+            with stage("store", rows):
+                self.store.append(self.data, topic=self.query or "")
+        
+        return self.processed_data
+    
+    def process_window(self, since=None, until=None):
+        """Overview, timeline and region sections for a past window, from the store
+        
+        since/until are ISO dates or timestamps bounding [since, until).
+        Sections come from indexed queries over tweets stored by earlier
+        runs under this processor's query, not from self.data. count_mode is
+        honoured; author_cap is not, and distinct authors are exact.
+        """
+        if self.store is None:
+            raise ValueError("process_window needs a TweetStore (pass store=...)")
+        topic = self.query or ""
+        unique = self.count_mode == "unique"
+        
+        totals = self.store.totals(topic, since, until, unique, default_followers=self.AVG_FOLLOWERS)
+        total_tweets = totals["tweets"]
+        if not total_tweets:
+            logger.info("No stored tweets for '{}' in [{}, {})", topic, since, until)
+            self._reset_sections()
+            return self.processed_data
+        
+        positive_pct, negative_pct, neutral_pct = (round(totals[key] / total_tweets * 100)
+                                                   for key in ("positive", "negative", "neutral"))
+        (first_count, first_positive), (second_count, second_positive) = self.store.positive_halves(
+            topic, since, until, unique)
+        rising = first_count and second_count and second_positive / second_count > first_positive / first_count
+        trend = "up" if rising else "down"
+        self.processed_data["overview"] = {
+            "overall": positive_pct,
+            "totalMentions": total_tweets,
+            "positivePercentage": positive_pct,
+            "negativePercentage": negative_pct,
+            "neutralPercentage": neutral_pct,
+            "engagement": totals["engagement"],
+            "reachInMillions": round(totals["followers"] / 1000000, 1),
+            "distinctAuthors": totals["distinctAuthors"],
+            "trending": trend
+        }
+        
+        self.processed_data["timeline"] = [
+            {
+                "date": datetime.fromisoformat(day).strftime(self.DATE_FORMAT),
+                "positive": round(positive / (positive + negative + neutral) * 100),
+                "negative": round(negative / (positive + negative + neutral) * 100),
+                "neutral": round(neutral / (positive + negative + neutral) * 100),
+                "distinctAuthors": authors
+            }
+            for day, positive, negative, neutral, authors in self.store.by_day(topic, since, until, unique)
+        ]
+        
+        region_data = []
+        for location, positive, negative, neutral, authors in self.store.by_region(topic, since, until, unique):
+            total = positive + negative + neutral
+            if location == UNKNOWN_LOCATION or total < self.MIN_REGION_MENTIONS:
+                continue
+            region_data.append({
+                "id": location,
+                "name": self._get_state_name(location),
+                "sentiment": round(positive / total * 100),
+                "mentions": total,
+                "distinctAuthors": authors
+            })
+        region_data.sort(key=lambda x: x["mentions"], reverse=True)
+        self.processed_data["regions"] = region_data
         
+        logger.info("Answered window [{}, {}) for '{}' from the store: {} tweets", since, until, topic, total_tweets)
         return self.processed_data
     
+    def process_topics(self, queries, words=45):
+        """Overview, timeline, word cloud and regions for many queries in one pass
+        
+        Batch mode for backfills: instead of one processor and one full pass
+        per topic, every counted tweet is matched against all queries once
+        (see StandingQueryMatcher), giving a sparse tweet x topic membership
+        matrix. Each output is then a grouped aggregation over that matrix.
+        Returns {query: {"overview", "timeline", "wordcloud", "regions"}}.
+        Distinct author counts are exact here rather than sketched.
+        """
+        stage = self.instrumentation.stage
+        rows = len(self.data)
+        # One topic per distinct query, so membership topic ids line up with the results' order
+        queries = list(dict.fromkeys(queries))
+        results = {query: {"overview": {}, "timeline": [], "wordcloud": [], "regions": []} for query in queries}
+        if not self.data or not queries:
+            return results
+        
+        if self.count_mode == "unique":
+            with stage("dedup", rows):
+                deduplicate(self.data)
+        self._counted = None
+        self._columns = None
+        
+        with stage("counting", rows):
+            columns = self._counted_columns()
+            tweets = self._counted_tweets()
+            author_codes = {}
+            # Dense author codes for exact distinct counts; -1 where the author is unknown
+            authors = np.fromiter((-1 if t.get("user_id") is None else author_codes.setdefault(t["user_id"], len(author_codes))
+                                   for t in tweets), dtype=np.int64, count=len(tweets))
+        
+        with stage("membership", rows):
+            membership = TopicMembership.from_queries(tweets, queries)
+        logger.info("Matched {} tweets to {} topics ({} memberships)", len(tweets), len(queries), len(membership))
+        
+        with stage("topic_overview", len(membership)):
+            self._topic_overviews(results, membership, columns, authors)
+        with stage("topic_timeline", len(membership)):
+            self._topic_timelines(results, membership, columns, authors)
+        with stage("topic_regions", len(membership)):
+            self._topic_regions(results, membership, columns, authors)
+        with stage("topic_wordcloud", len(membership)):
+            self._topic_wordclouds(results, membership, tweets, columns, words)
+        
+        return results
+    
+    def _topic_overviews(self, results, membership, columns, authors):
+        """Per-topic overview metrics from grouped sums over the membership matrix"""
+        type_count = len(SENTIMENT_TYPES)
+        sentiments = membership.counts(columns["sentiment_type"].astype(np.int64), type_count)
+        zeros = np.zeros(len(columns), dtype=np.int64)
+        engagement = membership.counts(zeros, 1, weights=(columns["retweet_count"] + columns["favorite_count"]
+                                                         + columns["reply_count"]).astype(np.float64))[:, 0]
+        followers = columns["user_followers_count"]
+        reach = membership.counts(zeros, 1, weights=np.where(np.isnan(followers), self.AVG_FOLLOWERS, followers))[:, 0]
+        distinct = membership.distinct(zeros, 1, authors)[:, 0]
+        trends = positive_trend(membership, columns["sentiment_type"])
+        
+        for topic, query in enumerate(results):
+            total = int(sentiments[topic].sum())
+            if not total:
+                continue
+            positive_pct, negative_pct, neutral_pct = (round(count / total * 100) for count in sentiments[topic])
+            results[query]["overview"] = {
+                "overall": positive_pct,
+                "totalMentions": total,
+                "positivePercentage": positive_pct,
+                "negativePercentage": negative_pct,
+                "neutralPercentage": neutral_pct,
+                "engagement": int(engagement[topic]),
+                "reachInMillions": round(float(reach[topic]) / 1000000, 1),
+                "distinctAuthors": int(distinct[topic]),
+                "trending": str(trends[topic])
+            }
+    
+    def _topic_timelines(self, results, membership, columns, authors):
+        """Per-topic daily sentiment percentages from one topic x day x type count"""
+        type_count = len(SENTIMENT_TYPES)
+        day_count = len(columns.days)
+        counts = membership.counts(columns["day"].astype(np.int64) * type_count + columns["sentiment_type"],
+                                   day_count * type_count).reshape(-1, day_count, type_count)
+        distinct = membership.distinct(columns["day"].astype(np.int64), day_count, authors)
+        display_dates = [datetime.fromisoformat(day).strftime(self.DATE_FORMAT) for day in columns.days]
+        
+        for topic, query in enumerate(results):
+            timeline_data = []
+            for day in np.flatnonzero(counts[topic].sum(axis=1)):
+                positive, negative, neutral = counts[topic, day]
+                total = positive + negative + neutral
+                timeline_data.append({
+                    "date": display_dates[day],
+                    "positive": round(positive / total * 100),
+                    "negative": round(negative / total * 100),
+                    "neutral": round(neutral / total * 100),
+                    "distinctAuthors": int(distinct[topic, day])
+                })
+            results[query]["timeline"] = timeline_data
+    
+    def _topic_regions(self, results, membership, columns, authors):
+        """Per-topic region sentiment from topic x location counts"""
+        location_count = len(columns.locations)
+        locations = columns["location"].astype(np.int64)
+        mentions = membership.counts(locations, location_count)
+        positives = membership.counts(locations, location_count,
+                                      weights=(columns["sentiment_type"] == POSITIVE).astype(np.float64))
+        distinct = membership.distinct(locations, location_count, authors)
+        
+        for topic, query in enumerate(results):
+            region_data = []
+            for code in np.flatnonzero(mentions[topic] >= self.MIN_REGION_MENTIONS):
+                location = columns.locations[code]
+                if location == UNKNOWN_LOCATION:
+                    continue
+                total = int(mentions[topic, code])
+                region_data.append({
+                    "id": location,
+                    "name": self._get_state_name(location),
+                    "sentiment": round(positives[topic, code] / total * 100),
+                    "mentions": total,
+                    "distinctAuthors": int(distinct[topic, code])
+                })
+            region_data.sort(key=lambda x: x["mentions"], reverse=True)
+            results[query]["regions"] = region_data
+    
+    def _topic_wordclouds(self, results, membership, tweets, columns, words):
+        """Per-topic top words from the sparse topic x word product"""
+        indptr, word_ids, vocabulary = term_matrix(tweets)
+        topics, word_codes, counts, sentiments = topic_word_counts(
+            membership, indptr, word_ids, len(vocabulary), columns["sentiment_type"])
+        
+        # Entries are grouped by topic; take each topic's most frequent words
+        order = np.lexsort((word_codes, -counts, topics))
+        bounds = np.searchsorted(topics[order], np.arange(len(results) + 1))
+        for topic, query in enumerate(results):
+            top = order[bounds[topic]:bounds[topic + 1]][:words]
+            results[query]["wordcloud"] = [
+                {"text": vocabulary[word_codes[i]], "value": int(counts[i]), "sentiment": SENTIMENT_TYPES[sentiments[i]]}
+                for i in top.tolist()
+            ]
+    
+    def ingest(self, tweets):
+        """Append streamed tweets and return any spike events they trigger
+        
+        With seen_ids (a TweetIdFilter), tweets already delivered are dropped first.
+        """
+        if self.seen_ids is not None:
+            tweets = self.seen_ids.filter(tweets)
+        self.data.extend(tweets)
+        self.input_fingerprint = None
+        if not self.spike_detector:
+            return []
+        
+        events = self.spike_detector.update_many(tweets)
+        self.processed_data["spikes"].extend(events)
+        return events
+    
+    def _cached_stage(self, name, compute):
+        """Fill processed_data[name], reusing the cached result for unchanged input and params"""
+        if self.cache is None:
+            compute()
+            return
+        
+        def run():
+            compute()
+            return self.processed_data[name]
+        
+        self.processed_data[name] = self.cache.fetch(name, self._fingerprint, self._stage_params(), run)
+    
+    def _stage_params(self):
+        """Everything besides the input tweets that shapes a cached stage result"""
+        return {
+            "processor": type(self).__name__,
+            "count_mode": self.count_mode,
+            "author_cap": self.author_cap,
+            "date_format": self.DATE_FORMAT,
+            "min_region_mentions": self.MIN_REGION_MENTIONS,
+            "avg_followers": self.AVG_FOLLOWERS
+        }
+    
+    def _distinct_authors(self, sketches, key):
+        """Approximate distinct authors in one aggregation bucket"""
+        sketch = sketches.get(key)
+        return sketch.count() if sketch else 0
+    
+    def _counted_tweets(self):
+        """Tweets counted by the aggregations: raw or unique voices, capped per author"""
+        if self._counted is None:
+            tweets = unique_voices(self.data) if self.count_mode == "unique" else self.data
+            self._counted, self.author_tracker = cap_author_posts(tweets, self.author_cap)
+        return self._counted
+    
+    def _counted_columns(self):
+        """Counted tweets as columns, categorical fields encoded once as integer codes"""
+        if self._columns is None:
+            self._columns = TweetColumns.from_tweets(self._counted_tweets())
+        return self._columns
+    
     def _process_overview(self):
         """Process overview metrics"""
-        total_tweets = len(self.data)
+        columns = self._counted_columns()
+        total_tweets = len(columns)
+        types = columns["sentiment_type"]
         
-        # Count sentiment types
-        sentiment_counts = Counter(tweet["sentiment_type"] for tweet in self.data)
-        positive_count = sentiment_counts.get("positive", 0)
-        negative_count = sentiment_counts.get("negative", 0)
-        neutral_count = sentiment_counts.get("neutral", 0)
+        # Count sentiment types by integer code
+        positive_count, negative_count, neutral_count = np.bincount(types, minlength=len(SENTIMENT_TYPES))
         
         # Calculate percentages
         positive_pct = round((positive_count / total_tweets) * 100)
@@ -133,23 +492,18 @@ class SentimentDataProcessor:
         # Calculate overall sentiment score (0-100)
         overall_sentiment = round(positive_pct)
         
-        # Calculate engagement metrics
-        total_retweets = sum(tweet.get("retweet_count", 0) for tweet in self.data)
-        total_likes = sum(tweet.get("favorite_count", 0) for tweet in self.data)
-        total_replies = sum(tweet.get("reply_count", 0) for tweet in self.data)
-        total_engagement = total_retweets + total_likes + total_replies
-        
-        # Estimate reach (very rough estimate)
-        avg_followers = 500  # Assumption
-        potential_reach = round(total_tweets * avg_followers / 1000000, 1)  # In millions
+        # Calculate engagement and reach (per-user followers, 500 where unknown)
+        engagement = compute_engagement_metrics(columns, avg_followers=self.AVG_FOLLOWERS)
+        total_engagement = engagement["totals"]["engagement"]
+        potential_reach = engagement["totals"]["reachInMillions"]
+        self.processed_data["engagement"] = engagement
         
         # Determine trend (comparing first half to second half)
-        mid_point = len(self.data) // 2
-        first_half = self.data[:mid_point]
-        second_half = self.data[mid_point:]
+        mid_point = total_tweets // 2
+        positive = types == POSITIVE
         
-        first_half_positive = sum(1 for t in first_half if t["sentiment_type"] == "positive") / len(first_half)
-        second_half_positive = sum(1 for t in second_half if t["sentiment_type"] == "positive") / len(second_half)
+        first_half_positive = np.count_nonzero(positive[:mid_point]) / mid_point
+        second_half_positive = np.count_nonzero(positive[mid_point:]) / (total_tweets - mid_point)
         
         trend = "up" if second_half_positive > first_half_positive else "down"
         
@@ -162,41 +516,38 @@ class SentimentDataProcessor:
             "neutralPercentage": neutral_pct,
             "engagement": total_engagement,
             "reachInMillions": potential_reach,
+            "distinctAuthors": self.author_tracker.total_authors.count(),
             "trending": trend
         }
         
-        print(f"Overall sentiment: {overall_sentiment}% positive")
+        logger.info("Overall sentiment: {}% positive", overall_sentiment)
     
     def _process_timeline(self):
         """Process timeline data"""
-        # Group tweets by day
-        tweets_by_day = {}
-        for tweet in self.data:
-            day = tweet["created_at"].split("T")[0]
-            if day not in tweets_by_day:
-                tweets_by_day[day] = []
-            tweets_by_day[day].append(tweet)
+        columns = self._counted_columns()
+        # Count sentiment codes per day in one pass
+        type_count = len(SENTIMENT_TYPES)
+        counts = np.bincount(columns["day"] * type_count + columns["sentiment_type"],
+                             minlength=len(columns.days) * type_count).reshape(-1, type_count)
         
         # Calculate sentiment percentages for each day
         timeline_data = []
-        for day, day_tweets in sorted(tweets_by_day.items()):
-            positive = sum(1 for t in day_tweets if t["sentiment_type"] == "positive")
-            negative = sum(1 for t in day_tweets if t["sentiment_type"] == "negative")
-            neutral = sum(1 for t in day_tweets if t["sentiment_type"] == "neutral")
-            total = len(day_tweets)
+        for day, (positive, negative, neutral) in zip(columns.days, counts):
+            total = positive + negative + neutral
             
             # Format date for display (Jun 1, Jun 2, etc.)
-            display_date = datetime.fromisoformat(day).strftime("%b %d")
+            display_date = datetime.fromisoformat(day).strftime(self.DATE_FORMAT)
             
             timeline_data.append({
                 "date": display_date,
                 "positive": round(positive / total * 100),
                 "negative": round(negative / total * 100),
-                "neutral": round(neutral / total * 100)
+                "neutral": round(neutral / total * 100),
+                "distinctAuthors": self._distinct_authors(self.author_tracker.authors_by_day, day)
             })
         
         self.processed_data["timeline"] = timeline_data
-        print(f"Generated timeline data for {len(timeline_data)} days")
+        logger.info("Generated timeline data for {} days", len(timeline_data))
     
     def _process_wordcloud(self):
         """Process word cloud data"""
@@ -253,27 +604,25 @@ class SentimentDataProcessor:
         wordcloud_data.sort(key=lambda x: x["value"], reverse=True)
         
         self.processed_data["wordcloud"] = wordcloud_data
-        print(f"Generated word cloud data with {len(wordcloud_data)} terms")
+        logger.info("Generated word cloud data with {} terms", len(wordcloud_data))
     
     def _process_regions(self):
         """Process region-based sentiment data"""
-        # Group tweets by location
-        tweets_by_location = {}
-        for tweet in self.data:
-            location = tweet.get("user_location", "Unknown")
-            if location not in tweets_by_location:
-                tweets_by_location[location] = []
-            tweets_by_location[location].append(tweet)
+        columns = self._counted_columns()
+        # Count mentions and positive tweets per location code
+        locations = columns["location"]
+        mentions = np.bincount(locations, minlength=len(columns.locations))
+        positives = np.bincount(locations, weights=columns["sentiment_type"] == POSITIVE,
+                                minlength=len(columns.locations))
         
         # Calculate sentiment for each location
         region_data = []
-        for location, location_tweets in tweets_by_location.items():
-            if location == "Unknown" or len(location_tweets) < 5:
+        for code, location in enumerate(columns.locations):
+            total = int(mentions[code])
+            if location == UNKNOWN_LOCATION or total < self.MIN_REGION_MENTIONS:
                 continue
-                
-            positive = sum(1 for t in location_tweets if t["sentiment_type"] == "positive")
-            total = len(location_tweets)
-            sentiment_score = round(positive / total * 100)
+            
+            sentiment_score = round(positives[code] / total * 100)
             
             # Get full state name
             state_name = self._get_state_name(location)
@@ -282,37 +631,53 @@ class SentimentDataProcessor:
                 "id": location,
                 "name": state_name,
                 "sentiment": sentiment_score,
-                "mentions": total
+                "mentions": total,
+                "distinctAuthors": self._distinct_authors(self.author_tracker.authors_by_region, location)
             })
         
         # Sort by number of mentions
         region_data.sort(key=lambda x: x["mentions"], reverse=True)
         
         self.processed_data["regions"] = region_data
-        print(f"Generated region data for {len(region_data)} regions")
+        logger.info("Generated region data for {} regions", len(region_data))
+    
+    def _process_authors(self):
+        """Report distinct authors per day and region from the bounded author sketches"""
+        tracker = self.author_tracker
+        self.processed_data["authors"] = {
+            "distinctAuthors": tracker.total_authors.count(),
+            "byDay": tracker.distinct_authors_by_day(),
+            "byRegion": tracker.distinct_authors_by_region(),
+            "countedTweets": len(self._counted),
+            "sketches": tracker.sketches()
+        }
+        logger.info("Estimated {} distinct authors", self.processed_data['authors']['distinctAuthors'])
+    
+    def _process_distribution(self):
+        """Summarize sentiment scores with mergeable quantile sketches per day and region"""
+        tracker = ScoreDistributionTracker()
+        tracker.add_columns(self._counted_columns())
+        self.processed_data["distribution"] = tracker.summary()
+        logger.info("Sketched score distributions for {} days and {} regions", len(tracker.by_day), len(tracker.by_region))
+    
+    def _process_spikes(self):
+        """Replay the data in time order through the spike detector"""
+        # A local copy with the same options: tweets ingest() already fed are not counted
+        # twice, and the caller's detector keeps its own streamed state
+        detector = self.spike_detector.fresh_copy()
+        detector.update_many(sorted(self.data, key=lambda t: t["created_at"]))
+        detector.flush()
+        
+        self.processed_data["spikes"] = list(detector.events)
+        logger.info("Detected {} sentiment/volume spikes", len(detector.events))
     
     def _get_state_name(self, state_code):
         """Convert state code to full name"""
-        state_names = {
-            "CA": "California",
-            "TX": "Texas",
-            "FL": "Florida",
-            "NY": "New York",
-            "PA": "Pennsylvania",
-            "IL": "Illinois",
-            "OH": "Ohio",
-            "GA": "Georgia",
-            "NC": "North Carolina",
-            "MI": "Michigan",
-            "NJ": "New Jersey",
-            "VA": "Virginia",
-            "WA": "Washington",
-            "AZ": "Arizona",
-            "MA": "Massachusetts"
-        }
-        return state_names.get(state_code, state_code)
+        return get_state_name(state_code)
 
 def main():
+    configure_logging()
+    
     # Example usage
     processor = SentimentDataProcessor(query="climate policy")
     results = processor.process_data()
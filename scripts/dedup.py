@@ -0,0 +1,165 @@
+import hashlib
+import re
+import zlib
+import numpy as np
+from .sentiment_logging import get_logger
+
+logger = get_logger(__name__)
+
+MERSENNE_PRIME = (1 << 61) - 1
+MAX_HASH = (1 << 32) - 1
+
+RETWEET_PREFIX = re.compile(r"^rt @\w+:?\s*")
+URL_OR_MENTION = re.compile(r"https?://\S+|@\w+")
+WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text):
+    """Normalize tweet text so retweets and copy-paste variants compare equal"""
+    text = RETWEET_PREFIX.sub("", text.lower())
+    text = URL_OR_MENTION.sub(" ", text)
+    return WHITESPACE.sub(" ", text).strip()
+
+
+def exact_hash(text):
+    """64-bit digest of normalized text for exact-duplicate grouping"""
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest()
+
+
+class MinHasher:
+    """MinHash signatures over character shingles"""
+
+    def __init__(self, num_perm=64, shingle_size=5, seed=1):
+        rng = np.random.RandomState(seed)
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.a = rng.randint(1, MAX_HASH, size=num_perm, dtype=np.uint64)
+        self.b = rng.randint(0, MAX_HASH, size=num_perm, dtype=np.uint64)
+
+    def shingles(self, text):
+        """32-bit hashes of the character k-grams of a normalized text"""
+        k = self.shingle_size
+        if len(text) <= k:
+            grams = {text}
+        else:
+            grams = {text[i:i + k] for i in range(len(text) - k + 1)}
+        return np.fromiter((zlib.crc32(g.encode("utf-8")) for g in grams), dtype=np.uint64, count=len(grams))
+
+    def signature(self, text):
+        """MinHash signature of a normalized text"""
+        return self.signatures([text])[0]
+
+    def signatures(self, texts, chunk_size=200000):
+        """MinHash signatures for many texts, vectorized over shingle chunks"""
+        shingle_sets = [self.shingles(text) for text in texts]
+        lengths = np.array([len(hashes) for hashes in shingle_sets], dtype=np.int64)
+        offsets = np.concatenate(([0], np.cumsum(lengths)))
+        all_hashes = np.concatenate(shingle_sets) if shingle_sets else np.empty(0, dtype=np.uint64)
+        result = np.empty((len(texts), self.num_perm), dtype=np.uint64)
+
+        start = 0
+        while start < len(texts):
+            # Take whole texts until the chunk holds about chunk_size shingles
+            stop = int(np.searchsorted(offsets, offsets[start] + chunk_size, side="right")) - 1
+            stop = min(max(stop, start + 1), len(texts))
+            hashes = all_hashes[offsets[start]:offsets[stop]]
+            # a, b and the shingle hashes are all < 2**32, so a * h + b cannot overflow
+            permuted = (np.outer(self.a, hashes) + self.b[:, None]) % MERSENNE_PRIME & MAX_HASH
+            result[start:stop] = np.minimum.reduceat(permuted, offsets[start:stop] - offsets[start], axis=1).T
+            start = stop
+
+        return result
+
+
+def _find(parent, i):
+    """Union-find root lookup with path halving"""
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+
+def deduplicate(tweets, threshold=0.8, num_perm=64, bands=16, shingle_size=5):
+    """Group exact and near-duplicate tweets and mark a canonical tweet per group
+
+    Exact duplicates (after normalization, so retweets included) are grouped
+    by hash. One representative per exact group is MinHashed and banded into
+    LSH buckets; candidates whose estimated Jaccard similarity reaches the
+    threshold are merged. Each tweet gets "dup_group" (the canonical tweet's
+    id), "dup_count" on the canonical tweet, and "is_canonical".
+    Returns the number of groups.
+    """
+    if not tweets:
+        return 0
+
+    rows_per_band = num_perm // bands
+    min_agreement = threshold * num_perm
+    hasher = MinHasher(num_perm=num_perm, shingle_size=shingle_size)
+
+    # Exact stage: collapse identical normalized texts
+    exact_groups = {}
+    representatives = []
+    texts = []
+    member_of = []
+    for index, tweet in enumerate(tweets):
+        text = normalize_text(tweet["text"])
+        digest = exact_hash(text)
+        group = exact_groups.get(digest)
+        if group is None:
+            group = exact_groups[digest] = len(representatives)
+            representatives.append(index)
+            texts.append(text)
+        member_of.append(group)
+
+    # Near-duplicate stage: LSH over one signature per exact group
+    parent = list(range(len(representatives)))
+    signatures = hasher.signatures(texts)
+    buckets = {}
+    for group in range(len(texts)):
+        signature = signatures[group]
+        for band in range(bands):
+            key = (band, signature[band * rows_per_band:(band + 1) * rows_per_band].tobytes())
+            members = buckets.setdefault(key, [])
+            # Per union-find root keep only its first and latest member, so a burst of
+            # near-duplicates stays two entries while drifting variants still chain together
+            heads = {}
+            for other in members:
+                heads.setdefault(_find(parent, other), []).append(other)
+            members[:] = [other for kept in heads.values() for other in dict.fromkeys((kept[0], kept[-1]))]
+            root = _find(parent, group)
+            others = [other for other in members if _find(parent, other) != root]
+            if others:
+                agreement = np.count_nonzero(signatures[others] == signature, axis=1)
+                for other in np.asarray(others)[agreement >= min_agreement]:
+                    root, other_root = _find(parent, group), _find(parent, int(other))
+                    if root != other_root:
+                        parent[root] = other_root
+            members.append(group)
+
+    # Pick the earliest tweet in each group as canonical
+    canonical = {}
+    for index, group in enumerate(member_of):
+        root = _find(parent, group)
+        current = canonical.get(root)
+        if current is None or tweets[index]["created_at"] < tweets[current]["created_at"]:
+            canonical[root] = index
+
+    sizes = {}
+    for index, group in enumerate(member_of):
+        root = _find(parent, group)
+        canonical_tweet = tweets[canonical[root]]
+        tweet = tweets[index]
+        tweet["dup_group"] = canonical_tweet["id"]
+        tweet["is_canonical"] = index == canonical[root]
+        sizes[root] = sizes.get(root, 0) + 1
+
+    for root, index in canonical.items():
+        tweets[index]["dup_count"] = sizes[root]
+
+    logger.info("Collapsed {} tweets into {} unique groups", len(tweets), len(canonical))
+    return len(canonical)
+
+
+def unique_voices(tweets):
+    """Canonical tweets only; tweets never deduplicated count as unique"""
+    return [t for t in tweets if t.get("is_canonical", True)]
@@ -0,0 +1,112 @@
+import numpy as np
+from .tweet_columns import TweetColumns
+
+PERCENTILES = [50, 90, 99]
+
+
+def group_percentiles(groups, values, group_count, percentiles=PERCENTILES):
+    """Per-group percentiles (nearest rank) using one sort over all rows"""
+    result = np.zeros((group_count, len(percentiles)))
+    if len(values) == 0:
+        return result
+
+    order = np.lexsort((values, groups))
+    sorted_values = values[order]
+    sizes = np.bincount(groups, minlength=group_count)
+    starts = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+
+    for j, pct in enumerate(percentiles):
+        offsets = np.ceil(sizes * pct / 100.0).astype(np.int64) - 1
+        index = starts + np.clip(offsets, 0, None)
+        has_rows = sizes > 0
+        result[has_rows, j] = sorted_values[index[has_rows]]
+
+    return result
+
+
+def _grouped_engagement(groups, group_count, retweets, likes, replies, engagement, scores):
+    """Engagement totals, percentiles and weighted sentiment per group"""
+    weights = engagement + 1.0
+    weight_totals = np.bincount(groups, weights=weights, minlength=group_count)
+    weighted_scores = np.bincount(groups, weights=scores * weights, minlength=group_count)
+
+    return {
+        "tweets": np.bincount(groups, minlength=group_count),
+        "retweets": np.bincount(groups, weights=retweets, minlength=group_count),
+        "likes": np.bincount(groups, weights=likes, minlength=group_count),
+        "replies": np.bincount(groups, weights=replies, minlength=group_count),
+        "percentiles": group_percentiles(groups, engagement, group_count),
+        "weighted_sentiment": np.divide(weighted_scores, weight_totals,
+                                        out=np.zeros(group_count), where=weight_totals > 0)
+    }
+
+
+def _group_rows(labels, grouped, key_name):
+    """Convert grouped arrays into the row dicts used by the dashboard panels"""
+    rows = []
+    for i, label in enumerate(labels):
+        if not grouped["tweets"][i]:
+            continue
+        p50, p90, p99 = grouped["percentiles"][i]
+        rows.append({
+            key_name: label,
+            "tweets": int(grouped["tweets"][i]),
+            "retweets": int(grouped["retweets"][i]),
+            "likes": int(grouped["likes"][i]),
+            "replies": int(grouped["replies"][i]),
+            "p50": float(p50),
+            "p90": float(p90),
+            "p99": float(p99),
+            "weightedSentiment": round(float(grouped["weighted_sentiment"][i]), 3)
+        })
+    return rows
+
+
+def compute_engagement_metrics(tweets, avg_followers=500):
+    """Compute engagement and reach metrics in one vectorized pass
+
+    Accepts tweet dicts or a TweetColumns instance. Reach sums per-user
+    follower counts, using avg_followers only where a tweet has none.
+    """
+    columns = tweets if isinstance(tweets, TweetColumns) else TweetColumns.from_tweets(tweets)
+    if len(columns) == 0:
+        return {"totals": {}, "byDay": [], "byHour": [], "byRegion": []}
+
+    retweets = columns["retweet_count"]
+    likes = columns["favorite_count"]
+    replies = columns["reply_count"]
+    scores = columns["sentiment_score"]
+    engagement = (retweets + likes + replies).astype(np.float64)
+    weights = engagement + 1.0
+
+    followers = columns["user_followers_count"]
+    followers = np.where(np.isnan(followers), avg_followers, followers)
+
+    totals = {
+        "retweets": int(retweets.sum()),
+        "likes": int(likes.sum()),
+        "replies": int(replies.sum()),
+        "engagement": int(engagement.sum()),
+        "engagementWeightedSentiment": round(float((scores * weights).sum() / weights.sum()), 3),
+        "meanSentiment": round(float(scores.mean()), 3),
+        "reachInMillions": round(float(followers.sum()) / 1000000, 1)
+    }
+    p50, p90, p99 = np.percentile(engagement, PERCENTILES)
+    totals.update({"p50": float(p50), "p90": float(p90), "p99": float(p99)})
+
+    by_day = _grouped_engagement(columns["day"], len(columns.days),
+                                 retweets, likes, replies, engagement, scores)
+    by_hour = _grouped_engagement(columns["hour"].astype(np.int64), 24,
+                                  retweets, likes, replies, engagement, scores)
+    by_region = _grouped_engagement(columns["location"], len(columns.locations),
+                                    retweets, likes, replies, engagement, scores)
+
+    region_rows = _group_rows(columns.locations, by_region, "region")
+    region_rows.sort(key=lambda x: (-x["tweets"], x["region"]))
+
+    return {
+        "totals": totals,
+        "byDay": _group_rows(columns.days, by_day, "date"),
+        "byHour": _group_rows(list(range(24)), by_hour, "hour"),
+        "byRegion": region_rows
+    }
@@ -0,0 +1,95 @@
+import base64
+import hashlib
+import numpy as np
+
+
+def hash64(value):
+    """Stable 64-bit hash of a user id or other key"""
+    return int.from_bytes(hashlib.blake2b(str(value).encode("utf-8"), digest_size=8).digest(), "little")
+
+
+class HyperLogLog:
+    """Approximate distinct counter using 2**precision one-byte registers"""
+
+    def __init__(self, precision=12):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def add(self, value):
+        """Add one value (hashed with hash64)"""
+        self.add_hash(hash64(value))
+
+    def add_hash(self, hashed):
+        """Add a precomputed 64-bit hash"""
+        remaining_bits = 64 - self.precision
+        index = hashed >> remaining_bits
+        rest = hashed & ((1 << remaining_bits) - 1)
+        rank = remaining_bits - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def add_hashes(self, hashed):
+        """Add an array of precomputed 64-bit hashes (uint64) in one vectorized pass"""
+        remaining_bits = 64 - self.precision
+        hashed = np.asarray(hashed, dtype=np.uint64)
+        index = (hashed >> np.uint64(remaining_bits)).astype(np.intp)
+        rest = hashed & np.uint64((1 << remaining_bits) - 1)
+        # Exact bit_length of rest by binary search over shifts
+        length = np.zeros(len(rest), dtype=np.int64)
+        for shift in (32, 16, 8, 4, 2, 1):
+            high = rest >> np.uint64(shift)
+            wide = high != 0
+            length += shift * wide
+            rest = np.where(wide, high, rest)
+        length += rest != 0
+        rank = (remaining_bits - length + 1).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+
+    def count(self):
+        """Estimated number of distinct values added"""
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int32)))
+
+        # Small-range correction: fall back to linear counting
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * np.log(m / zeros)
+        return int(round(estimate))
+
+    def merge(self, other):
+        """Fold another sketch (e.g. another shard or time range) into this one"""
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge HyperLogLog sketches with different precision")
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    @classmethod
+    def union(cls, sketches, precision=12):
+        """New sketch counting the distinct values across all given sketches"""
+        sketches = list(sketches)
+        result = cls(sketches[0].precision if sketches else precision)
+        for sketch in sketches:
+            result.merge(sketch)
+        return result
+
+    def to_bytes(self):
+        """Serialize as one precision byte followed by the registers"""
+        return bytes([self.precision]) + self.registers.tobytes()
+
+    @classmethod
+    def from_bytes(cls, data):
+        sketch = cls(data[0])
+        sketch.registers[:] = np.frombuffer(data, dtype=np.uint8, offset=1)
+        return sketch
+
+    def to_base64(self):
+        """JSON-safe form for shipping sketches between shards"""
+        return base64.b64encode(self.to_bytes()).decode("ascii")
+
+    @classmethod
+    def from_base64(cls, text):
+        return cls.from_bytes(base64.b64decode(text))
+
+    def __len__(self):
+        return self.count()
@@ -0,0 +1,110 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+from .sentiment_logging import configure_logging, get_logger
+
+logger = get_logger(__name__)
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+PACKAGE = os.path.basename(SCRIPTS_DIR)
+
+HEAVY_MODULES = ["numpy", "matplotlib", "textblob"]
+
+# Heavy modules each import is allowed to load; anything else is a regression
+IMPORT_BUDGETS = {
+    "lexicon": [],
+    "categorical": [],
+    "sentiment_logging": [],
+    "stage_cache": [],
+    "tweet_record": [],
+    "ingest_pipeline": [],
+    "query_language": [],
+    "twitter_sentiment": [],
+    "urdu_sentiment_analysis": [],
+    "pakistan_sentiment_analysis": [],
+    "spike_detector": [],
+    "instrumentation": [],
+    "scoring": [],
+    "cli": [],
+    "data_processor": ["numpy"],
+    "pakistan_data_processor": ["numpy"],
+    "tweet_columns": ["numpy"],
+    "engagement_metrics": ["numpy"],
+    "hyperloglog": ["numpy"],
+    "author_activity": ["numpy"],
+    "dedup": ["numpy"],
+    "text_index": ["numpy"],
+    "tweet_search": ["numpy"],
+    "standing_queries": ["numpy"],
+    "topic_matrix": ["numpy"],
+    "quantile_sketch": ["numpy"],
+    "shared_columns": ["numpy"],
+    "tweet_store": [],
+    "streaming_aggregator": ["numpy"],
+    "checkpoint": [],
+    "bloom_filter": ["numpy"],
+    "sentiment_classifier": ["numpy"],
+    "plotting": ["numpy"],
+    "benchmark": ["numpy"]
+}
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+heavy = sorted(name for name in {heavy!r} if name in sys.modules)
+print(json.dumps({{"seconds": elapsed, "loaded": heavy}}))
+"""
+
+
+def measure_import(module, repeat=5):
+    """Import a module in fresh interpreters; returns best time and heavy modules loaded"""
+    best = None
+    loaded = []
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, "-c", PROBE.format(module=f"{PACKAGE}.{module}", heavy=HEAVY_MODULES)],
+            cwd=os.path.dirname(SCRIPTS_DIR), capture_output=True, text=True, check=True
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        loaded = result["loaded"]
+        best = result["seconds"] if best is None else min(best, result["seconds"])
+    return {"module": module, "seconds": round(best, 4), "loaded": loaded}
+
+
+def run_import_benchmark(budgets=IMPORT_BUDGETS, repeat=5):
+    """Measure every module and report those that load heavy modules beyond budget"""
+    results = []
+    for module, allowed in budgets.items():
+        result = measure_import(module, repeat)
+        result["unexpected"] = [name for name in result["loaded"] if name not in allowed]
+        results.append(result)
+        logger.info("   {:<30} {:>8.1f} ms  loads: {}", module, result["seconds"] * 1000,
+                    ", ".join(result["loaded"]) or "-")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure import time of the sentiment scripts")
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh interpreters per module (best time kept)")
+    parser.add_argument("--output", help="Optional JSON file for the results")
+    args = parser.parse_args()
+    configure_logging()
+
+    results = run_import_benchmark(repeat=args.repeat)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    violations = [r for r in results if r["unexpected"]]
+    for result in violations:
+        logger.error("{} unexpectedly imports {}", result["module"], ", ".join(result["unexpected"]))
+    if violations:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,297 @@
+import abc
+import asyncio
+import json
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from .sentiment_logging import configure_logging, get_logger
+from .tweet_record import parse_created_at
+
+logger = get_logger(__name__)
+
+
+_DONE = None  # Queue sentinel
+
+
+class TweetSource(abc.ABC):
+    """Pluggable tweet source: an async generator of tweet batches
+
+    Subclasses implement batches(batch_size). The pipeline only pulls the
+    next batch when its first queue has room, so a source never runs more
+    than queue_size batches ahead of scoring.
+    """
+
+    @abc.abstractmethod
+    def batches(self, batch_size):
+        """Async iterator of tweet lists, each at most batch_size long"""
+
+
+class FileReplaySource(TweetSource):
+    """Replay a JSON-lines (or JSON array) tweet file
+
+    speed=None replays as fast as downstream accepts; otherwise gaps
+    between created_at timestamps are replayed divided by speed (speed=60
+    plays an hour of tweets per minute).
+    """
+
+    def __init__(self, path, speed=None):
+        self.path = path
+        self.speed = speed
+
+    def _rows(self):
+        with open(self.path, encoding="utf-8") as f:
+            if self.path.endswith(".json"):
+                yield from json.load(f)
+                return
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+    async def batches(self, batch_size):
+        batch = []
+        previous = None
+        for tweet in self._rows():
+            if self.speed:
+                created_at = parse_created_at(tweet.get("created_at"))
+                if previous is not None and created_at and created_at > previous:
+                    await asyncio.sleep((created_at - previous).total_seconds() / self.speed)
+                previous = created_at or previous
+            batch.append(tweet)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+
+class MockStreamSource(TweetSource):
+    """Local stand-in for the Twitter streaming API
+
+    Draws tweets from a simulator (simulate_pakistan_twitter_data by default)
+    at roughly rate tweets/second until count tweets have been produced
+    (count=None streams until cancelled; rate=None does not throttle).
+    Like a live stream, tweets arrive in time order: created_at starts at
+    start (default now, UTC) and advances by interval seconds per tweet
+    (default 1/rate, i.e. real time). Ids keep increasing across batches.
+    """
+
+    def __init__(self, rate=1000, count=None, start=None, interval=None, simulate=None, **simulate_options):
+        if simulate is None:
+            from .pakistan_sentiment_analysis import simulate_pakistan_twitter_data
+            simulate = simulate_pakistan_twitter_data
+        self.rate = rate
+        self.count = count
+        self.start = parse_created_at(start) or datetime.now(timezone.utc).replace(tzinfo=None)
+        self.interval = interval if interval is not None else (1.0 / rate if rate else 1.0)
+        self.simulate = simulate
+        self.simulate_options = simulate_options
+
+    async def batches(self, batch_size):
+        produced = 0
+        started = time.perf_counter()
+        while self.count is None or produced < self.count:
+            size = batch_size if self.count is None else min(batch_size, self.count - produced)
+            batch = self.simulate(count=size, **self.simulate_options)
+            for tweet in batch:
+                tweet["id"] = produced
+                tweet["created_at"] = (self.start + timedelta(seconds=produced * self.interval)).isoformat()
+                produced += 1
+
+            # Pace to the target rate; never generate ahead of it
+            if self.rate:
+                delay = produced / self.rate - (time.perf_counter() - started)
+                await asyncio.sleep(max(delay, 0))
+            else:
+                await asyncio.sleep(0)
+            yield batch
+
+
+def normalize_tweet(tweet):
+    """Bring a raw tweet from any source into the flat dict shape the scripts use
+
+    Flattens the API's nested "user" object, converts created_at to a naive
+    UTC ISO string and fills defaults for fields the aggregations read.
+    """
+    user = tweet.pop("user", None)
+    if user:
+        tweet.setdefault("user_id", user.get("id"))
+        tweet.setdefault("user_location", user.get("location") or "Unknown")
+        tweet.setdefault("user_followers_count", user.get("followers_count"))
+    if "full_text" in tweet and "text" not in tweet:
+        tweet["text"] = tweet.pop("full_text")
+
+    created_at = parse_created_at(tweet.get("created_at"))
+    tweet["created_at"] = (created_at or datetime.now(timezone.utc).replace(tzinfo=None)).isoformat()
+    tweet.setdefault("user_location", "Unknown")
+    tweet.setdefault("retweet_count", 0)
+    tweet.setdefault("favorite_count", 0)
+    tweet.setdefault("reply_count", 0)
+    tweet.setdefault("sentiment_type", "neutral")
+    if tweet.get("user_followers_count") is None:
+        tweet.pop("user_followers_count", None)
+    return tweet
+
+
+class PipelineStats:
+    """Counters and queue high-water marks for one pipeline run"""
+
+    def __init__(self):
+        self.batches = {"source": 0, "normalize": 0, "score": 0, "aggregate": 0}
+        self.tweets = 0
+        self.max_queue_depth = {}
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+
+    def observe(self, name, queue):
+        depth = queue.qsize()
+        if depth > self.max_queue_depth.get(name, 0):
+            self.max_queue_depth[name] = depth
+
+    def as_dict(self):
+        return {
+            "batches": dict(self.batches),
+            "tweets": self.tweets,
+            "seconds": round(self.elapsed, 3),
+            "tweets_per_second": round(self.tweets / self.elapsed) if self.elapsed else 0,
+            "max_queue_depth": dict(self.max_queue_depth)
+        }
+
+
+class IngestPipeline:
+    """source -> normalize -> score -> aggregate over bounded asyncio queues
+
+    Each queue holds at most queue_size batches, so a slow stage makes the
+    stages before it wait instead of buffering. Scoring runs in `workers`
+    concurrent tasks, each handing one batch at a time to scorer in an
+    executor (threads by default; pass a ProcessPoolExecutor for CPU-bound
+    scorers). The aggregate stage restores source order before calling sink,
+    so time-bucketed consumers such as SpikeDetector see tweets in order.
+
+    sink is either a callable taking a batch or an object with ingest(batch),
+    e.g. a PakistanSentimentProcessor with a spike detector.
+    """
+
+    def __init__(self, source, scorer=None, sink=None, workers=4, queue_size=8, batch_size=500,
+                 executor=None, normalize=normalize_tweet):
+        if scorer is None:
+            from .pakistan_sentiment_analysis import analyze_pakistan_sentiment
+            scorer = analyze_pakistan_sentiment
+        self.source = source
+        self.scorer = scorer
+        self.sink = getattr(sink, "ingest", sink)
+        self.workers = workers
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.executor = executor
+        self.normalize = normalize
+        self.stats = PipelineStats()
+
+    async def _produce(self, output):
+        sequence = 0
+        async for batch in self.source.batches(self.batch_size):
+            await output.put((sequence, batch))
+            self.stats.observe("normalize", output)
+            self.stats.batches["source"] += 1
+            sequence += 1
+        await output.put(_DONE)
+
+    async def _normalize(self, input, output):
+        normalize = self.normalize
+        while True:
+            item = await input.get()
+            if item is _DONE:
+                for _ in range(self.workers):
+                    await output.put(_DONE)
+                return
+            sequence, batch = item
+            await output.put((sequence, [normalize(tweet) for tweet in batch]))
+            self.stats.observe("score", output)
+            self.stats.batches["normalize"] += 1
+
+    async def _score(self, input, output):
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await input.get()
+            if item is _DONE:
+                await output.put(_DONE)
+                return
+            sequence, batch = item
+            scored = await loop.run_in_executor(self.executor, self.scorer, batch)
+            await output.put((sequence, scored))
+            self.stats.observe("aggregate", output)
+            self.stats.batches["score"] += 1
+
+    async def _aggregate(self, input):
+        pending = {}
+        next_sequence = 0
+        finished = 0
+        while finished < self.workers:
+            item = await input.get()
+            if item is _DONE:
+                finished += 1
+                continue
+            sequence, batch = item
+            pending[sequence] = batch
+            # Emit in source order; at most `workers` batches wait here
+            while next_sequence in pending:
+                ready = pending.pop(next_sequence)
+                if self.sink is not None:
+                    self.sink(ready)
+                self.stats.tweets += len(ready)
+                self.stats.batches["aggregate"] += 1
+                next_sequence += 1
+
+    async def run(self):
+        """Run until the source is exhausted; returns run statistics"""
+        to_normalize = asyncio.Queue(self.queue_size)
+        to_score = asyncio.Queue(self.queue_size)
+        to_aggregate = asyncio.Queue(self.queue_size)
+
+        self.stats = PipelineStats()
+        tasks = [
+            asyncio.create_task(self._produce(to_normalize)),
+            asyncio.create_task(self._normalize(to_normalize, to_score)),
+            *(asyncio.create_task(self._score(to_score, to_aggregate)) for _ in range(self.workers)),
+            asyncio.create_task(self._aggregate(to_aggregate))
+        ]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            self.stats.elapsed = time.perf_counter() - self.stats.started
+
+        logger.info("Ingested {} tweets in {:.2f}s ({} tweets/s)", self.stats.tweets, self.stats.elapsed,
+                    self.stats.as_dict()["tweets_per_second"])
+        return self.stats.as_dict()
+
+
+def run_pipeline(source, scorer=None, sink=None, **options):
+    """Blocking convenience wrapper around IngestPipeline.run()"""
+    return asyncio.run(IngestPipeline(source, scorer, sink, **options).run())
+
+
+def main():
+    configure_logging("WARNING")
+
+    from .pakistan_data_processor import PakistanSentimentProcessor
+    from .spike_detector import SpikeDetector
+
+    processor = PakistanSentimentProcessor(
+        data=[],
+        spike_detector=SpikeDetector(bucket_minutes=60, z_threshold=4.0, keywords=["imran", "pti", "violence", "arrest"])
+    )
+    # A week of simulated traffic around the incident, one tweet every 30 seconds
+    source = MockStreamSource(rate=20000, count=20000, start="2023-05-06", interval=30)
+    stats = run_pipeline(source, sink=processor, workers=4, queue_size=4, batch_size=1000)
+
+    print("Ingest statistics:")
+    print(json.dumps(stats, indent=2))
+    print(f"\nSpike events while streaming: {len(processor.processed_data['spikes'])}")
+
+    results = processor.process_pakistan_data()
+    print(f"Overview: {results['overview']}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
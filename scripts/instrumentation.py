@@ -0,0 +1,171 @@
+import cProfile
+import io
+import pstats
+import time
+import tracemalloc
+
+
+class StageStats:
+    """Accumulated measurements for one named stage"""
+
+    __slots__ = ("calls", "wall_seconds", "cpu_seconds", "rows", "allocated_bytes",
+                 "peak_bytes", "last_wall_seconds", "profile")
+
+    def __init__(self):
+        self.calls = 0
+        self.wall_seconds = 0.0
+        self.cpu_seconds = 0.0
+        self.rows = 0
+        self.allocated_bytes = 0
+        self.peak_bytes = 0
+        self.last_wall_seconds = 0.0
+        self.profile = None
+
+    def as_dict(self):
+        return {
+            "calls": self.calls,
+            "wall_seconds": round(self.wall_seconds, 6),
+            "cpu_seconds": round(self.cpu_seconds, 6),
+            "rows": self.rows,
+            "rows_per_second": round(self.rows / self.wall_seconds) if self.wall_seconds > 0 else None,
+            "allocated_bytes": self.allocated_bytes,
+            "peak_bytes": self.peak_bytes,
+            "last_wall_seconds": round(self.last_wall_seconds, 6)
+        }
+
+
+class _NullStage:
+    """Shared no-op stage used when instrumentation is disabled"""
+
+    rows = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+NULL_STAGE = _NullStage()
+
+
+class _StageTimer:
+    """Context manager measuring one execution of a stage"""
+
+    def __init__(self, instrumentation, name, rows):
+        self.instrumentation = instrumentation
+        self.name = name
+        self.rows = rows
+        self.profiler = None
+
+    def __enter__(self):
+        inst = self.instrumentation
+        if inst.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            self.start_memory = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        if inst.profile:
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+        self.start_cpu = time.process_time()
+        self.start_wall = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        wall = time.perf_counter() - self.start_wall
+        cpu = time.process_time() - self.start_cpu
+        if self.profiler:
+            self.profiler.disable()
+
+        stats = self.instrumentation.stages.get(self.name)
+        if stats is None:
+            stats = self.instrumentation.stages[self.name] = StageStats()
+        stats.calls += 1
+        stats.wall_seconds += wall
+        stats.cpu_seconds += cpu
+        stats.rows += self.rows
+        stats.last_wall_seconds = wall
+
+        if self.instrumentation.trace_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            stats.allocated_bytes += max(current - self.start_memory, 0)
+            stats.peak_bytes = max(stats.peak_bytes, peak - self.start_memory)
+        if self.profiler:
+            if stats.profile is None:
+                stats.profile = pstats.Stats(self.profiler)
+            else:
+                stats.profile.add(self.profiler)
+        return False
+
+
+class Instrumentation:
+    """Per-stage timing, row counts, memory and optional cProfile capture
+
+    A disabled instance hands out a shared no-op context manager, so wrapping
+    a stage costs one attribute check.
+    """
+
+    def __init__(self, enabled=True, trace_memory=False, profile=False, labels=None):
+        self.enabled = enabled
+        self.trace_memory = trace_memory
+        self.profile = profile
+        self.labels = labels or {}
+        self.stages = {}
+
+    def stage(self, name, rows=0):
+        """Context manager recording one run of a stage"""
+        if not self.enabled:
+            return NULL_STAGE
+        return _StageTimer(self, name, rows)
+
+    def snapshot(self):
+        """Structured metrics for every stage seen so far"""
+        return {name: stats.as_dict() for name, stats in self.stages.items()}
+
+    def reset(self):
+        self.stages = {}
+
+    def profile_report(self, name, limit=20, sort="cumulative"):
+        """Text cProfile report for a stage, or None if it was not profiled"""
+        stats = self.stages.get(name)
+        if stats is None or stats.profile is None:
+            return None
+        stream = io.StringIO()
+        stats.profile.stream = stream
+        stats.profile.sort_stats(sort).print_stats(limit)
+        return stream.getvalue()
+
+    def to_prometheus(self, prefix="sentiment_stage"):
+        """Prometheus text exposition of the accumulated stage metrics"""
+        metrics = [
+            ("calls_total", "counter", "Number of times the stage ran", "calls"),
+            ("wall_seconds_total", "counter", "Wall-clock time spent in the stage", "wall_seconds"),
+            ("cpu_seconds_total", "counter", "CPU time spent in the stage", "cpu_seconds"),
+            ("rows_total", "counter", "Rows processed by the stage", "rows"),
+            ("last_wall_seconds", "gauge", "Wall-clock time of the most recent run", "last_wall_seconds")
+        ]
+        if self.trace_memory:
+            metrics.extend([
+                ("allocated_bytes_total", "counter", "Memory still allocated after the stage", "allocated_bytes"),
+                ("peak_bytes", "gauge", "Peak traced memory above the stage's starting point", "peak_bytes")
+            ])
+
+        lines = []
+        for suffix, kind, help_text, attribute in metrics:
+            metric = f"{prefix}_{suffix}"
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} {kind}")
+            for name, stats in self.stages.items():
+                labels = dict(self.labels, stage=name)
+                label_text = ",".join(f'{key}="{_escape(value)}"' for key, value in sorted(labels.items()))
+                lines.append(f"{metric}{{{label_text}}} {getattr(stats, attribute)}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value):
+    """Escape a Prometheus label value"""
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+NULL_INSTRUMENTATION = Instrumentation(enabled=False)
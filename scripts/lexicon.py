@@ -0,0 +1,124 @@
+"""Keyword tables and region lookups shared by the scripts
+
+Plain Python only, so callers that just need a lookup do not import NumPy,
+matplotlib or TextBlob.
+"""
+import hashlib
+import json
+
+STATE_NAMES = {
+    "CA": "California",
+    "TX": "Texas",
+    "FL": "Florida",
+    "NY": "New York",
+    "PA": "Pennsylvania",
+    "IL": "Illinois",
+    "OH": "Ohio",
+    "GA": "Georgia",
+    "NC": "North Carolina",
+    "MI": "Michigan",
+    "NJ": "New Jersey",
+    "VA": "Virginia",
+    "WA": "Washington",
+    "AZ": "Arizona",
+    "MA": "Massachusetts"
+}
+
+# The simulators only ever name the first ten states and label the rest by code
+SIMULATED_STATE_NAMES = {code: name for code, name in list(STATE_NAMES.items())[:10]}
+
+PAKISTAN_REGION_CODES = {
+    "Punjab": "PB",
+    "Sindh": "SD",
+    "KPK": "KP",
+    "Balochistan": "BL",
+    "Islamabad": "ISB",
+    "Lahore": "LHR",
+    "Karachi": "KHI",
+    "AJK": "AJK"
+}
+
+# Provinces only: the simulators' city locations keep their fallback codes (LAH, KAR)
+PAKISTAN_PROVINCE_CODES = {name: code for name, code in PAKISTAN_REGION_CODES.items()
+                           if name not in ("Lahore", "Karachi")}
+
+# Keywords that indicate different sentiments in Pakistani political context
+PAKISTAN_POSITIVE_KEYWORDS = ["support", "justice", "leader", "democratic", "peaceful", "hope", "change"]
+PAKISTAN_NEGATIVE_KEYWORDS = ["violence", "extremist", "vandalism", "chaos", "terrorist", "anarchy", "destroy"]
+
+# Keywords related to the 9th May incident, used by the synthetic generator
+IMRAN_KHAN_KEYWORDS = ["imran", "khan", "pti", "chairman", "leader"]
+VIOLENCE_KEYWORDS = ["violence", "vandalism", "attack", "destroy", "burn"]
+POLITICAL_KEYWORDS = ["arrest", "court", "justice", "democracy", "corruption"]
+
+# Urdu keywords that were popular during 9th May 2023
+URDU_KEYWORDS = {
+    # Political terms
+    "عمران خان": {"sentiment": "positive", "frequency": 12500},
+    "پی ٹی آئی": {"sentiment": "positive", "frequency": 8900},
+    "نو مئی": {"sentiment": "negative", "frequency": 15200},
+    "گرفتاری": {"sentiment": "negative", "frequency": 7800},
+    "انصاف": {"sentiment": "positive", "frequency": 5200},
+    
+    # Violence related
+    "تشدد": {"sentiment": "negative", "frequency": 9800},
+    "توڑ پھوڑ": {"sentiment": "negative", "frequency": 4500},
+    "حملہ": {"sentiment": "negative", "frequency": 6200},
+    "افراتفری": {"sentiment": "negative", "frequency": 3800},
+    "انتہا پسندی": {"sentiment": "negative", "frequency": 4200},
+    
+    # Locations
+    "لاہور": {"sentiment": "neutral", "frequency": 6800},
+    "اسلام آباد": {"sentiment": "neutral", "frequency": 5500},
+    "کراچی": {"sentiment": "neutral", "frequency": 4200},
+    "پاکستان": {"sentiment": "neutral", "frequency": 8900},
+    
+    # Support/Opposition
+    "حامی": {"sentiment": "positive", "frequency": 3500},
+    "مخالف": {"sentiment": "negative", "frequency": 2800},
+    "احتجاج": {"sentiment": "neutral", "frequency": 5800},
+    "مظاہرہ": {"sentiment": "neutral", "frequency": 4200},
+    
+    # Government/Military
+    "فوج": {"sentiment": "negative", "frequency": 4800},
+    "حکومت": {"sentiment": "negative", "frequency": 5200},
+    "عدالت": {"sentiment": "neutral", "frequency": 3800},
+    "پولیس": {"sentiment": "negative", "frequency": 4500},
+    
+    # Emotions/Reactions
+    "غصہ": {"sentiment": "negative", "frequency": 3200},
+    "خوشی": {"sentiment": "positive", "frequency": 2100},
+    "غم": {"sentiment": "negative", "frequency": 2800},
+    "امید": {"sentiment": "positive", "frequency": 2500},
+    "ڈر": {"sentiment": "negative", "frequency": 3500},
+    
+    # Democratic terms
+    "جمہوریت": {"sentiment": "positive", "frequency": 3800},
+    "آزادی": {"sentiment": "positive", "frequency": 3200},
+    "حقوق": {"sentiment": "positive", "frequency": 2800},
+    "قانون": {"sentiment": "neutral", "frequency": 3500},
+}
+
+
+_VERSION = None
+
+
+def lexicon_version():
+    """Digest of the lookup and keyword tables; cached stage results are keyed on it"""
+    global _VERSION
+    if _VERSION is None:
+        tables = [STATE_NAMES, PAKISTAN_REGION_CODES, PAKISTAN_POSITIVE_KEYWORDS, PAKISTAN_NEGATIVE_KEYWORDS,
+                  IMRAN_KHAN_KEYWORDS, VIOLENCE_KEYWORDS, POLITICAL_KEYWORDS, URDU_KEYWORDS]
+        payload = json.dumps(tables, sort_keys=True, ensure_ascii=False).encode("utf-8")
+        _VERSION = hashlib.blake2b(payload, digest_size=8).hexdigest()
+    return _VERSION
+
+
+def get_state_name(state_code, names=STATE_NAMES):
+    """Convert state code to full name"""
+    return names.get(state_code, state_code)
+
+
+def get_pakistan_region_code(region_name, codes=PAKISTAN_REGION_CODES):
+    """Convert Pakistani region name to code"""
+    return codes.get(region_name, region_name[:3].upper())
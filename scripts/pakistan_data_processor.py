@@ -2,24 +2,61 @@ import json
 import random
 from datetime import datetime, timedelta
 import numpy as np
-from collections import Counter
+from .dedup import deduplicate, unique_voices
+from .author_activity import cap_author_posts
+from .categorical import POSITIVE, SENTIMENT_TYPES, UNKNOWN_LOCATION
+from .instrumentation import NULL_INSTRUMENTATION
+from .lexicon import IMRAN_KHAN_KEYWORDS, POLITICAL_KEYWORDS, VIOLENCE_KEYWORDS, get_pakistan_region_code
+from .engagement_metrics import compute_engagement_metrics
+from .spike_detector import SpikeDetector
+from .quantile_sketch import ScoreDistributionTracker
+from .stage_cache import fingerprint_tweets
+from .tweet_columns import TweetColumns
+from .sentiment_logging import configure_logging, get_logger
+
+logger = get_logger(__name__)
 
 class PakistanSentimentProcessor:
     """Process Pakistan-specific sentiment data for 9th May 2023 incident"""
     
-    def __init__(self, incident_date="2023-05-09"):
+    DATE_FORMAT = "May %d"  # Timeline display dates
+    MIN_REGION_MENTIONS = 10  # Provinces with fewer mentions are left out
+    AVG_FOLLOWERS = 300  # Reach assumed for tweets without a follower count
+    
+    def __init__(self, incident_date="2023-05-09", spike_detector=None, count_mode="raw", author_cap=None, data=None,
+                 instrumentation=None, cache=None, store=None, seen_ids=None, fingerprint=None):
         self.incident_date = datetime.strptime(incident_date, "%Y-%m-%d")
-        self.data = self._generate_pakistan_data()
+        self.spike_detector = spike_detector
+        self.count_mode = count_mode  # "raw" volume or "unique" voices
+        self.author_cap = author_cap  # Max tweets counted per account
+        self.author_tracker = None
+        self.instrumentation = instrumentation or NULL_INSTRUMENTATION  # Per-stage timings
+        self.cache = cache  # Optional StageCache reused across runs over unchanged input
+        self.store = store  # Optional TweetStore: processed tweets are appended, past windows queried
+        self.seen_ids = seen_ids  # Optional TweetIdFilter: ingest() drops re-delivered tweets
+        self.input_fingerprint = fingerprint  # Caller's digest of data (e.g. its source file); ingest() discards it
+        self._fingerprint = None
+        self._counted = None
+        self._columns = None
+        self.data = data if data is not None else self._generate_pakistan_data()
+        self._reset_sections()
+    
+    def _reset_sections(self):
+        """Empty every output section, as a run over no tweets leaves them"""
         self.processed_data = {
             "overview": {},
             "timeline": [],
             "wordcloud": [],
-            "regions": []
+            "regions": [],
+            "engagement": {},
+            "authors": {},
+            "distribution": {},
+            "spikes": []
         }
     
     def _generate_pakistan_data(self, count=5000, days=14):
         """Generate Pakistan-specific Twitter data around May 9th incident"""
-        print(f"Generating Pakistan data for 9th May 2023 incident with {count} tweets over {days} days")
+        logger.info("Generating Pakistan data for 9th May 2023 incident with {} tweets over {} days", count, days)
         
         tweets = []
         start_date = self.incident_date - timedelta(days=7)  # Week before
@@ -37,9 +74,9 @@ class PakistanSentimentProcessor:
         }
         
         # Keywords related to the incident
-        imran_khan_keywords = ["imran", "khan", "pti", "chairman", "leader"]
-        violence_keywords = ["violence", "vandalism", "attack", "destroy", "burn"]
-        political_keywords = ["arrest", "court", "justice", "democracy", "corruption"]
+        imran_khan_keywords = IMRAN_KHAN_KEYWORDS
+        violence_keywords = VIOLENCE_KEYWORDS
+        political_keywords = POLITICAL_KEYWORDS
         
         for i in range(count):
             # Random date within range
@@ -101,6 +138,8 @@ class PakistanSentimentProcessor:
                 "retweet_count": int(np.random.exponential(10) * engagement_multiplier),
                 "favorite_count": int(np.random.exponential(20) * engagement_multiplier),
                 "reply_count": int(np.random.exponential(5) * engagement_multiplier),
+                "user_id": int(np.random.zipf(1.3)),
+                "user_followers_count": int(np.random.lognormal(5.0, 1.2)),
                 "sentiment_type": sentiment_type,
                 "sentiment_score": sentiment_score,
                 "keywords": tweet_keywords
@@ -112,24 +151,190 @@ class PakistanSentimentProcessor:
     
     def process_pakistan_data(self):
         """Process Pakistan-specific data"""
-        print(f"Processing {len(self.data)} Pakistan tweets")
+        if not self.data:
+            logger.info("No Pakistan tweets to process")
+            self._reset_sections()
+            return self.processed_data
+        
+        logger.info("Processing {} Pakistan tweets", len(self.data))
+        
+        stage = self.instrumentation.stage
+        rows = len(self.data)
+        
+        if self.cache is not None:
+            with stage("fingerprint", rows):
+                self._fingerprint = self.input_fingerprint or fingerprint_tweets(self.data)
+        
+        if self.count_mode == "unique":
+            with stage("dedup", rows):
+                deduplicate(self.data)
+        self._counted = None
+        self._columns = None
         
-        self._process_pakistan_overview()
-        self._process_pakistan_timeline()
-        self._process_pakistan_wordcloud()
-        self._process_pakistan_regions()
+        with stage("counting", rows):
+            self._counted_columns()
+        with stage("overview", rows):
+            self._process_pakistan_overview()
+        with stage("timeline", rows):
+            self._cached_stage("timeline", self._process_pakistan_timeline)
+        with stage("wordcloud", rows):
+            self._cached_stage("wordcloud", self._process_pakistan_wordcloud)
+        with stage("regions", rows):
+            self._cached_stage("regions", self._process_pakistan_regions)
+        
+        with stage("authors", rows):
+            self._process_pakistan_authors()
+        with stage("distribution", rows):
+            self._cached_stage("distribution", self._process_pakistan_distribution)
+        
+        if self.spike_detector:
+            with stage("spikes", rows):
+                self._process_pakistan_spikes()
+        
+        if self.store is not None:
+            with stage("store", rows):
+                self.store.append(self.data, topic=self.store_topic)
         
         return self.processed_data
     
+    @property
+    def store_topic(self):
+        """Topic the incident's tweets are stored under in a TweetStore"""
+        return f"pakistan:{self.incident_date:%Y-%m-%d}"
+    
+    def process_window(self, since=None, until=None):
+        """Overview, timeline and region sections for a past window, from the store
+        
+        since/until are ISO dates or timestamps bounding [since, until).
+        Answered with indexed queries over tweets stored by earlier runs for
+        this incident rather than from self.data. count_mode is honoured;
+        author_cap is not, and distinct authors are exact.
+        """
+        if self.store is None:
+            raise ValueError("process_window needs a TweetStore (pass store=...)")
+        topic = self.store_topic
+        unique = self.count_mode == "unique"
+        
+        totals = self.store.totals(topic, since, until, unique, default_followers=self.AVG_FOLLOWERS)
+        total_tweets = totals["tweets"]
+        if not total_tweets:
+            logger.info("No stored Pakistan tweets in [{}, {})", since, until)
+            self._reset_sections()
+            return self.processed_data
+        
+        positive_pct, negative_pct, neutral_pct = (round(totals[key] / total_tweets * 100)
+                                                   for key in ("positive", "negative", "neutral"))
+        # Trend analysis (comparing before and after May 9th)
+        (before_count, before_positive), (after_count, after_positive) = self.store.positive_split(
+            "2023-05-09", topic, since, until, unique)
+        rising = before_count and after_count and after_positive / after_count > before_positive / before_count
+        self.processed_data["overview"] = {
+            "overall": positive_pct,
+            "totalMentions": total_tweets,
+            "positivePercentage": positive_pct,
+            "negativePercentage": negative_pct,
+            "neutralPercentage": neutral_pct,
+            "engagement": totals["engagement"],
+            "reachInMillions": round(totals["followers"] / 1000000, 1),
+            "distinctAuthors": totals["distinctAuthors"],
+            "trending": "up" if rising else "down"
+        }
+        
+        self.processed_data["timeline"] = [
+            {
+                "date": datetime.fromisoformat(day).strftime(self.DATE_FORMAT),
+                "positive": round(positive / (positive + negative + neutral) * 100),
+                "negative": round(negative / (positive + negative + neutral) * 100),
+                "neutral": round(neutral / (positive + negative + neutral) * 100),
+                "distinctAuthors": authors
+            }
+            for day, positive, negative, neutral, authors in self.store.by_day(topic, since, until, unique)
+        ]
+        
+        region_data = []
+        for location, positive, negative, neutral, authors in self.store.by_region(topic, since, until, unique):
+            total = positive + negative + neutral
+            if location == UNKNOWN_LOCATION or total < self.MIN_REGION_MENTIONS:
+                continue
+            region_data.append({
+                "id": self._get_pakistan_region_code(location),
+                "name": location,
+                "sentiment": round(positive / total * 100),
+                "mentions": total,
+                "distinctAuthors": authors
+            })
+        region_data.sort(key=lambda x: x["mentions"], reverse=True)
+        self.processed_data["regions"] = region_data
+        
+        logger.info("Answered Pakistan window [{}, {}) from the store: {} tweets", since, until, total_tweets)
+        return self.processed_data
+    
+    def ingest(self, tweets):
+        """Append streamed tweets and return any spike events they trigger
+        
+        With seen_ids (a TweetIdFilter), tweets already delivered are dropped first.
+        """
+        if self.seen_ids is not None:
+            tweets = self.seen_ids.filter(tweets)
+        self.data.extend(tweets)
+        self.input_fingerprint = None
+        if not self.spike_detector:
+            return []
+        
+        events = self.spike_detector.update_many(tweets)
+        self.processed_data["spikes"].extend(events)
+        return events
+    
+    def _cached_stage(self, name, compute):
+        """Fill processed_data[name], reusing the cached result for unchanged input and params"""
+        if self.cache is None:
+            compute()
+            return
+        
+        def run():
+            compute()
+            return self.processed_data[name]
+        
+        self.processed_data[name] = self.cache.fetch(name, self._fingerprint, self._stage_params(), run)
+    
+    def _stage_params(self):
+        """Everything besides the input tweets that shapes a cached stage result"""
+        return {
+            "processor": type(self).__name__,
+            "incident_date": f"{self.incident_date:%Y-%m-%d}",
+            "count_mode": self.count_mode,
+            "author_cap": self.author_cap,
+            "date_format": self.DATE_FORMAT,
+            "min_region_mentions": self.MIN_REGION_MENTIONS,
+            "avg_followers": self.AVG_FOLLOWERS
+        }
+    
+    def _distinct_authors(self, sketches, key):
+        """Approximate distinct authors in one aggregation bucket"""
+        sketch = sketches.get(key)
+        return sketch.count() if sketch else 0
+    
+    def _counted_tweets(self):
+        """Tweets counted by the aggregations: raw or unique voices, capped per author"""
+        if self._counted is None:
+            tweets = unique_voices(self.data) if self.count_mode == "unique" else self.data
+            self._counted, self.author_tracker = cap_author_posts(tweets, self.author_cap)
+        return self._counted
+    
+    def _counted_columns(self):
+        """Counted tweets as columns, categorical fields encoded once as integer codes"""
+        if self._columns is None:
+            self._columns = TweetColumns.from_tweets(self._counted_tweets())
+        return self._columns
+    
     def _process_pakistan_overview(self):
         """Process overview metrics for Pakistan incident"""
-        total_tweets = len(self.data)
+        columns = self._counted_columns()
+        total_tweets = len(columns)
+        types = columns["sentiment_type"]
         
-        # Count sentiment types
-        sentiment_counts = Counter(tweet["sentiment_type"] for tweet in self.data)
-        positive_count = sentiment_counts.get("positive", 0)
-        negative_count = sentiment_counts.get("negative", 0)
-        neutral_count = sentiment_counts.get("neutral", 0)
+        # Count sentiment types by integer code
+        positive_count, negative_count, neutral_count = np.bincount(types, minlength=len(SENTIMENT_TYPES))
         
         # Calculate percentages
         positive_pct = round((positive_count / total_tweets) * 100)
@@ -139,24 +344,21 @@ class PakistanSentimentProcessor:
         # Overall sentiment (lower due to incident)
         overall_sentiment = positive_pct
         
-        # Calculate engagement
-        total_retweets = sum(tweet.get("retweet_count", 0) for tweet in self.data)
-        total_likes = sum(tweet.get("favorite_count", 0) for tweet in self.data)
-        total_replies = sum(tweet.get("reply_count", 0) for tweet in self.data)
-        total_engagement = total_retweets + total_likes + total_replies
-        
-        # Estimate reach (Pakistan population context)
-        avg_followers = 300  # Lower average for Pakistan
-        potential_reach = round(total_tweets * avg_followers / 1000000, 1)
+        # Calculate engagement and reach (lower follower fallback for Pakistan)
+        engagement = compute_engagement_metrics(columns, avg_followers=self.AVG_FOLLOWERS)
+        total_engagement = engagement["totals"]["engagement"]
+        potential_reach = engagement["totals"]["reachInMillions"]
+        self.processed_data["engagement"] = engagement
         
         # Trend analysis (comparing before and after May 9th)
-        may_9_tweets = [t for t in self.data if t["created_at"].startswith("2023-05-09")]
-        before_may_9 = [t for t in self.data if t["created_at"] < "2023-05-09"]
-        after_may_9 = [t for t in self.data if t["created_at"] > "2023-05-09"]
+        before_may_9 = columns["created_at"] < np.datetime64("2023-05-09")
+        before_count = np.count_nonzero(before_may_9)
+        after_count = total_tweets - before_count
         
-        if before_may_9 and after_may_9:
-            before_positive = sum(1 for t in before_may_9 if t["sentiment_type"] == "positive") / len(before_may_9)
-            after_positive = sum(1 for t in after_may_9 if t["sentiment_type"] == "positive") / len(after_may_9)
+        if before_count and after_count:
+            positive = types == POSITIVE
+            before_positive = np.count_nonzero(positive & before_may_9) / before_count
+            after_positive = np.count_nonzero(positive & ~before_may_9) / after_count
             trend = "up" if after_positive > before_positive else "down"
         else:
             trend = "down"  # Default to down due to incident
@@ -169,43 +371,40 @@ class PakistanSentimentProcessor:
             "neutralPercentage": neutral_pct,
             "engagement": total_engagement,
             "reachInMillions": potential_reach,
+            "distinctAuthors": self.author_tracker.total_authors.count(),
             "trending": trend
         }
         
-        print(f"Pakistan Overview - Overall sentiment: {overall_sentiment}% positive")
-        print(f"Total mentions: {total_tweets}, Engagement: {total_engagement}")
+        logger.info("Pakistan Overview - Overall sentiment: {}% positive", overall_sentiment)
+        logger.info("Total mentions: {}, Engagement: {}", total_tweets, total_engagement)
     
     def _process_pakistan_timeline(self):
         """Process timeline data focusing on May 9th incident"""
-        # Group tweets by day
-        tweets_by_day = {}
-        for tweet in self.data:
-            day = tweet["created_at"].split("T")[0]
-            if day not in tweets_by_day:
-                tweets_by_day[day] = []
-            tweets_by_day[day].append(tweet)
+        columns = self._counted_columns()
+        # Count sentiment codes per day in one pass
+        type_count = len(SENTIMENT_TYPES)
+        counts = np.bincount(columns["day"] * type_count + columns["sentiment_type"],
+                             minlength=len(columns.days) * type_count).reshape(-1, type_count)
         
         # Calculate sentiment percentages for each day
         timeline_data = []
-        for day, day_tweets in sorted(tweets_by_day.items()):
-            positive = sum(1 for t in day_tweets if t["sentiment_type"] == "positive")
-            negative = sum(1 for t in day_tweets if t["sentiment_type"] == "negative")
-            neutral = sum(1 for t in day_tweets if t["sentiment_type"] == "neutral")
-            total = len(day_tweets)
+        for day, (positive, negative, neutral) in zip(columns.days, counts):
+            total = positive + negative + neutral
             
             # Format date for display
             date_obj = datetime.fromisoformat(day)
-            display_date = date_obj.strftime("May %d")
+            display_date = date_obj.strftime(self.DATE_FORMAT)
             
             timeline_data.append({
                 "date": display_date,
                 "positive": round(positive / total * 100),
                 "negative": round(negative / total * 100),
-                "neutral": round(neutral / total * 100)
+                "neutral": round(neutral / total * 100),
+                "distinctAuthors": self._distinct_authors(self.author_tracker.authors_by_day, day)
             })
         
         self.processed_data["timeline"] = timeline_data
-        print(f"Generated Pakistan timeline data for {len(timeline_data)} days")
+        logger.info("Generated Pakistan timeline data for {} days", len(timeline_data))
     
     def _process_pakistan_wordcloud(self):
         """Process word cloud data for Pakistan political context"""
@@ -268,27 +467,25 @@ class PakistanSentimentProcessor:
         wordcloud_data.sort(key=lambda x: x["value"], reverse=True)
         
         self.processed_data["wordcloud"] = wordcloud_data
-        print(f"Generated Pakistan word cloud with {len(wordcloud_data)} terms")
+        logger.info("Generated Pakistan word cloud with {} terms", len(wordcloud_data))
     
     def _process_pakistan_regions(self):
         """Process region-based sentiment for Pakistani provinces"""
-        # Group tweets by location
-        tweets_by_location = {}
-        for tweet in self.data:
-            location = tweet.get("user_location", "Unknown")
-            if location not in tweets_by_location:
-                tweets_by_location[location] = []
-            tweets_by_location[location].append(tweet)
+        columns = self._counted_columns()
+        # Count mentions and positive tweets per location code
+        locations = columns["location"]
+        mentions = np.bincount(locations, minlength=len(columns.locations))
+        positives = np.bincount(locations, weights=columns["sentiment_type"] == POSITIVE,
+                                minlength=len(columns.locations))
         
         # Calculate sentiment for each location
         region_data = []
-        for location, location_tweets in tweets_by_location.items():
-            if location == "Unknown" or len(location_tweets) < 10:
+        for code, location in enumerate(columns.locations):
+            total = int(mentions[code])
+            if location == UNKNOWN_LOCATION or total < self.MIN_REGION_MENTIONS:
                 continue
-                
-            positive = sum(1 for t in location_tweets if t["sentiment_type"] == "positive")
-            total = len(location_tweets)
-            sentiment_score = round(positive / total * 100)
+            
+            sentiment_score = round(positives[code] / total * 100)
             
             # Get region code
             region_code = self._get_pakistan_region_code(location)
@@ -297,33 +494,60 @@ class PakistanSentimentProcessor:
                 "id": region_code,
                 "name": location,
                 "sentiment": sentiment_score,
-                "mentions": total
+                "mentions": total,
+                "distinctAuthors": self._distinct_authors(self.author_tracker.authors_by_region, location)
             })
         
         # Sort by number of mentions
         region_data.sort(key=lambda x: x["mentions"], reverse=True)
         
         self.processed_data["regions"] = region_data
-        print(f"Generated Pakistan region data for {len(region_data)} regions")
+        logger.info("Generated Pakistan region data for {} regions", len(region_data))
+    
+    def _process_pakistan_authors(self):
+        """Report distinct authors per day and region from the bounded author sketches"""
+        tracker = self.author_tracker
+        self.processed_data["authors"] = {
+            "distinctAuthors": tracker.total_authors.count(),
+            "byDay": tracker.distinct_authors_by_day(),
+            "byRegion": tracker.distinct_authors_by_region(),
+            "countedTweets": len(self._counted),
+            "sketches": tracker.sketches()
+        }
+        logger.info("Estimated {} distinct Pakistan authors", self.processed_data['authors']['distinctAuthors'])
+    
+    def _process_pakistan_distribution(self):
+        """Summarize sentiment scores with mergeable quantile sketches per day and region"""
+        tracker = ScoreDistributionTracker()
+        tracker.add_columns(self._counted_columns())
+        self.processed_data["distribution"] = tracker.summary()
+        logger.info("Sketched score distributions for {} days and {} regions", len(tracker.by_day), len(tracker.by_region))
+    
+    def _process_pakistan_spikes(self):
+        """Replay the incident window in time order through the spike detector"""
+        # A local copy with the same options: tweets ingest() already fed are not counted
+        # twice, and the caller's detector keeps its own streamed state
+        detector = self.spike_detector.fresh_copy()
+        detector.update_many(sorted(self.data, key=lambda t: t["created_at"]))
+        detector.flush()
+        
+        self.processed_data["spikes"] = list(detector.events)
+        logger.info("Detected {} Pakistan sentiment/volume spikes", len(detector.events))
     
     def _get_pakistan_region_code(self, region_name):
         """Convert Pakistani region name to code"""
-        region_codes = {
-            "Punjab": "PB",
-            "Sindh": "SD",
-            "KPK": "KP",
-            "Balochistan": "BL",
-            "Islamabad": "ISB",
-            "Lahore": "LHR",
-            "Karachi": "KHI"
-        }
-        return region_codes.get(region_name, region_name[:3].upper())
+        return get_pakistan_region_code(region_name)
 
 def main():
+    configure_logging()
+    
     print("=== Pakistan Sentiment Data Processor - 9th May 2023 ===")
     
     # Initialize processor for Pakistan incident
-    processor = PakistanSentimentProcessor(incident_date="2023-05-09")
+    processor = PakistanSentimentProcessor(
+        incident_date="2023-05-09",
+        spike_detector=SpikeDetector(bucket_minutes=60, z_threshold=4.0, keywords=["imran", "pti", "violence", "arrest"])
+    )
     
     # Process the data
     results = processor.process_pakistan_data()
@@ -351,6 +575,10 @@ def main():
     for region in results['regions'][:5]:
         print(f"{region['name']}: {region['sentiment']}% positive ({region['mentions']:,} mentions)")
     
+    print("\n=== Detected Spikes ===")
+    for spike in results['spikes'][:10]:
+        print(f"{spike['bucket']} {spike['series']}: {spike['metric']} {spike['value']} (expected {spike['expected']}, z={spike['zscore']})")
+    
     print("\n=== Pakistan Analysis Complete ===")
 
 if __name__ == "__main__":
@@ -1,14 +1,16 @@
 import json
 import random
 from datetime import datetime, timedelta
-import matplotlib.pyplot as plt
-import numpy as np
-from textblob import TextBlob
+from . import lexicon
+from .lexicon import PAKISTAN_NEGATIVE_KEYWORDS, PAKISTAN_POSITIVE_KEYWORDS
+from .sentiment_logging import configure_logging, get_logger
+
+logger = get_logger(__name__)
 
 def simulate_pakistan_twitter_data(query="Imran Khan 9th May", count=1000, start_date="2023-05-07", days=7):
     """Simulate Twitter data for Pakistan 9th May 2023 incident"""
-    print(f"Simulating Pakistan Twitter data for: {query}")
-    print(f"Focusing on {start_date} to {days} days period")
+    logger.info("Simulating Pakistan Twitter data for: {}", query)
+    logger.info("Focusing on {} to {} days period", start_date, days)
     
     # Convert start_date string to datetime
     start_datetime = datetime.strptime(start_date, "%Y-%m-%d")
@@ -104,15 +106,30 @@ def simulate_pakistan_twitter_data(query="Imran Khan 9th May", count=1000, start
     
     return tweets
 
-def analyze_pakistan_sentiment(tweets):
-    """Analyze sentiment with focus on Pakistan political context"""
-    print("Analyzing sentiment for Pakistan political context...")
+def analyze_pakistan_sentiment(tweets, classifier=None):
+    """Analyze sentiment with focus on Pakistan political context
+    
+    classifier (e.g. a trained HashedSentimentClassifier) replaces the
+    keyword scoring: it sets sentiment_type and sentiment_score from the
+    tweet text in one batched pass.
+    """
+    logger.info("Analyzing sentiment for Pakistan political context...")
+    
+    if classifier is not None:
+        return classifier.score(tweets)
     
     # Keywords that indicate different sentiments in Pakistani political context
-    positive_keywords = ["support", "justice", "leader", "democratic", "peaceful", "hope", "change"]
-    negative_keywords = ["violence", "extremist", "vandalism", "chaos", "terrorist", "anarchy", "destroy"]
+    positive_keywords = PAKISTAN_POSITIVE_KEYWORDS
+    negative_keywords = PAKISTAN_NEGATIVE_KEYWORDS
+    
+    scored_groups = {}
     
     for tweet in tweets:
+        # Near-duplicates reuse their canonical tweet's score instead of being rescored
+        if not tweet.get("is_canonical", True) and tweet["dup_group"] in scored_groups:
+            tweet["sentiment_score"] = scored_groups[tweet["dup_group"]]
+            continue
+        
         text_lower = tweet["text"].lower()
         
         # Count positive and negative keywords
@@ -130,12 +147,19 @@ def analyze_pakistan_sentiment(tweets):
             tweet["sentiment_score"] = max(-1.0, base_score - (negative_count * 0.1))
         else:
             tweet["sentiment_score"] = random.uniform(-0.3, 0.3)
+        
+        if "dup_group" in tweet:
+            scored_groups[tweet["dup_group"]] = tweet["sentiment_score"]
     
     return tweets
 
-def generate_pakistan_timeline(tweets):
-    """Generate timeline focusing on May 9th incident"""
-    print("Generating Pakistan sentiment timeline...")
+def generate_pakistan_timeline(tweets, unique_only=False):
+    """Generate timeline focusing on May 9th incident (unique_only counts one tweet per duplicate group)"""
+    logger.info("Generating Pakistan sentiment timeline...")
+    
+    if unique_only:
+        from .dedup import unique_voices
+        tweets = unique_voices(tweets)
     
     # Group tweets by day
     tweets_by_day = {}
@@ -167,9 +191,13 @@ def generate_pakistan_timeline(tweets):
     
     return timeline_data
 
-def generate_pakistan_wordcloud(tweets):
-    """Generate word cloud for Pakistan political context"""
-    print("Generating Pakistan-specific word cloud...")
+def generate_pakistan_wordcloud(tweets, unique_only=False):
+    """Generate word cloud for Pakistan political context (unique_only counts one tweet per duplicate group)"""
+    logger.info("Generating Pakistan-specific word cloud...")
+    
+    if unique_only:
+        from .dedup import unique_voices
+        tweets = unique_voices(tweets)
     
     # Extract and categorize words from tweets
     pakistan_political_words = {
@@ -230,9 +258,13 @@ def generate_pakistan_wordcloud(tweets):
     
     return wordcloud_data
 
-def generate_pakistan_regions(tweets):
-    """Generate region-based sentiment for Pakistani provinces"""
-    print("Generating Pakistan regional sentiment data...")
+def generate_pakistan_regions(tweets, unique_only=False):
+    """Generate region-based sentiment for Pakistani provinces (unique_only counts one tweet per duplicate group)"""
+    logger.info("Generating Pakistan regional sentiment data...")
+    
+    if unique_only:
+        from .dedup import unique_voices
+        tweets = unique_voices(tweets)
     
     # Group tweets by location
     tweets_by_location = {}
@@ -266,79 +298,26 @@ def generate_pakistan_regions(tweets):
 
 def get_pakistan_region_code(region_name):
     """Convert region name to code"""
-    region_codes = {
-        "Punjab": "PB",
-        "Sindh": "SD",
-        "KPK": "KP",
-        "Balochistan": "BL",
-        "Islamabad": "ISB",
-        "AJK": "AJK"
-    }
-    return region_codes.get(region_name, region_name[:3].upper())
+    return lexicon.get_pakistan_region_code(region_name, lexicon.PAKISTAN_PROVINCE_CODES)
 
-def visualize_pakistan_sentiment(tweets):
-    """Create visualization specific to Pakistan incident"""
-    sentiments = [tweet["sentiment_score"] for tweet in tweets]
-    
-    plt.figure(figsize=(12, 8))
-    
-    # Create subplot for sentiment distribution
-    plt.subplot(2, 2, 1)
-    plt.hist(sentiments, bins=20, color='lightcoral', edgecolor='black', alpha=0.7)
-    plt.title('Sentiment Distribution - 9th May Pakistan Incident')
-    plt.xlabel('Sentiment Score (-1 to 1)')
-    plt.ylabel('Frequency')
-    plt.grid(True, alpha=0.3)
-    
-    # Add statistics
-    mean_sentiment = np.mean(sentiments)
-    plt.axvline(mean_sentiment, color='red', linestyle='dashed', linewidth=2, 
-                label=f'Mean: {mean_sentiment:.2f}')
-    plt.legend()
-    
-    # Create timeline plot
-    plt.subplot(2, 2, 2)
-    timeline_data = generate_pakistan_timeline(tweets)
-    dates = [d["date"] for d in timeline_data]
-    positive_pct = [d["positive"] for d in timeline_data]
-    negative_pct = [d["negative"] for d in timeline_data]
-    
-    plt.plot(dates, positive_pct, 'g-', label='Positive %', marker='o')
-    plt.plot(dates, negative_pct, 'r-', label='Negative %', marker='s')
-    plt.title('Sentiment Timeline')
-    plt.xlabel('Date')
-    plt.ylabel('Percentage')
-    plt.legend()
-    plt.xticks(rotation=45)
-    
-    # Regional sentiment
-    plt.subplot(2, 2, 3)
-    region_data = generate_pakistan_regions(tweets)
-    regions = [r["name"] for r in region_data]
-    region_sentiment = [r["sentiment"] for r in region_data]
-    
-    plt.bar(regions, region_sentiment, color='skyblue', edgecolor='navy')
-    plt.title('Regional Sentiment Distribution')
-    plt.xlabel('Province/Region')
-    plt.ylabel('Positive Sentiment %')
-    plt.xticks(rotation=45)
-    
-    # Word frequency
-    plt.subplot(2, 2, 4)
-    wordcloud_data = generate_pakistan_wordcloud(tweets)
-    top_words = wordcloud_data[:10]
-    words = [w["text"] for w in top_words]
-    frequencies = [w["value"] for w in top_words]
-    colors = ['green' if w["sentiment"] == 'positive' else 'red' if w["sentiment"] == 'negative' else 'gray' for w in top_words]
-    
-    plt.barh(words, frequencies, color=colors)
-    plt.title('Top Words by Frequency')
-    plt.xlabel('Frequency')
-    
-    plt.tight_layout()
-    plt.show()
+def visualize_pakistan_sentiment(tweets, output_dir="charts", fmt="png", renderer=None):
+    """Render the Pakistan incident charts to image files (headless)"""
+    from .plotting import ChartRenderer, score_histogram
+    
+    renderer = renderer or ChartRenderer()
+    
+    jobs = [
+        ("distribution", score_histogram(tweets, bins=20), f"{output_dir}/sentiment_distribution.{fmt}",
+         {"title": "Sentiment Distribution - 9th May Pakistan Incident", "color": "lightcoral"}),
+        ("timeline", generate_pakistan_timeline(tweets), f"{output_dir}/sentiment_timeline.{fmt}"),
+        ("regions", generate_pakistan_regions(tweets), f"{output_dir}/regional_sentiment.{fmt}"),
+        ("words", generate_pakistan_wordcloud(tweets), f"{output_dir}/top_words.{fmt}")
+    ]
+    return renderer.render_batch(jobs)
 
 def main():
+    configure_logging()
+    
     print("=== Pakistan Social Media Sentiment Analysis - 9th May 2023 ===")
     
     # Generate data for the week around May 9th, 2023
@@ -379,11 +358,12 @@ def main():
     print(f"Total tweets analyzed: {total_tweets}")
     print(f"Positive sentiment: {positive_tweets/total_tweets*100:.1f}%")
     print(f"Negative sentiment: {negative_tweets/total_tweets*100:.1f}%")
-    print(f"Average sentiment score: {np.mean([t['sentiment_score'] for t in analyzed_tweets]):.2f}")
+    print(f"Average sentiment score: {sum(t['sentiment_score'] for t in analyzed_tweets) / total_tweets:.2f}")
     
     # Create visualizations
     try:
-        visualize_pakistan_sentiment(analyzed_tweets)
+        paths = visualize_pakistan_sentiment(analyzed_tweets)
+        print(f"\nSaved charts: {', '.join(paths)}")
     except Exception as e:
         print(f"Could not create visualization: {e}")
     
@@ -0,0 +1,157 @@
+import os
+from collections.abc import Mapping
+import numpy as np
+
+SENTIMENT_COLORS = {"positive": "green", "negative": "red", "neutral": "gray"}
+
+_figure_classes = None
+
+
+def _matplotlib():
+    """Import the Agg canvas and Figure on first use (no pyplot, no GUI backend)"""
+    global _figure_classes
+    if _figure_classes is None:
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+        _figure_classes = (Figure, FigureCanvasAgg)
+    return _figure_classes
+
+
+def score_histogram(scores, bins=20, value_range=(-1.0, 1.0)):
+    """Histogram aggregate of sentiment scores (tweets or a score array)"""
+    if not isinstance(scores, np.ndarray):
+        scores = np.fromiter((t["sentiment_score"] if isinstance(t, Mapping) else t for t in scores), dtype=np.float64)
+    counts, edges = np.histogram(scores, bins=bins, range=value_range)
+    return {
+        "edges": edges.tolist(),
+        "counts": counts.tolist(),
+        "count": int(len(scores)),
+        "sum": float(scores.sum())
+    }
+
+
+def merge_histograms(histograms):
+    """Add histograms that share the same bin edges"""
+    histograms = list(histograms)
+    merged = dict(histograms[0], counts=list(histograms[0]["counts"]))
+    for histogram in histograms[1:]:
+        if histogram["edges"] != merged["edges"]:
+            raise ValueError("Cannot merge histograms with different bin edges")
+        merged["counts"] = [a + b for a, b in zip(merged["counts"], histogram["counts"])]
+        merged["count"] += histogram["count"]
+        merged["sum"] += histogram["sum"]
+    return merged
+
+
+def histogram_mean(histogram):
+    return histogram["sum"] / histogram["count"] if histogram["count"] else 0.0
+
+
+def histogram_median(histogram):
+    """Median interpolated within the bin that holds the middle observation"""
+    counts = np.asarray(histogram["counts"], dtype=np.float64)
+    edges = np.asarray(histogram["edges"])
+    if counts.sum() == 0:
+        return 0.0
+    cumulative = np.cumsum(counts)
+    middle = cumulative[-1] / 2
+    index = int(np.searchsorted(cumulative, middle))
+    before = cumulative[index - 1] if index else 0.0
+    fraction = (middle - before) / counts[index]
+    return float(edges[index] + fraction * (edges[index + 1] - edges[index]))
+
+
+class ChartRenderer:
+    """Headless chart renderer that reuses one Agg figure per chart kind"""
+
+    def __init__(self, dpi=100):
+        self.dpi = dpi
+        self.figures = {}
+
+    def _axes(self, kind, figsize):
+        """Cleared axes on the cached figure for this chart kind"""
+        figure = self.figures.get(kind)
+        if figure is None:
+            Figure, FigureCanvasAgg = _matplotlib()
+            figure = Figure(figsize=figsize, dpi=self.dpi)
+            FigureCanvasAgg(figure)
+            figure.add_subplot(1, 1, 1)
+            self.figures[kind] = figure
+        axes = figure.axes[0]
+        axes.clear()
+        return figure, axes
+
+    def _save(self, figure, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        figure.tight_layout()
+        figure.savefig(path)
+        return path
+
+    def render_distribution(self, histogram, path, title="Sentiment Distribution", color="skyblue"):
+        """Bar chart of a score histogram with mean and median markers"""
+        figure, axes = self._axes("distribution", (10, 6))
+        edges = histogram["edges"]
+        widths = [right - left for left, right in zip(edges[:-1], edges[1:])]
+        axes.bar(edges[:-1], histogram["counts"], width=widths, align="edge", color=color, edgecolor="black")
+        axes.set_title(title)
+        axes.set_xlabel("Sentiment Score (-1 to 1)")
+        axes.set_ylabel("Frequency")
+        axes.grid(True, alpha=0.3)
+
+        mean_sentiment = histogram_mean(histogram)
+        median_sentiment = histogram_median(histogram)
+        axes.axvline(mean_sentiment, color="red", linestyle="dashed", linewidth=1, label=f"Mean: {mean_sentiment:.2f}")
+        axes.axvline(median_sentiment, color="green", linestyle="dashed", linewidth=1, label=f"Median: {median_sentiment:.2f}")
+        axes.legend()
+        return self._save(figure, path)
+
+    def render_timeline(self, timeline, path, title="Sentiment Timeline"):
+        """Positive/negative percentage lines from timeline rows"""
+        figure, axes = self._axes("timeline", (10, 6))
+        dates = [d["date"] for d in timeline]
+        axes.plot(dates, [d["positive"] for d in timeline], "g-", label="Positive %", marker="o")
+        axes.plot(dates, [d["negative"] for d in timeline], "r-", label="Negative %", marker="s")
+        axes.set_title(title)
+        axes.set_xlabel("Date")
+        axes.set_ylabel("Percentage")
+        axes.legend()
+        axes.tick_params(axis="x", labelrotation=45)
+        return self._save(figure, path)
+
+    def render_regions(self, regions, path, title="Regional Sentiment Distribution"):
+        """Positive-sentiment bar per region from region rows"""
+        figure, axes = self._axes("regions", (10, 6))
+        axes.bar([r["name"] for r in regions], [r["sentiment"] for r in regions], color="skyblue", edgecolor="navy")
+        axes.set_title(title)
+        axes.set_xlabel("Province/Region")
+        axes.set_ylabel("Positive Sentiment %")
+        axes.tick_params(axis="x", labelrotation=45)
+        return self._save(figure, path)
+
+    def render_words(self, wordcloud, path, title="Top Words by Frequency", limit=10):
+        """Horizontal bars for the most frequent wordcloud terms"""
+        figure, axes = self._axes("words", (10, 6))
+        top_words = wordcloud[:limit]
+        axes.barh([w["text"] for w in top_words], [w["value"] for w in top_words],
+                  color=[SENTIMENT_COLORS.get(w["sentiment"], "gray") for w in top_words])
+        axes.set_title(title)
+        axes.set_xlabel("Frequency")
+        return self._save(figure, path)
+
+    def render_batch(self, jobs):
+        """Render (kind, data, path[, options]) jobs, reusing figures across them"""
+        renderers = {
+            "distribution": self.render_distribution,
+            "timeline": self.render_timeline,
+            "regions": self.render_regions,
+            "words": self.render_words
+        }
+        paths = []
+        for kind, data, path, *options in jobs:
+            paths.append(renderers[kind](data, path, **(options[0] if options else {})))
+        return paths
+
+    def close(self):
+        self.figures = {}
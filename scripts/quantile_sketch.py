@@ -0,0 +1,317 @@
+import base64
+import random
+import numpy as np
+from .tweet_record import utc_created_at
+
+QUANTILES = (0.1, 0.5, 0.9)
+
+
+class KLLSketch:
+    """Mergeable streaming quantile sketch (Karnin, Lang, Liberty 2016)
+
+    Values live in a hierarchy of compactors; an item at level h stands for
+    2**h observations. When a level outgrows its capacity it is sorted and
+    every other item (random offset) is promoted to the next level, so
+    memory stays around 3k values however many are added. Rank error is
+    roughly 1.7/k (~1% for k=200). count, sum, min and max are exact.
+    """
+
+    def __init__(self, k=200, seed=0):
+        self.k = k
+        self.levels = [np.empty(0)]
+        self.count = 0
+        self.sum = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+        self._buffer = []
+        self._rng = random.Random(seed)
+        self._np_rng = np.random.default_rng(seed)
+
+    def __len__(self):
+        return self.count
+
+    def _capacity(self, level):
+        # Lower levels get geometrically (2/3) smaller capacities than the top one
+        depth = len(self.levels) - level - 1
+        return max(int(np.ceil(self.k * (2 / 3) ** depth)), 2)
+
+    def update(self, value):
+        """Add one observation"""
+        self._buffer.append(value)
+        if len(self._buffer) >= self.k:
+            self._flush()
+
+    def update_many(self, values):
+        """Add an array of observations in one vectorized step"""
+        self._flush()
+        values = np.asarray(values, dtype=np.float64)
+        if len(values):
+            self._absorb(values)
+
+    def _flush(self):
+        if self._buffer:
+            values = np.array(self._buffer, dtype=np.float64)
+            self._buffer = []
+            self._absorb(values)
+
+    def _absorb(self, values):
+        self.count += len(values)
+        self.sum += float(values.sum())
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        # A large batch goes straight to the level where about k of its items
+        # remain: one sort, then every 2**h-th item from a random offset. The
+        # leftover items (a random subset) are placed the same way, lower down.
+        while len(values) > self.k:
+            level = int(np.ceil(np.log2(len(values) / self.k)))
+            step = 1 << level
+            values = self._np_rng.permutation(values)
+            usable = len(values) - len(values) % step
+            sampled = np.sort(values[:usable])[self._rng.randrange(step)::step]
+            while len(self.levels) <= level:
+                self.levels.append(np.empty(0))
+            self.levels[level] = np.concatenate((self.levels[level], sampled))
+            values = values[usable:]
+        self.levels[0] = np.concatenate((self.levels[0], values))
+        self._compress()
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self._capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                items = np.sort(items)
+                # Keep the odd item out so the promoted pairs preserve total weight
+                keep = items[-1:] if len(items) % 2 else items[:0]
+                paired = items[:len(items) - len(keep)]
+                promoted = paired[self._rng.randint(0, 1)::2]
+                self.levels[level] = keep
+                self.levels[level + 1] = np.concatenate((self.levels[level + 1], promoted))
+                # Adding a level shrinks every lower capacity; recheck from the bottom
+                level = 0
+                continue
+            level += 1
+
+    def merge(self, other):
+        """Fold another sketch (e.g. another shard or bucket) into this one"""
+        self._flush()
+        other._flush()
+        if other.count == 0:
+            return self
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate((self.levels[level], items))
+        self.count += other.count
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+        return self
+
+    def _weighted(self):
+        """Retained items sorted, with the cumulative weight at each"""
+        self._flush()
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(items), 1 << level, dtype=np.int64)
+                                  for level, items in enumerate(self.levels)])
+        order = np.argsort(items, kind="stable")
+        return items[order], np.cumsum(weights[order])
+
+    def quantile(self, q):
+        return self.quantiles([q])[0]
+
+    def quantiles(self, qs):
+        """Estimated values at the given ranks in [0, 1]"""
+        if self.count == 0:
+            return [0.0] * len(qs)
+        items, cumulative = self._weighted()
+        # An item of weight w covers the w ranks up to its cumulative weight; use their middle
+        middles = cumulative - np.diff(cumulative, prepend=0) / 2
+        results = []
+        for q in qs:
+            if q <= 0:
+                results.append(self.min)
+            elif q >= 1:
+                results.append(self.max)
+            else:
+                index = int(np.searchsorted(middles, q * cumulative[-1]))
+                results.append(float(items[min(index, len(items) - 1)]))
+        return results
+
+    def median(self):
+        return self.quantile(0.5)
+
+    def mean(self):
+        self._flush()
+        return self.sum / self.count if self.count else 0.0
+
+    def histogram(self, bins=20, value_range=(-1.0, 1.0)):
+        """Histogram in the score_histogram format (counts are estimates, total exact)
+
+        Bin counts are differences of the sketch's CDF at the bin edges,
+        interpolated between retained items rather than piling each item's
+        full weight into one bin.
+        """
+        self._flush()
+        edges = np.linspace(value_range[0], value_range[1], bins + 1)
+        if self.count:
+            items, cumulative = self._weighted()
+            # Each item covers the ranks from the previous item's up to its own
+            cdf = np.interp(edges, np.concatenate(([self.min], items)), np.concatenate(([0], cumulative)))
+            cdf[edges < self.min] = 0
+            cdf[edges >= self.max] = self.count
+            counts = np.diff(np.round(cdf))
+        else:
+            counts = np.zeros(bins)
+        return {
+            "edges": edges.tolist(),
+            "counts": [int(c) for c in counts],
+            "count": self.count,
+            "sum": self.sum
+        }
+
+    def summary(self, quantiles=QUANTILES):
+        """count, mean and the p10/median/p90 (by default) of the observations"""
+        p10, median, p90 = self.quantiles(quantiles)
+        return {
+            "count": len(self),
+            "mean": round(self.mean(), 3),
+            "p10": round(p10, 3),
+            "median": round(median, 3),
+            "p90": round(p90, 3)
+        }
+
+    def memory_bytes(self):
+        self._flush()
+        return sum(items.nbytes for items in self.levels)
+
+    def to_bytes(self):
+        """Serialize as a float64 header (k, count, sum, min, max, level sizes) plus the levels"""
+        self._flush()
+        header = [self.k, self.count, self.sum, self.min, self.max, len(self.levels)]
+        header += [len(items) for items in self.levels]
+        return np.concatenate([np.array(header, dtype=np.float64)] + self.levels).tobytes()
+
+    @classmethod
+    def from_bytes(cls, data):
+        values = np.frombuffer(data, dtype=np.float64)
+        sketch = cls(int(values[0]))
+        sketch.count = int(values[1])
+        sketch.sum, sketch.min, sketch.max = (float(v) for v in values[2:5])
+        level_count = int(values[5])
+        sizes = values[6:6 + level_count].astype(np.int64)
+        offsets = np.concatenate(([6 + level_count], 6 + level_count + np.cumsum(sizes)))
+        sketch.levels = [values[start:end].copy() for start, end in zip(offsets[:-1], offsets[1:])]
+        return sketch
+
+    def to_base64(self):
+        """JSON-safe form for shipping sketches between shards"""
+        return base64.b64encode(self.to_bytes()).decode("ascii")
+
+    @classmethod
+    def from_base64(cls, text):
+        return cls.from_bytes(base64.b64decode(text))
+
+
+class ScoreDistributionTracker:
+    """sentiment_score sketches overall and per day and region
+
+    Updated one tweet at a time with add() as tweets stream in, or a whole
+    TweetColumns batch with add_columns(). Trackers from different shards
+    merge, and summary() reports median, p10/p90 and a histogram per bucket.
+    """
+
+    def __init__(self, k=200):
+        self.k = k
+        self.overall = KLLSketch(k)
+        self.by_day = {}
+        self.by_region = {}
+
+    def _sketch(self, buckets, key):
+        sketch = buckets.get(key)
+        if sketch is None:
+            sketch = buckets[key] = KLLSketch(self.k)
+        return sketch
+
+    def add(self, tweet):
+        score = tweet.get("sentiment_score", 0.0)
+        self.overall.update(score)
+        self._sketch(self.by_day, utc_created_at(tweet["created_at"])[:10]).update(score)
+        self._sketch(self.by_region, tweet.get("user_location", "Unknown")).update(score)
+
+    def add_columns(self, columns):
+        """Add every row of a TweetColumns, one sorted slice per day and region"""
+        scores = columns["sentiment_score"]
+        self.overall.update_many(scores)
+        for buckets, codes, labels in ((self.by_day, columns["day"], columns.days),
+                                       (self.by_region, columns["location"], columns.locations)):
+            order = np.argsort(codes, kind="stable")
+            bounds = np.searchsorted(codes[order], np.arange(len(labels) + 1))
+            for code, label in enumerate(labels):
+                if bounds[code + 1] > bounds[code]:
+                    self._sketch(buckets, label).update_many(scores[order[bounds[code]:bounds[code + 1]]])
+
+    def merge(self, other):
+        """Combine another shard's tracker into this one"""
+        self.overall.merge(other.overall)
+        for mine, theirs in ((self.by_day, other.by_day), (self.by_region, other.by_region)):
+            for key, sketch in theirs.items():
+                self._sketch(mine, key).merge(sketch)
+        return self
+
+    def summary(self, bins=20):
+        """Distribution statistics for the aggregation output, with serialized sketches"""
+        return {
+            "overall": dict(self.overall.summary(), histogram=self.overall.histogram(bins)),
+            "byDay": {day: sketch.summary() for day, sketch in sorted(self.by_day.items())},
+            "byRegion": {region: sketch.summary() for region, sketch in self.by_region.items()},
+            "sketches": {
+                "overall": self.overall.to_base64(),
+                "byDay": {day: sketch.to_base64() for day, sketch in sorted(self.by_day.items())},
+                "byRegion": {region: sketch.to_base64() for region, sketch in self.by_region.items()}
+            }
+        }
+
+    def state(self):
+        """Serialized sketches, for checkpoints"""
+        return {
+            "overall": self.overall.to_bytes(),
+            "byDay": {day: sketch.to_bytes() for day, sketch in self.by_day.items()},
+            "byRegion": {region: sketch.to_bytes() for region, sketch in self.by_region.items()}
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        tracker = cls()
+        tracker.overall = KLLSketch.from_bytes(state["overall"])
+        tracker.k = tracker.overall.k
+        tracker.by_day = {day: KLLSketch.from_bytes(data) for day, data in state["byDay"].items()}
+        tracker.by_region = {region: KLLSketch.from_bytes(data) for region, data in state["byRegion"].items()}
+        return tracker
+
+    def memory_bytes(self):
+        sketches = [self.overall, *self.by_day.values(), *self.by_region.values()]
+        return sum(sketch.memory_bytes() for sketch in sketches)
+
+    @classmethod
+    def from_section(cls, section):
+        """Rebuild a tracker from a summary() section"""
+        sketches = section["sketches"]
+        tracker = cls()
+        tracker.overall = KLLSketch.from_base64(sketches["overall"])
+        tracker.k = tracker.overall.k
+        tracker.by_day = {day: KLLSketch.from_base64(s) for day, s in sketches["byDay"].items()}
+        tracker.by_region = {region: KLLSketch.from_base64(s) for region, s in sketches["byRegion"].items()}
+        return tracker
+
+
+def merge_distribution_sections(sections):
+    """Merge processed_data["distribution"] sections from several shards or time windows"""
+    sections = list(sections)
+    merged = ScoreDistributionTracker.from_section(sections[0])
+    for section in sections[1:]:
+        merged.merge(ScoreDistributionTracker.from_section(section))
+    return merged.summary()
@@ -0,0 +1,157 @@
+"""Search query language shared by the text index and the dashboard search
+
+    imran khan                      terms (adjacent terms are ANDed)
+    "imran khan"                    phrase
+    #ImranKhan OR #PTI              hashtags, boolean OR
+    pti AND NOT violence, pti -violence
+    (#Lahore OR loc:Islamabad)      parentheses, loc: region name or code
+    lang:ur since:2023-05-09 until:2023-05-10
+
+since: is inclusive and until: exclusive. AND binds tighter than OR.
+Queries parse to tuples: ("term", word), ("phrase", text), ("loc", value),
+("lang", value), ("since", iso), ("until", iso), ("and", [nodes]),
+("or", [nodes]) and ("not", node).
+"""
+import re
+from collections import OrderedDict
+
+OPERATORS = ("AND", "OR", "NOT")
+FIELDS = ("loc", "lang", "since", "until")
+
+QUERY_TOKEN = re.compile(r'\s*(?:(\()|(\))|(-)?(?:"([^"]*)"|([^\s()"]+)))')
+WORD = re.compile(r'"[^"]*"|\S+')
+
+
+def normalize_query(query):
+    """Cache key for a query: collapsed whitespace, case-folded except operators"""
+    return " ".join(word if word in OPERATORS else word.lower() for word in WORD.findall(query))
+
+
+def _lex(query):
+    tokens = []
+    for match in QUERY_TOKEN.finditer(query):
+        open_paren, close_paren, negate, phrase, word = match.groups()
+        if open_paren:
+            tokens.append(("(",))
+            continue
+        if close_paren:
+            tokens.append((")",))
+            continue
+        if word in OPERATORS and not negate:
+            tokens.append((word,))
+            continue
+        if negate:
+            tokens.append(("NOT",))
+        if phrase is not None:
+            tokens.append(("phrase", phrase))
+        elif word is not None:
+            field, _, value = word.partition(":")
+            if value and field.lower() in FIELDS:
+                tokens.append((field.lower(), value))
+            else:
+                tokens.append(("term", word))
+    return tokens
+
+
+def parse_query(query):
+    """Parse a query string into a node tree; raises ValueError on bad syntax"""
+    tokens = _lex(query)
+    position = 0
+
+    def peek():
+        return tokens[position][0] if position < len(tokens) else None
+
+    def take():
+        nonlocal position
+        position += 1
+        return tokens[position - 1]
+
+    def parse_or():
+        children = [parse_and()]
+        while peek() == "OR":
+            take()
+            children.append(parse_and())
+        return children[0] if len(children) == 1 else ("or", children)
+
+    def parse_and():
+        children = [parse_unary()]
+        while peek() not in (None, "OR", ")"):
+            if peek() == "AND":
+                take()
+            children.append(parse_unary())
+        return children[0] if len(children) == 1 else ("and", children)
+
+    def parse_unary():
+        kind = peek()
+        if kind == "NOT":
+            take()
+            return ("not", parse_unary())
+        if kind == "(":
+            take()
+            node = parse_or()
+            if peek() != ")":
+                raise ValueError(f"Unbalanced parentheses in query: {query!r}")
+            take()
+            return node
+        if kind in ("term", "phrase") or kind in FIELDS:
+            return take()
+        raise ValueError(f"Unexpected {kind or 'end of query'} in query: {query!r}")
+
+    if not tokens:
+        raise ValueError("Empty query")
+    node = parse_or()
+    if position != len(tokens):
+        raise ValueError(f"Unexpected {tokens[position][0]} in query: {query!r}")
+    return node
+
+
+def plan_query(node, estimate):
+    """Order a parsed query for execution
+
+    estimate(node) returns the expected number of matching rows for a leaf.
+    AND children are sorted most selective first (exclusions last), so each
+    later child only filters the rows left by the earlier ones. Returns
+    (planned node, estimated rows).
+    """
+    kind = node[0]
+    if kind == "and":
+        planned = [plan_query(child, estimate) for child in node[1]]
+        include = sorted((p for p in planned if p[0][0] != "not"), key=lambda p: p[1])
+        exclude = [p for p in planned if p[0][0] == "not"]
+        rows = include[0][1] if include else estimate(None)
+        return ("and", [p[0] for p in include + exclude]), rows
+    if kind == "or":
+        planned = [plan_query(child, estimate) for child in node[1]]
+        return ("or", [p[0] for p in planned]), min(sum(p[1] for p in planned), estimate(None))
+    if kind == "not":
+        child, rows = plan_query(node[1], estimate)
+        return ("not", child), estimate(None) - rows
+    return node, estimate(node)
+
+
+class PlanCache:
+    """LRU cache of planned queries keyed by normalized query string"""
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self.plans = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        plan = self.plans.get(key)
+        if plan is None:
+            self.misses += 1
+            return None
+        self.plans.move_to_end(key)
+        self.hits += 1
+        return plan
+
+    def put(self, key, plan):
+        self.plans[key] = plan
+        self.plans.move_to_end(key)
+        while len(self.plans) > self.max_entries:
+            self.plans.popitem(last=False)
+
+    def clear(self):
+        self.plans.clear()
@@ -0,0 +1,13 @@
+"""Sentiment scorer lookup shared by the CLI and the process-pool workers
+
+Plain Python; the chosen analysis module is imported on first use.
+"""
+
+
+def scorer_for(source):
+    """Scoring function (tweets -> scored tweets) for a tweet source name"""
+    if source.startswith("pakistan"):
+        from .pakistan_sentiment_analysis import analyze_pakistan_sentiment
+        return analyze_pakistan_sentiment
+    from .twitter_sentiment import analyze_sentiment
+    return analyze_sentiment
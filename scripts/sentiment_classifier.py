@@ -0,0 +1,285 @@
+"""Learned sentiment classifier over hashed unigram and bigram features
+
+Texts are split into words as the text index does (so Urdu script,
+Roman-Urdu and English all tokenize) and each word and adjacent
+word pair is hashed into one of n_features columns; no vocabulary is kept.
+The model is linear: a weight per feature and class, trained as
+multinomial naive Bayes (closed form, one pass) or softmax logistic
+regression (Adagrad over mini-batches). Inference for a batch is one
+sparse matrix product with the weights followed by a softmax.
+
+A batch is featurized in bulk: the texts are joined and tokenized in one
+regex pass, words are mapped to hashes through a cache of each distinct
+word's hash, and bigram columns are derived from word hashes in NumPy,
+so there is no per-tweet Python work.
+"""
+import operator
+import random
+import re
+import sys
+import time
+import zlib
+from itertools import compress, repeat
+import numpy as np
+from .categorical import NEGATIVE, POSITIVE, SENTIMENT_CODES, SENTIMENT_TYPES
+from .sentiment_logging import configure_logging, get_logger
+
+logger = get_logger(__name__)
+
+# Distinct words whose hashes are remembered at once
+WORD_CACHE_SIZE = 1 << 20
+
+# Texts of a batch are joined with SEPARATOR, which the batch tokenizer returns as its own token.
+# Words come out as phrase_words() gives them: hashtag marks dropped, mentions kept.
+SEPARATOR = "\x00"
+WORD_OR_SEPARATOR = re.compile(f"#?(@?\\w+|{SEPARATOR})")
+
+# Odd 64-bit multiplier mixing a word pair's hashes into a bigram hash
+BIGRAM_MIX = np.uint64(0x9E3779B97F4A7C15)
+
+
+class HashedSentimentClassifier:
+    """Linear positive/negative/neutral classifier on hashed n-gram features"""
+
+    def __init__(self, n_features=1 << 18, bigrams=True):
+        self.n_features = n_features
+        self.bigrams = bigrams
+        self.weights = np.zeros((n_features, len(SENTIMENT_TYPES)))
+        self.bias = np.zeros(len(SENTIMENT_TYPES))
+        self._words = {}
+
+    def _hashes(self, words):
+        """32-bit hash of every word, hashing each distinct word once"""
+        cache = self._words
+        hashes = list(map(cache.get, words))
+        if None in hashes:
+            if len(cache) > WORD_CACHE_SIZE:
+                cache.clear()
+                hashes = [None] * len(words)
+            # crc32 rather than hash(): columns must not change between processes
+            missing = set(compress(words, map(operator.is_, hashes, repeat(None))))
+            cache.update((word, zlib.crc32(word.encode("utf-8"))) for word in missing)
+            hashes = list(map(cache.get, words))
+        return np.array(hashes, dtype=np.uint64)
+
+    def _coordinates(self, texts):
+        """(rows, columns) of every feature occurrence in texts (COO form)
+
+        A bigram's column mixes its two words' hashes, so only words are
+        looked up and no pair strings are built.
+        """
+        joined = SEPARATOR.join(texts)
+        if joined.count(SEPARATOR) != max(len(texts) - 1, 0):
+            joined = SEPARATOR.join(text.replace(SEPARATOR, " ") for text in texts)
+        words = WORD_OR_SEPARATOR.findall(joined.lower())
+        boundary = np.fromiter(map(SEPARATOR.__eq__, words), dtype=bool, count=len(words))
+        rows = np.cumsum(boundary)
+        keep = ~boundary
+        hashes = self._hashes(words)
+        columns = hashes % np.uint64(self.n_features)
+        if self.bigrams and words:
+            pairs = ((hashes[:-1] << np.uint64(32)) | hashes[1:]) * BIGRAM_MIX >> np.uint64(32)
+            columns = np.concatenate((columns, pairs % np.uint64(self.n_features)))
+            rows = np.concatenate((rows, rows[:-1]))
+            keep = np.concatenate((keep, keep[:-1] & keep[1:]))
+        return rows[keep], columns[keep].astype(np.int64)
+
+    def transform(self, texts):
+        """CSR feature matrix of texts as (indptr, indices); every value is 1"""
+        rows, columns = self._coordinates(texts)
+        order = np.argsort(rows, kind="stable")
+        indptr = np.searchsorted(rows[order], np.arange(len(texts) + 1))
+        return indptr, columns[order]
+
+    def _logits(self, rows, columns, row_count):
+        """Sparse product X @ weights + bias, X given by its nonzero (rows, columns)"""
+        gathered = self.weights[columns]
+        logits = np.empty((row_count, len(SENTIMENT_TYPES)))
+        for code in range(len(SENTIMENT_TYPES)):
+            logits[:, code] = np.bincount(rows, weights=gathered[:, code], minlength=row_count)
+        return logits + self.bias
+
+    @staticmethod
+    def _softmax(logits):
+        logits = logits - logits.max(axis=1, keepdims=True)
+        np.exp(logits, out=logits)
+        return logits / logits.sum(axis=1, keepdims=True)
+
+    def predict_proba(self, texts):
+        """Class probabilities per text, columns in SENTIMENT_TYPES order
+
+        Each distinct text in the batch is scored once.
+        """
+        distinct = list(dict.fromkeys(texts))
+        position = dict(zip(distinct, range(len(distinct))))
+        rows = np.fromiter(map(position.__getitem__, texts), dtype=np.int64, count=len(texts))
+        return self._softmax(self._logits(*self._coordinates(distinct), len(distinct)))[rows]
+
+    def predict(self, texts):
+        """Sentiment codes (POSITIVE/NEGATIVE/NEUTRAL) per text"""
+        return self.predict_proba(texts).argmax(axis=1)
+
+    def _labels(self, labels):
+        return np.array([SENTIMENT_CODES.encode(label) if isinstance(label, str) else label for label in labels],
+                        dtype=np.int64)
+
+    def fit_naive_bayes(self, texts, labels, alpha=1.0):
+        """Multinomial naive Bayes: log feature likelihoods per class as weights, log priors as bias"""
+        labels = self._labels(labels)
+        indptr, indices = self.transform(texts)
+        row_labels = np.repeat(labels, np.diff(indptr))
+        class_count = len(SENTIMENT_TYPES)
+        counts = np.bincount(indices * class_count + row_labels,
+                             minlength=self.n_features * class_count).reshape(-1, class_count) + alpha
+        self.weights = np.log(counts / counts.sum(axis=0))
+        priors = np.bincount(labels, minlength=class_count) + 1.0
+        self.bias = np.log(priors / priors.sum())
+        return self
+
+    def fit_logistic(self, texts, labels, epochs=5, batch_size=512, learning_rate=0.5, l2=1e-6, seed=0):
+        """Softmax logistic regression by Adagrad over shuffled mini-batches"""
+        labels = self._labels(labels)
+        indptr, indices = self.transform(texts)
+        class_count = len(SENTIMENT_TYPES)
+        self.weights = np.zeros((self.n_features, class_count))
+        self.bias = np.zeros(class_count)
+        squared = np.full((self.n_features, class_count), 1e-8)
+        bias_squared = np.full(class_count, 1e-8)
+        rng = np.random.default_rng(seed)
+
+        for epoch in range(epochs):
+            order = rng.permutation(len(labels))
+            loss = 0.0
+            for start in range(0, len(order), batch_size):
+                batch = order[start:start + batch_size]
+                # Mini-batch rows as their own CSR matrix
+                lengths = indptr[batch + 1] - indptr[batch]
+                batch_indptr = np.concatenate(([0], np.cumsum(lengths)))
+                positions = np.repeat(indptr[batch] - batch_indptr[:-1], lengths) + np.arange(batch_indptr[-1])
+                batch_indices = indices[positions]
+
+                batch_rows = np.repeat(np.arange(len(batch)), lengths)
+                probabilities = self._softmax(self._logits(batch_rows, batch_indices, len(batch)))
+                loss -= np.log(probabilities[np.arange(len(batch)), labels[batch]] + 1e-12).sum()
+                errors = probabilities
+                errors[np.arange(len(batch)), labels[batch]] -= 1
+                errors /= len(batch)
+
+                # Gradient only for the features present in the batch
+                columns, inverse = np.unique(batch_indices, return_inverse=True)
+                gradient = np.zeros((len(columns), class_count))
+                np.add.at(gradient, inverse, np.repeat(errors, lengths, axis=0))
+                gradient += l2 * self.weights[columns]
+                squared[columns] += gradient ** 2
+                self.weights[columns] -= learning_rate * gradient / np.sqrt(squared[columns])
+                bias_gradient = errors.sum(axis=0)
+                bias_squared += bias_gradient ** 2
+                self.bias -= learning_rate * bias_gradient / np.sqrt(bias_squared)
+            logger.info("Epoch {}: mean log loss {:.4f}", epoch + 1, loss / len(labels))
+        return self
+
+    def fit(self, texts, labels, method="logistic", **options):
+        if method == "logistic":
+            return self.fit_logistic(texts, labels, **options)
+        if method == "naive_bayes":
+            return self.fit_naive_bayes(texts, labels, **options)
+        raise ValueError(f"Unknown training method: {method!r}")
+
+    def score(self, tweets):
+        """Set sentiment_type and sentiment_score (P(positive) - P(negative)) on tweets
+
+        Near-duplicates reuse their canonical tweet's result, as the keyword
+        scorers do.
+        """
+        probabilities = self.predict_proba([tweet["text"] for tweet in tweets])
+        codes = probabilities.argmax(axis=1).tolist()
+        scores = (probabilities[:, POSITIVE] - probabilities[:, NEGATIVE]).tolist()
+        scored_groups = {}
+        for tweet, code, score in zip(tweets, codes, scores):
+            if not tweet.get("is_canonical", True) and tweet["dup_group"] in scored_groups:
+                tweet["sentiment_type"], tweet["sentiment_score"] = scored_groups[tweet["dup_group"]]
+                continue
+            tweet["sentiment_type"] = SENTIMENT_TYPES[code]
+            tweet["sentiment_score"] = score
+            if "dup_group" in tweet:
+                scored_groups[tweet["dup_group"]] = (tweet["sentiment_type"], score)
+        return tweets
+
+    def accuracy(self, texts, labels):
+        return float((self.predict(texts) == self._labels(labels)).mean())
+
+    def save(self, path):
+        """Store the weights as a compressed .npz"""
+        np.savez_compressed(path, weights=self.weights, bias=self.bias, bigrams=self.bigrams)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as saved:
+            model = cls(saved["weights"].shape[0], bool(saved["bigrams"]))
+            model.weights = saved["weights"]
+            model.bias = saved["bias"]
+        return model
+
+
+def urdu_examples(count):
+    """Short Urdu texts labelled by the URDU_KEYWORDS entry they are built around
+
+    Keywords are drawn by frequency; each text adds up to two neutral
+    keywords (places, institutions) as context.
+    """
+    from .lexicon import URDU_KEYWORDS
+    keywords = list(URDU_KEYWORDS)
+    frequencies = [URDU_KEYWORDS[keyword]["frequency"] for keyword in keywords]
+    neutral = [keyword for keyword in keywords if URDU_KEYWORDS[keyword]["sentiment"] == "neutral"]
+    texts = []
+    labels = []
+    for _ in range(count):
+        keyword = random.choices(keywords, weights=frequencies, k=1)[0]
+        words = [keyword] + random.sample(neutral, random.randint(0, 2))
+        random.shuffle(words)
+        texts.append(" ".join(words) + " #9thMay")
+        labels.append(URDU_KEYWORDS[keyword]["sentiment"])
+    return texts, labels
+
+
+def training_examples(count=20000, urdu_share=0.1):
+    """(texts, labels) from the labelled synthetic generators
+
+    Mixes PakistanSentimentProcessor's keyword tweets, the incident
+    simulator's fragment tweets and urdu_examples().
+    """
+    from .pakistan_data_processor import PakistanSentimentProcessor
+    from .pakistan_sentiment_analysis import simulate_pakistan_twitter_data
+    urdu = int(count * urdu_share)
+    processor_count = (count - urdu) // 2
+    tweets = PakistanSentimentProcessor(data=[])._generate_pakistan_data(count=processor_count)
+    tweets += simulate_pakistan_twitter_data(count=count - urdu - processor_count)
+    texts, labels = urdu_examples(urdu)
+    return [tweet["text"] for tweet in tweets] + texts, [tweet["sentiment_type"] for tweet in tweets] + labels
+
+
+def main():
+    configure_logging("WARNING")
+    random.seed(7)
+    np.random.seed(7)
+    texts, labels = training_examples(40000)
+    test_texts, test_labels = training_examples(10000)
+
+    for method in ("naive_bayes", "logistic"):
+        model = HashedSentimentClassifier().fit(texts, labels, method=method)
+        print(f"{method}: held-out accuracy {model.accuracy(test_texts, test_labels):.3f}")
+
+    from .pakistan_sentiment_analysis import analyze_pakistan_sentiment, simulate_pakistan_twitter_data
+    tweets = simulate_pakistan_twitter_data(count=200000)
+    # The simulator draws from a few dozen templates; a per-tweet suffix keeps every
+    # text distinct so the timing covers featurizing each one, not a repeat lookup
+    for i, tweet in enumerate(tweets):
+        tweet["text"] = f"{tweet['text']} ref{i}"
+    started = time.perf_counter()
+    analyze_pakistan_sentiment(tweets, classifier=model)
+    elapsed = time.perf_counter() - started
+    print(f"Scored {len(tweets)} distinct tweets in {elapsed:.2f}s ({len(tweets) / elapsed:,.0f} tweets/s)")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+import atexit
+import contextlib
+import logging
+import logging.handlers
+import queue
+import sys
+
+ROOT_LOGGER = "sentiment"
+
+logging.getLogger(ROOT_LOGGER).addHandler(logging.NullHandler())
+
+
+class BraceMessage:
+    """Message whose str.format() call is deferred until a handler emits it"""
+
+    __slots__ = ("fmt", "args")
+
+    def __init__(self, fmt, args):
+        self.fmt = fmt
+        self.args = args
+
+    def __str__(self):
+        return self.fmt.format(*self.args) if self.args else self.fmt
+
+
+class SentimentLogger(logging.LoggerAdapter):
+    """Logger taking str.format-style arguments, formatted lazily
+
+    logger.info("Processing {:,} tweets", count) costs a level check when
+    INFO is disabled and defers formatting until the record is emitted.
+    """
+
+    def log(self, level, msg, *args, **kwargs):
+        if self.isEnabledFor(level):
+            msg, kwargs = self.process(msg, kwargs)
+            self.logger._log(level, BraceMessage(msg, args), (), **kwargs)
+
+
+def get_logger(name):
+    """Logger under the shared "sentiment" namespace"""
+    short_name = name.rsplit(".", 1)[-1]
+    return SentimentLogger(logging.getLogger(f"{ROOT_LOGGER}.{short_name}"), {})
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """Queue handler that leaves formatting to the listener thread"""
+
+    def prepare(self, record):
+        return record
+
+
+_listener = None
+
+
+def configure_logging(level="INFO", stream=None, fmt="%(message)s", async_output=False, handler=None):
+    """Attach an output handler to the sentiment loggers
+
+    With async_output the caller only enqueues records; a background
+    QueueListener formats and writes them. Returns the root sentiment logger.
+    """
+    global _listener
+    shutdown_logging()
+
+    root = logging.getLogger(ROOT_LOGGER)
+    for existing in list(root.handlers):
+        if not isinstance(existing, logging.NullHandler):
+            root.removeHandler(existing)
+    root.setLevel(level)
+    root.propagate = False
+
+    output = handler or logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(logging.Formatter(fmt))
+
+    if async_output:
+        records = queue.SimpleQueue()
+        _listener = logging.handlers.QueueListener(records, output, respect_handler_level=True)
+        _listener.start()
+        root.addHandler(_DeferredQueueHandler(records))
+    else:
+        root.addHandler(output)
+    return root
+
+
+def shutdown_logging():
+    """Drain and stop the asynchronous listener, if one is running"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(shutdown_logging)
+
+
+@contextlib.contextmanager
+def quiet(level=logging.WARNING):
+    """Temporarily raise the sentiment log level, e.g. around timed stages"""
+    root = logging.getLogger(ROOT_LOGGER)
+    previous = root.level
+    root.setLevel(level)
+    try:
+        yield
+    finally:
+        root.setLevel(previous)
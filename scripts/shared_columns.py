@@ -0,0 +1,223 @@
+"""Tweet columns in shared memory for process-pool workers
+
+The parent copies a TweetColumns (and optionally the tweet texts) into one
+multiprocessing.shared_memory block once. Jobs then carry only a small
+SharedColumnsDescriptor and a row range; workers attach to the block and
+read the same physical arrays through NumPy views, with nothing pickled
+but the descriptor on the way in and small partial aggregates on the way
+out. Scoring workers write their scores straight into the shared
+sentiment_score column.
+"""
+import random
+from multiprocessing import Pool, shared_memory
+import numpy as np
+from .categorical import SENTIMENT_TYPES
+from .quantile_sketch import ScoreDistributionTracker
+from .scoring import scorer_for
+from .sentiment_logging import get_logger
+from .tweet_columns import TweetColumns
+
+logger = get_logger(__name__)
+
+ALIGNMENT = 64
+
+# Blocks this worker process is attached to, by name, reused across jobs
+_attached = {}
+
+
+class SharedColumnsDescriptor:
+    """Picklable handle for a shared block: its name and where each column lives in it"""
+
+    __slots__ = ("name", "fields", "locations", "days", "rows")
+
+    def __init__(self, name, fields, locations, days, rows):
+        self.name = name
+        self.fields = fields
+        self.locations = locations
+        self.days = days
+        self.rows = rows
+
+    def __getstate__(self):
+        return (self.name, self.fields, self.locations, self.days, self.rows)
+
+    def __setstate__(self, state):
+        self.name, self.fields, self.locations, self.days, self.rows = state
+
+
+class SharedColumns:
+    """TweetColumns whose arrays are views into a shared memory block
+
+    SharedColumns.create() in the parent owns the block and unlinks it on
+    close(); SharedColumns.attach() in a worker maps the existing block.
+    """
+
+    def __init__(self, block, descriptor, owner):
+        self.block = block
+        self.descriptor = descriptor
+        self.owner = owner
+        self.arrays = {
+            name: np.ndarray((length,), dtype=np.dtype(dtype), buffer=block.buf, offset=offset)
+            for name, dtype, offset, length in descriptor.fields
+        }
+        self.columns = TweetColumns({name: values for name, values in self.arrays.items() if not name.startswith("_")},
+                                    descriptor.locations, descriptor.days)
+
+    def __len__(self):
+        return self.descriptor.rows
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @classmethod
+    def create(cls, columns, texts=None, extra=None):
+        """Copy columns, plus texts and extra per-row arrays if given, into a new shared block
+
+        Extra arrays are named with a leading underscore so they stay out of .columns.
+        """
+        arrays = dict(columns.columns)
+        arrays.update(extra or {})
+        if texts is not None:
+            encoded = [text.encode("utf-8") for text in texts]
+            arrays["_text_offsets"] = np.concatenate(([0], np.cumsum([len(e) for e in encoded]))).astype(np.int64)
+            arrays["_text_bytes"] = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+
+        fields = []
+        size = 0
+        for name, values in arrays.items():
+            fields.append((name, values.dtype.str, size, len(values)))
+            size += -(-values.nbytes // ALIGNMENT) * ALIGNMENT
+
+        block = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        descriptor = SharedColumnsDescriptor(block.name, tuple(fields), list(columns.locations),
+                                             list(columns.days), len(columns))
+        shared = cls(block, descriptor, owner=True)
+        for name, values in arrays.items():
+            shared.arrays[name][:] = values
+        logger.info("Placed {} rows ({} bytes) in shared memory block {}", len(columns), size, block.name)
+        return shared
+
+    @classmethod
+    def attach(cls, descriptor):
+        """Map an existing block (cached per process, so repeated jobs attach once)"""
+        shared = _attached.get(descriptor.name)
+        if shared is None:
+            block = shared_memory.SharedMemory(name=descriptor.name)
+            shared = _attached[descriptor.name] = cls(block, descriptor, owner=False)
+        return shared
+
+    def rows(self, start, stop):
+        """Zero-copy TweetColumns over rows [start, stop)"""
+        return self.columns.take(slice(start, stop))
+
+    def texts(self, start, stop):
+        offsets = self.arrays["_text_offsets"]
+        data = self.arrays["_text_bytes"]
+        return [bytes(data[offsets[i]:offsets[i + 1]]).decode("utf-8") for i in range(start, stop)]
+
+    def close(self):
+        """Drop the views and the mapping; the owner also frees the block"""
+        self.arrays = {}
+        self.columns = None
+        self.block.close()
+        if self.owner:
+            self.block.unlink()
+
+
+def row_ranges(rows, chunk_rows):
+    return [(start, min(start + chunk_rows, rows)) for start in range(0, rows, chunk_rows)]
+
+
+def partial_aggregates(columns):
+    """Small, mergeable aggregates of one chunk: sentiment counts by day and region,
+    score sums and score quantile sketches"""
+    type_count = len(SENTIMENT_TYPES)
+    types = columns["sentiment_type"].astype(np.int64)
+    engagement = columns["retweet_count"] + columns["favorite_count"] + columns["reply_count"]
+    tracker = ScoreDistributionTracker()
+    tracker.add_columns(columns)
+    return {
+        "rows": len(columns),
+        "byDay": np.bincount(columns["day"] * type_count + types,
+                             minlength=len(columns.days) * type_count).reshape(-1, type_count),
+        "byRegion": np.bincount(columns["location"] * type_count + types,
+                                minlength=len(columns.locations) * type_count).reshape(-1, type_count),
+        "scoreSum": float(columns["sentiment_score"].sum()),
+        "engagement": int(engagement.sum()),
+        "distribution": tracker
+    }
+
+
+def merge_partials(partials):
+    """Combine partial_aggregates() results from every chunk"""
+    partials = list(partials)
+    merged = dict(partials[0])
+    for partial in partials[1:]:
+        merged["rows"] += partial["rows"]
+        merged["byDay"] = merged["byDay"] + partial["byDay"]
+        merged["byRegion"] = merged["byRegion"] + partial["byRegion"]
+        merged["scoreSum"] += partial["scoreSum"]
+        merged["engagement"] += partial["engagement"]
+        merged["distribution"].merge(partial["distribution"])
+    return merged
+
+
+def _aggregate_job(job):
+    """Worker entry point: aggregate one row range of the shared columns"""
+    descriptor, start, stop, func = job
+    return func(SharedColumns.attach(descriptor).rows(start, stop))
+
+
+def parallel_aggregate(columns, workers=2, chunk_rows=100000, func=partial_aggregates, merge=merge_partials):
+    """Aggregate TweetColumns across a process pool without pickling the rows
+
+    func (a module-level function, so it can be sent to workers) maps a
+    chunk's TweetColumns view to a small partial result; merge combines them.
+    """
+    with SharedColumns.create(columns) as shared:
+        jobs = [(shared.descriptor, start, stop, func) for start, stop in row_ranges(len(columns), chunk_rows)]
+        with Pool(workers) as pool:
+            partials = pool.map(_aggregate_job, jobs)
+    return merge(partials)
+
+
+def _score_job(job):
+    """Worker entry point: score one row range in place in the shared sentiment_score column"""
+    descriptor, start, stop, source, seed = job
+    random.seed(seed)
+    shared = SharedColumns.attach(descriptor)
+    types = shared.arrays["sentiment_type"][start:stop].tolist()
+    dup_groups = shared.arrays["_dup_group"][start:stop].tolist()
+    canonical = shared.arrays["_is_canonical"][start:stop].tolist()
+    tweets = []
+    for text, code, dup_group, is_canonical in zip(shared.texts(start, stop), types, dup_groups, canonical):
+        tweet = {"text": text, "sentiment_type": SENTIMENT_TYPES[code]}
+        if dup_group >= 0:
+            tweet["dup_group"] = dup_group
+            tweet["is_canonical"] = is_canonical
+        tweets.append(tweet)
+    scorer_for(source)(tweets)
+    shared.arrays["sentiment_score"][start:stop] = [tweet["sentiment_score"] for tweet in tweets]
+    return stop - start
+
+
+def parallel_score(tweets, source, workers=2, chunk_rows=50000, seed=None):
+    """Score tweets in a process pool; workers read texts and write scores through shared memory"""
+    columns = TweetColumns.from_tweets(tweets)
+    # Duplicate groups let the scorers reuse a canonical tweet's score, as in the unshared path
+    extra = {
+        "_dup_group": np.fromiter((tweet.get("dup_group", -1) for tweet in tweets), dtype=np.int64, count=len(tweets)),
+        "_is_canonical": np.fromiter((tweet.get("is_canonical", True) for tweet in tweets), dtype=bool, count=len(tweets))
+    }
+    base_seed = seed if seed is not None else random.randrange(1 << 30)
+    with SharedColumns.create(columns, texts=[tweet["text"] for tweet in tweets], extra=extra) as shared:
+        jobs = [(shared.descriptor, start, stop, source, base_seed + i)
+                for i, (start, stop) in enumerate(row_ranges(len(tweets), chunk_rows))]
+        with Pool(workers) as pool:
+            pool.map(_score_job, jobs)
+        scores = shared.arrays["sentiment_score"].tolist()
+    for tweet, score in zip(tweets, scores):
+        tweet["sentiment_score"] = score
+    return tweets
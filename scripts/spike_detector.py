@@ -0,0 +1,223 @@
+import math
+from datetime import datetime, timedelta
+
+EPOCH = datetime(1970, 1, 1)
+
+SENTIMENT_VALUES = {"positive": 1.0, "negative": -1.0, "neutral": 0.0}
+
+
+class EWMAStat:
+    """Exponentially weighted moving mean and variance for one series"""
+
+    __slots__ = ("alpha", "mean", "var", "count")
+
+    def __init__(self, alpha=0.3):
+        self.alpha = alpha
+        self.mean = 0.0
+        self.var = 0.0
+        self.count = 0
+
+    def zscore(self, value, min_std=1.0):
+        """Score a value against the current estimate (before updating it)"""
+        std = max(math.sqrt(self.var), min_std)
+        return (value - self.mean) / std
+
+    def update(self, value):
+        """Fold a new observation into the running mean and variance"""
+        if self.count == 0:
+            self.mean = value
+        else:
+            diff = value - self.mean
+            increment = self.alpha * diff
+            self.mean += increment
+            self.var = (1 - self.alpha) * (self.var + diff * increment)
+        self.count += 1
+
+
+class SpikeDetector:
+    """Online volume/sentiment spike detection over rolling time buckets
+
+    Tweets are counted into fixed-width time buckets. When a bucket closes,
+    every tracked series (overall, per keyword, per region) is scored against
+    its EWMA baseline and folded into it, so the cost per tweet is constant.
+    """
+
+    def __init__(self, bucket_minutes=60, alpha=0.3, z_threshold=3.0, warmup=6,
+                 keywords=None, track_regions=True, min_volume=5):
+        self.bucket_seconds = bucket_minutes * 60
+        self.alpha = alpha
+        self.z_threshold = z_threshold
+        self.warmup = warmup
+        self.keywords = set(k.lower() for k in keywords) if keywords else None
+        self.track_regions = track_regions
+        self.min_volume = min_volume
+
+        self.current_bucket = None
+        self.bucket_counts = {}
+        self.bucket_scores = {}
+        self.volume_stats = {}
+        self.sentiment_stats = {}
+        self.events = []
+
+    def _bucket_of(self, tweet):
+        """Map a tweet's created_at timestamp to a bucket index"""
+        created_at = datetime.fromisoformat(tweet["created_at"])
+        if created_at.tzinfo is not None:
+            created_at = created_at.replace(tzinfo=None) - created_at.utcoffset()
+        return int((created_at - EPOCH).total_seconds() // self.bucket_seconds)
+
+    def _series_of(self, tweet):
+        """Return the series keys a tweet contributes to"""
+        series = ["all"]
+
+        if self.track_regions:
+            series.append(f"region:{tweet.get('user_location', 'Unknown')}")
+
+        keywords = tweet.get("keywords")
+        if keywords is None and self.keywords:
+            keywords = tweet["text"].lower().replace("#", " ").split()
+        if keywords:
+            seen = set()
+            for keyword in keywords:
+                keyword = keyword.lower()
+                if keyword in seen or (self.keywords is not None and keyword not in self.keywords):
+                    continue
+                seen.add(keyword)
+                series.append(f"keyword:{keyword}")
+
+        return series
+
+    def _score_of(self, tweet):
+        """Numeric sentiment for a tweet, falling back to its label"""
+        score = tweet.get("sentiment_score")
+        if score is None:
+            score = SENTIMENT_VALUES.get(tweet.get("sentiment_type"), 0.0)
+        return score
+
+    def update(self, tweet):
+        """Add one tweet; returns spike events emitted by any bucket it closed"""
+        bucket = self._bucket_of(tweet)
+        emitted = []
+
+        if self.current_bucket is None:
+            self.current_bucket = bucket
+        elif bucket > self.current_bucket:
+            emitted = self._close_bucket(bucket)
+        # Late tweets are counted into the open bucket
+
+        score = self._score_of(tweet)
+        for key in self._series_of(tweet):
+            self.bucket_counts[key] = self.bucket_counts.get(key, 0) + 1
+            self.bucket_scores[key] = self.bucket_scores.get(key, 0.0) + score
+
+        return emitted
+
+    def update_many(self, tweets):
+        """Add tweets in arrival order and return all emitted events"""
+        emitted = []
+        for tweet in tweets:
+            emitted.extend(self.update(tweet))
+        return emitted
+
+    def flush(self):
+        """Close the open bucket and return its events"""
+        if self.current_bucket is None:
+            return []
+        return self._close_bucket(self.current_bucket + 1)
+
+    def _close_bucket(self, next_bucket):
+        """Score and fold the open bucket, then advance to next_bucket"""
+        emitted = []
+        bucket_start = (EPOCH + timedelta(seconds=self.current_bucket * self.bucket_seconds)).isoformat()
+
+        # Series that went quiet in this bucket still need a zero observation
+        for key in self.volume_stats:
+            self.bucket_counts.setdefault(key, 0)
+
+        for key, volume in self.bucket_counts.items():
+            volume_stat = self.volume_stats.get(key)
+            if volume_stat is None:
+                volume_stat = self.volume_stats[key] = EWMAStat(self.alpha)
+                self.sentiment_stats[key] = EWMAStat(self.alpha)
+            sentiment_stat = self.sentiment_stats[key]
+
+            if volume_stat.count >= self.warmup:
+                # Poisson floor keeps small counts from producing huge z-scores
+                z = volume_stat.zscore(volume, min_std=max(1.0, math.sqrt(volume_stat.mean)))
+                if z >= self.z_threshold and volume >= self.min_volume:
+                    emitted.append(self._event(bucket_start, key, "volume", volume, volume_stat.mean, z))
+            volume_stat.update(volume)
+
+            if volume:
+                mean_score = self.bucket_scores[key] / volume
+                if sentiment_stat.count >= self.warmup and volume >= self.min_volume:
+                    z = sentiment_stat.zscore(mean_score, min_std=0.05)
+                    if abs(z) >= self.z_threshold:
+                        emitted.append(self._event(bucket_start, key, "sentiment", mean_score, sentiment_stat.mean, z))
+                sentiment_stat.update(mean_score)
+
+        # Decay baselines through empty buckets; beyond ~10/alpha steps they are at zero anyway
+        gap = min(next_bucket - self.current_bucket - 1, int(10 / self.alpha))
+        for _ in range(max(gap, 0)):
+            for volume_stat in self.volume_stats.values():
+                volume_stat.update(0)
+
+        self.current_bucket = next_bucket
+        self.bucket_counts = {}
+        self.bucket_scores = {}
+        self.events.extend(emitted)
+        return emitted
+
+    def options(self):
+        """Constructor arguments that rebuild this detector's configuration"""
+        return {
+            "bucket_minutes": self.bucket_seconds / 60,
+            "alpha": self.alpha,
+            "z_threshold": self.z_threshold,
+            "warmup": self.warmup,
+            "keywords": sorted(self.keywords) if self.keywords is not None else None,
+            "track_regions": self.track_regions,
+            "min_volume": self.min_volume
+        }
+
+    def fresh_copy(self):
+        """A detector with the same options and no baselines or events"""
+        return type(self)(**self.options())
+
+    def state(self):
+        """Copy of the open bucket, baselines and emitted events, for checkpoints"""
+        return {
+            "options": self.options(),
+            "currentBucket": self.current_bucket,
+            "bucketCounts": dict(self.bucket_counts),
+            "bucketScores": dict(self.bucket_scores),
+            "volumeStats": {key: (s.mean, s.var, s.count) for key, s in self.volume_stats.items()},
+            "sentimentStats": {key: (s.mean, s.var, s.count) for key, s in self.sentiment_stats.items()},
+            "events": list(self.events)
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        detector = cls(**state["options"])
+        detector.current_bucket = state["currentBucket"]
+        detector.bucket_counts = dict(state["bucketCounts"])
+        detector.bucket_scores = dict(state["bucketScores"])
+        for stats, saved in ((detector.volume_stats, state["volumeStats"]),
+                             (detector.sentiment_stats, state["sentimentStats"])):
+            for key, (mean, var, count) in saved.items():
+                stat = stats[key] = EWMAStat(detector.alpha)
+                stat.mean, stat.var, stat.count = mean, var, count
+        detector.events = list(state["events"])
+        return detector
+
+    def _event(self, bucket_start, key, metric, value, expected, z):
+        """Build a spike event record"""
+        return {
+            "bucket": bucket_start,
+            "series": key,
+            "metric": metric,
+            "value": round(value, 3),
+            "expected": round(expected, 3),
+            "zscore": round(z, 2),
+            "direction": "up" if z > 0 else "down"
+        }
@@ -0,0 +1,134 @@
+import hashlib
+import json
+import os
+import pickle
+import time
+from .lexicon import lexicon_version
+from .sentiment_logging import get_logger
+from .tweet_record import json_default
+
+logger = get_logger(__name__)
+
+MISS = object()
+
+
+def fingerprint_tweets(tweets):
+    """Content digest of a tweet list; any added, removed or edited tweet changes it"""
+    digest = hashlib.blake2b(digest_size=16)
+    for tweet in tweets:
+        digest.update(json.dumps(tweet, sort_keys=True, default=json_default).encode("utf-8"))
+        digest.update(b"\n")
+    return digest.hexdigest()
+
+
+def fingerprint_file(path, chunk_size=1 << 20):
+    """Content digest of an input file, without parsing or re-serializing its tweets"""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class StageCache:
+    """On-disk cache of stage results with size-bounded LRU eviction
+
+    Entries are keyed by stage name, input fingerprint, stage parameters and
+    the lexicon version. A hit refreshes the entry's mtime, which is the
+    recency used for eviction once the directory exceeds max_bytes.
+    """
+
+    def __init__(self, directory, max_bytes=256 << 20):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, stage, fingerprint, params=None):
+        payload = json.dumps([stage, fingerprint, params, lexicon_version()], sort_keys=True, default=str)
+        return f"{stage}-{hashlib.blake2b(payload.encode('utf-8'), digest_size=16).hexdigest()}"
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + ".pkl")
+
+    def get(self, key):
+        """Cached value for key, or MISS"""
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                value = pickle.load(f)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            self.misses += 1
+            return MISS
+        os.utime(path, ns=(time.time_ns(), time.time_ns()))
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        """Store value atomically, then evict least recently used entries over budget"""
+        path = self._path(key)
+        temp = f"{path}.{os.getpid()}.tmp"
+        with open(temp, "wb") as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp, path)
+        self.evict(keep=path)
+
+    def fetch(self, stage, fingerprint, params, compute):
+        """Return the cached result for this stage/input/params, computing and storing it on a miss"""
+        key = self.key(stage, fingerprint, params)
+        value = self.get(key)
+        if value is MISS:
+            value = compute()
+            self.put(key, value)
+        else:
+            logger.info("Reusing cached {} result", stage)
+        return value
+
+    def entries(self):
+        """(mtime_ns, size, path) for every entry, oldest first"""
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".pkl"):
+                path = os.path.join(self.directory, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime_ns, stat.st_size, path))
+        entries.sort()
+        return entries
+
+    def size_bytes(self):
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self, keep=None):
+        """Delete the oldest entries until the cache fits in max_bytes"""
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        evicted = 0
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            evicted += 1
+        return evicted
+
+    def clear(self):
+        for _, _, path in self.entries():
+            os.remove(path)
+
+    def stats(self):
+        entries = self.entries()
+        return {
+            "entries": len(entries),
+            "bytes": sum(size for _, size, _ in entries),
+            "hits": self.hits,
+            "misses": self.misses
+        }
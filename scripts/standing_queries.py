@@ -0,0 +1,340 @@
+import sys
+from .categorical import SENTIMENT_CODES, SENTIMENT_TYPES, UNKNOWN_LOCATION
+from .lexicon import get_pakistan_region_code, get_state_name
+from .query_language import parse_query
+from .sentiment_logging import configure_logging, get_logger
+from .text_index import index_terms, phrase_words, tokenize
+from .tweet_search import detect_language
+from .tweet_record import utc_created_at
+
+logger = get_logger(__name__)
+
+
+def _anchors(node):
+    """Indexed terms of which a matching tweet must contain at least one
+
+    Returns None when the node can match without any particular term (a
+    bare field filter or a negation); such queries are checked on every tweet.
+    """
+    kind = node[0]
+    if kind in ("term", "phrase"):
+        words = phrase_words(tokenize(node[1]))
+        if kind == "term" and len(words) == 1:
+            return {tokenize(node[1])[0]}
+        if not words:
+            return None
+        # A phrase implies its first word pair (or its only word) is indexed
+        return {" ".join(words[:2])}
+    if kind == "or":
+        anchors = set()
+        for child in node[1]:
+            child_anchors = _anchors(child)
+            if child_anchors is None:
+                return None
+            anchors |= child_anchors
+        return anchors
+    if kind == "and":
+        # Any one required child suffices; the one with fewest anchors gives fewest candidates
+        options = [a for a in map(_anchors, node[1]) if a is not None]
+        return min(options, key=lambda a: (len(a), -max(map(len, a)))) if options else None
+    return None
+
+
+def _since_key(value):
+    """ISO value comparable with utc_created_at strings"""
+    return utc_created_at(value)
+
+
+class _TweetView:
+    """Per-tweet facts a standing query is evaluated against, computed lazily"""
+
+    __slots__ = ("tweet", "terms", "_words", "_lang")
+
+    def __init__(self, tweet, terms):
+        self.tweet = tweet
+        self.terms = terms
+        self._words = None
+        self._lang = None
+
+    @property
+    def words(self):
+        if self._words is None:
+            self._words = phrase_words(tokenize(self.tweet["text"]))
+        return self._words
+
+    @property
+    def lang(self):
+        if self._lang is None:
+            self._lang = detect_language(self.tweet)
+        return self._lang
+
+
+class StandingQuery:
+    """One registered topic: its parsed query and incremental aggregate"""
+
+    def __init__(self, topic, query):
+        self.topic = topic
+        self.query = query
+        self.node = parse_query(query)
+        self.anchors = _anchors(self.node)
+        self.plan = _compile(self.node)
+        self.aggregate = TopicAggregate()
+        self._locations = {}
+
+    def _location_matches(self, location, value):
+        key = (location, value)
+        matched = self._locations.get(key)
+        if matched is None:
+            value = value.lower()
+            matched = self._locations[key] = value in (
+                location.lower(), get_pakistan_region_code(location).lower(), get_state_name(location).lower())
+        return matched
+
+    def matches(self, view, node=None):
+        """Whether the tweet behind view satisfies the query"""
+        kind, value = self.plan if node is None else node
+        if kind == "and":
+            return all(self.matches(view, child) for child in value)
+        if kind == "or":
+            return any(self.matches(view, child) for child in value)
+        if kind == "not":
+            return not self.matches(view, value)
+        if kind == "has":
+            return value in view.terms
+        if kind == "sequence":
+            width = len(value)
+            words = view.words
+            return any(words[i:i + width] == value for i in range(len(words) - width + 1))
+        if kind == "since":
+            return utc_created_at(view.tweet["created_at"]) >= value
+        if kind == "until":
+            return utc_created_at(view.tweet["created_at"]) < value
+        if kind == "loc":
+            return self._location_matches(view.tweet.get("user_location", UNKNOWN_LOCATION), value)
+        if kind == "lang":
+            return view.lang == value
+        raise ValueError(f"Unknown query node: {kind!r}")
+
+
+def _compile(node):
+    """Parsed query with terms pre-tokenized and dates pre-formatted for per-tweet checks
+
+    Terms, hashtags and one- or two-word phrases become ("has", term) lookups
+    in the tweet's indexed terms; longer phrases become ("sequence", words).
+    """
+    kind, value = node
+    if kind in ("and", "or"):
+        return kind, [_compile(child) for child in value]
+    if kind == "not":
+        return kind, _compile(value)
+    if kind in ("term", "phrase"):
+        tokens = tokenize(value)
+        if kind == "term" and len(tokens) == 1:
+            return "has", tokens[0]
+        words = phrase_words(tokens)
+        return ("has", " ".join(words)) if len(words) <= 2 else ("sequence", words)
+    if kind in ("since", "until"):
+        return kind, _since_key(value)
+    if kind == "lang":
+        return kind, value.lower()
+    return node
+
+
+class TopicAggregate:
+    """Running totals for one topic, updated one matching tweet at a time"""
+
+    __slots__ = ("mentions", "sentiment_counts", "score_sum", "engagement", "days", "regions",
+                 "first_seen", "last_seen")
+
+    def __init__(self):
+        self.mentions = 0
+        self.sentiment_counts = [0] * len(SENTIMENT_TYPES)
+        self.score_sum = 0.0
+        self.engagement = 0
+        self.days = {}
+        self.regions = {}
+        self.first_seen = None
+        self.last_seen = None
+
+    def add(self, tweet, sentiment_code):
+        self.mentions += 1
+        self.sentiment_counts[sentiment_code] += 1
+        self.score_sum += tweet.get("sentiment_score") or 0.0
+        self.engagement += tweet.get("retweet_count", 0) + tweet.get("favorite_count", 0) + tweet.get("reply_count", 0)
+
+        created_at = utc_created_at(tweet["created_at"])
+        day_counts = self.days.get(created_at[:10])
+        if day_counts is None:
+            day_counts = self.days[created_at[:10]] = [0] * len(SENTIMENT_TYPES)
+        day_counts[sentiment_code] += 1
+        location = tweet.get("user_location", UNKNOWN_LOCATION)
+        self.regions[location] = self.regions.get(location, 0) + 1
+        if self.first_seen is None or created_at < self.first_seen:
+            self.first_seen = created_at
+        if self.last_seen is None or created_at > self.last_seen:
+            self.last_seen = created_at
+
+    def merge(self, other):
+        """Fold another aggregate (e.g. from a parallel matcher) into this one"""
+        self.mentions += other.mentions
+        self.sentiment_counts = [a + b for a, b in zip(self.sentiment_counts, other.sentiment_counts)]
+        self.score_sum += other.score_sum
+        self.engagement += other.engagement
+        for day, counts in other.days.items():
+            mine = self.days.setdefault(day, [0] * len(SENTIMENT_TYPES))
+            self.days[day] = [a + b for a, b in zip(mine, counts)]
+        for location, count in other.regions.items():
+            self.regions[location] = self.regions.get(location, 0) + count
+        for seen in (other.first_seen, other.last_seen):
+            if seen is not None:
+                self.first_seen = seen if self.first_seen is None else min(self.first_seen, seen)
+                self.last_seen = seen if self.last_seen is None else max(self.last_seen, seen)
+
+    def as_dict(self, top_regions=5):
+        total = self.mentions or 1
+        positive, negative, neutral = self.sentiment_counts
+        regions = sorted(self.regions.items(), key=lambda item: (-item[1], item[0]))[:top_regions]
+        return {
+            "totalMentions": self.mentions,
+            "positivePercentage": round(positive / total * 100),
+            "negativePercentage": round(negative / total * 100),
+            "neutralPercentage": round(neutral / total * 100),
+            "averageScore": round(self.score_sum / total, 3),
+            "engagement": self.engagement,
+            "timeline": [
+                {"date": day, **dict(zip(SENTIMENT_TYPES, counts))}
+                for day, counts in sorted(self.days.items())
+            ],
+            "topRegions": [{"name": name, "tweets": count} for name, count in regions],
+            "firstSeen": self.first_seen,
+            "lastSeen": self.last_seen
+        }
+
+
+class StandingQueryMatcher:
+    """Matches each incoming tweet against every registered topic query at once
+
+    Queries are indexed by anchor terms: for each query, a set of terms at
+    least one of which every matching tweet must contain (its hashtags,
+    words or first phrase word pair; for an AND, the cheapest required
+    clause). A tweet's indexed terms are looked up in that table once, and
+    only the queries found there are evaluated in full, so the work per tweet
+    grows with the number of candidate topics rather than with all topics.
+    Queries without a required term (pure loc:/lang: filters, negations)
+    are checked on every tweet. Matching tweets are folded into the topic's
+    TopicAggregate as they arrive.
+
+    ingest(batch) makes the matcher usable as an IngestPipeline sink.
+    """
+
+    def __init__(self, queries=None):
+        self.topics = {}
+        self.by_anchor = {}
+        self.unanchored = []
+        self.tweets = 0
+        self.candidates = 0
+        self.matches = 0
+        for topic, query in (queries or {}).items():
+            self.subscribe(topic, query)
+
+    def __len__(self):
+        return len(self.topics)
+
+    def subscribe(self, topic, query):
+        """Register (or replace) a topic's query; raises ValueError on bad syntax"""
+        if topic in self.topics:
+            self.unsubscribe(topic)
+        standing = self.topics[topic] = StandingQuery(topic, query)
+        if standing.anchors is None:
+            self.unanchored.append(standing)
+        else:
+            for term in standing.anchors:
+                self.by_anchor.setdefault(term, []).append(standing)
+        return standing
+
+    def unsubscribe(self, topic):
+        standing = self.topics.pop(topic)
+        if standing.anchors is None:
+            self.unanchored.remove(standing)
+            return standing
+        for term in standing.anchors:
+            subscribers = self.by_anchor[term]
+            subscribers.remove(standing)
+            if not subscribers:
+                del self.by_anchor[term]
+        return standing
+
+    def match(self, tweet, terms=None):
+        """Topics whose query the tweet matches"""
+        if terms is None:
+            terms = index_terms(tokenize(tweet["text"]))
+        by_anchor = self.by_anchor
+        candidates = {}
+        for term in terms:
+            subscribers = by_anchor.get(term)
+            if subscribers:
+                for standing in subscribers:
+                    candidates[standing.topic] = standing
+        for standing in self.unanchored:
+            candidates[standing.topic] = standing
+
+        self.candidates += len(candidates)
+        view = _TweetView(tweet, terms)
+        return [standing for standing in candidates.values() if standing.matches(view)]
+
+    def ingest(self, tweets):
+        """Route tweets into the aggregates of the topics they match; returns match count"""
+        encode = SENTIMENT_CODES.encode
+        matched = 0
+        for tweet in tweets:
+            hits = self.match(tweet)
+            if hits:
+                code = encode(tweet.get("sentiment_type", "neutral"))
+                for standing in hits:
+                    standing.aggregate.add(tweet, code)
+                matched += len(hits)
+        self.tweets += len(tweets)
+        self.matches += matched
+        return matched
+
+    def results(self):
+        return {topic: standing.aggregate.as_dict() for topic, standing in self.topics.items()}
+
+    def stats(self):
+        return {
+            "topics": len(self.topics),
+            "anchorTerms": len(self.by_anchor),
+            "unanchoredTopics": len(self.unanchored),
+            "tweets": self.tweets,
+            "candidatesChecked": self.candidates,
+            "matches": self.matches
+        }
+
+
+def main():
+    configure_logging()
+
+    from .pakistan_sentiment_analysis import simulate_pakistan_twitter_data
+    from .urdu_sentiment_analysis import create_search_query_examples
+
+    matcher = StandingQueryMatcher({example["description"]: example["query"]
+                                    for example in create_search_query_examples()})
+    matcher.subscribe("Imran Khan in Punjab", '"imran khan" loc:Punjab')
+    matcher.subscribe("Non-violent 9 May", "#9thMay -violence")
+    matcher.subscribe("Urdu tweets", "lang:ur")
+
+    tweets = simulate_pakistan_twitter_data(count=20000)
+    matcher.ingest(tweets)
+    logger.info("Matched {} tweets against {} topics", matcher.tweets, len(matcher))
+
+    print("Standing query statistics:")
+    for key, value in matcher.stats().items():
+        print(f"  {key}: {value}")
+    print("\nTopics:")
+    for topic, summary in matcher.results().items():
+        print(f"  {topic}: {summary['totalMentions']} mentions, {summary['positivePercentage']}% positive, "
+              f"top region {summary['topRegions'][0]['name'] if summary['topRegions'] else '-'}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,164 @@
+import numpy as np
+from .author_activity import AuthorActivityTracker
+from .bloom_filter import TweetIdFilter
+from .categorical import NEGATIVE, NEUTRAL, POSITIVE, SENTIMENT_TYPES, UNKNOWN_LOCATION, CategoricalDictionary
+from .quantile_sketch import ScoreDistributionTracker
+from .spike_detector import SpikeDetector
+from .tweet_columns import TweetColumns
+
+
+def _grow(counts, rows):
+    """counts with zero rows appended up to rows"""
+    if len(counts) >= rows:
+        return counts
+    return np.vstack((counts, np.zeros((rows - len(counts), counts.shape[1]), dtype=counts.dtype)))
+
+
+class StreamingAggregator:
+    """Running aggregates over a tweet stream in memory bounded by days and regions, not tweets
+
+    Each batch is encoded once into columns and folded into sentiment count
+    arrays per day and region (rows indexed through the aggregator's own
+    categorical dictionaries), exact totals, author sketches, score quantile
+    sketches and, optionally, a SpikeDetector. With seen_ids (a
+    TweetIdFilter) re-delivered tweets are dropped before they are counted.
+    Raw tweets are not kept, so
+    state() is a compact snapshot that from_state() restores; see
+    CheckpointedAggregator for snapshots plus a batch log.
+
+    ingest(batch) makes it usable as an IngestPipeline sink.
+    """
+
+    def __init__(self, spike_detector=None, default_followers=500, seen_ids=None):
+        self.spike_detector = spike_detector
+        self.seen_ids = seen_ids
+        self.default_followers = default_followers
+        self.days = CategoricalDictionary()
+        self.locations = CategoricalDictionary([UNKNOWN_LOCATION])
+        self.by_day = np.zeros((0, len(SENTIMENT_TYPES)), dtype=np.int64)
+        self.by_region = np.zeros((len(self.locations), len(SENTIMENT_TYPES)), dtype=np.int64)
+        self.tweets = 0
+        self.batches = 0
+        self.score_sum = 0.0
+        self.engagement = 0
+        self.followers = 0.0
+        self.authors = AuthorActivityTracker()
+        self.distribution = ScoreDistributionTracker()
+
+    def __len__(self):
+        return self.tweets
+
+    def ingest(self, tweets):
+        """Fold a batch into the aggregates; returns any spike events it triggers"""
+        self.batches += 1
+        if self.seen_ids is not None:
+            tweets = self.seen_ids.filter(tweets)
+        if not tweets:
+            return []
+        columns = TweetColumns.from_tweets(tweets, self.default_followers, locations=self.locations)
+        type_count = len(SENTIMENT_TYPES)
+        types = columns["sentiment_type"].astype(np.int64)
+
+        # Batch-local day codes -> this aggregator's stable day codes
+        days = np.array(self.days.encode_many(columns.days), dtype=np.int64)[columns["day"]]
+        self.by_day = _grow(self.by_day, len(self.days))
+        self.by_day += np.bincount(days * type_count + types,
+                                   minlength=len(self.days) * type_count).reshape(-1, type_count)
+        self.by_region = _grow(self.by_region, len(self.locations))
+        self.by_region += np.bincount(columns["location"] * type_count + types,
+                                      minlength=len(self.locations) * type_count).reshape(-1, type_count)
+
+        self.tweets += len(tweets)
+        self.score_sum += float(columns["sentiment_score"].sum())
+        self.engagement += int((columns["retweet_count"] + columns["favorite_count"] + columns["reply_count"]).sum())
+        self.followers += float(columns["user_followers_count"].sum())
+        self.authors.add_many(tweets)
+        self.distribution.add_columns(columns)
+
+        if self.spike_detector is None:
+            return []
+        return self.spike_detector.update_many(tweets)
+
+    def results(self, min_mentions=5):
+        """Overview, timeline, region, author, distribution and spike sections"""
+        total = self.tweets or 1
+        positive, negative, neutral = (int(count) for count in self.by_day.sum(axis=0))
+        timeline = []
+        for day in sorted(self.days.values):
+            counts = self.by_day[self.days.encode(day)]
+            day_total = int(counts.sum()) or 1
+            timeline.append({
+                "date": day,
+                "positive": round(counts[POSITIVE] / day_total * 100),
+                "negative": round(counts[NEGATIVE] / day_total * 100),
+                "neutral": round(counts[NEUTRAL] / day_total * 100)
+            })
+        regions = []
+        for code, location in enumerate(self.locations.values):
+            mentions = int(self.by_region[code].sum())
+            if location == UNKNOWN_LOCATION or mentions < min_mentions:
+                continue
+            regions.append({
+                "name": location,
+                "sentiment": round(self.by_region[code, POSITIVE] / mentions * 100),
+                "mentions": mentions
+            })
+        regions.sort(key=lambda region: region["mentions"], reverse=True)
+
+        return {
+            "overview": {
+                "totalMentions": self.tweets,
+                "positivePercentage": round(positive / total * 100),
+                "negativePercentage": round(negative / total * 100),
+                "neutralPercentage": round(neutral / total * 100),
+                "averageScore": round(self.score_sum / total, 3),
+                "engagement": self.engagement,
+                "reachInMillions": round(self.followers / 1000000, 1),
+                "distinctAuthors": self.authors.total_authors.count()
+            },
+            "timeline": timeline,
+            "regions": regions,
+            "authors": {
+                "byDay": self.authors.distinct_authors_by_day(),
+                "byRegion": self.authors.distinct_authors_by_region()
+            },
+            "distribution": self.distribution.summary(),
+            "spikes": list(self.spike_detector.events) if self.spike_detector else [],
+            "duplicates": self.seen_ids.stats() if self.seen_ids is not None else {}
+        }
+
+    def state(self):
+        """Copy of every aggregate as arrays, bytes and plain values
+
+        Cheap relative to the stream (it grows with days, regions and
+        sketch sizes), and independent of the live aggregator afterwards,
+        so it can be serialized while ingestion continues.
+        """
+        return {
+            "defaultFollowers": self.default_followers,
+            "days": self.days.to_list(),
+            "locations": self.locations.to_list(),
+            "byDay": self.by_day.copy(),
+            "byRegion": self.by_region.copy(),
+            "totals": (self.tweets, self.batches, self.score_sum, self.engagement, self.followers),
+            "authors": self.authors.state(),
+            "distribution": self.distribution.state(),
+            "spikes": self.spike_detector.state() if self.spike_detector else None,
+            "seenIds": self.seen_ids.state() if self.seen_ids is not None else None
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        spikes = state["spikes"]
+        seen_ids = state["seenIds"]
+        aggregator = cls(SpikeDetector.from_state(spikes) if spikes else None, state["defaultFollowers"],
+                         TweetIdFilter.from_state(seen_ids) if seen_ids else None)
+        aggregator.days = CategoricalDictionary.from_list(state["days"])
+        aggregator.locations = CategoricalDictionary.from_list(state["locations"])
+        aggregator.by_day = state["byDay"].copy()
+        aggregator.by_region = state["byRegion"].copy()
+        (aggregator.tweets, aggregator.batches, aggregator.score_sum,
+         aggregator.engagement, aggregator.followers) = state["totals"]
+        aggregator.authors = AuthorActivityTracker.from_state(state["authors"])
+        aggregator.distribution = ScoreDistributionTracker.from_state(state["distribution"])
+        return aggregator
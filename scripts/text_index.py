@@ -0,0 +1,286 @@
+import re
+from array import array
+import numpy as np
+from .query_language import parse_query
+from .sentiment_logging import get_logger
+
+logger = get_logger(__name__)
+
+# Words, hashtags and mentions; \w covers Urdu script and the _ in #عمران_خان
+TOKEN = re.compile(r"[#@]?\w+")
+
+# Distinct texts whose posting lists add() remembers at once
+TEXT_CACHE_SIZE = 65536
+
+
+def tokenize(text):
+    """Lowercased word, #hashtag and @mention tokens in text order"""
+    return TOKEN.findall(text.lower())
+
+
+def phrase_words(tokens):
+    """Tokens as plain words (hashtag marks dropped), the unit phrases match on"""
+    return [token[1:] if token[0] == "#" else token for token in tokens]
+
+
+def index_terms(tokens):
+    """Terms indexed for a token list
+
+    Every token, the bare word of each hashtag, and each adjacent word pair
+    ("imran khan") so two-word phrases resolve from a single posting list.
+    """
+    words = phrase_words(tokens)
+    terms = set(tokens)
+    terms.update(words)
+    terms.update(map(" ".join, zip(words, words[1:])))
+    return terms
+
+
+def encode_varints(values):
+    """Varint-encode unsigned integers; returns the bytes and each value's end offset"""
+    values = np.asarray(values, dtype=np.uint64)
+    lengths = np.ones(len(values), dtype=np.int64)
+    for shift in (7, 14, 21, 28, 35):
+        lengths += values >= (1 << shift)
+    ends = np.cumsum(lengths)
+    offsets = ends - lengths
+    encoded = np.empty(int(ends[-1]) if len(ends) else 0, dtype=np.uint8)
+    for k in range(int(lengths.max()) if len(lengths) else 0):
+        has_byte = lengths > k
+        chunk = (values[has_byte] >> np.uint64(7 * k)) & np.uint64(0x7F)
+        more = (lengths[has_byte] > k + 1).astype(np.uint64) << np.uint64(7)
+        encoded[offsets[has_byte] + k] = chunk | more
+    return encoded.tobytes(), ends
+
+
+def encode_postings(rows):
+    """Delta + varint encode a sorted array of row ids"""
+    rows = np.asarray(rows, dtype=np.uint64)
+    if len(rows) == 0:
+        return b""
+    return encode_varints(np.diff(rows, prepend=np.uint64(0)))[0]
+
+
+def decode_postings(data):
+    """Inverse of encode_postings; returns sorted uint32 row ids"""
+    if not data:
+        return np.empty(0, dtype=np.uint32)
+    encoded = np.frombuffer(data, dtype=np.uint8)
+    last_byte = (encoded & 0x80) == 0
+    ends = np.flatnonzero(last_byte)
+    starts = np.concatenate(([0], ends[:-1] + 1))
+    value_of_byte = np.cumsum(last_byte) - last_byte
+    shifts = (np.arange(len(encoded)) - starts[value_of_byte]) * 7
+    parts = (encoded & 0x7F).astype(np.uint64) << shifts.astype(np.uint64)
+    deltas = np.add.reduceat(parts, starts)
+    return np.cumsum(deltas).astype(np.uint32)
+
+
+class TextIndex:
+    """Inverted index from tokens and hashtags to compressed posting lists
+
+    Row ids are positions in the order tweets were added, so matches can be
+    mapped straight back to the tweet list or to TweetColumns. New rows go
+    into uncompressed tail arrays; compact() folds them into the delta/varint
+    encoded lists. Adjacent word pairs are indexed too, so phrase queries
+    intersect pair posting lists and only phrases of three or more words are
+    verified against the candidate rows' text.
+    """
+
+    def __init__(self):
+        self.size = 0
+        self.texts = []
+        self._compressed = {}
+        self._last_row = {}
+        self._pending = {}
+
+    @classmethod
+    def build(cls, tweets):
+        index = cls()
+        index.add(tweets)
+        index.compact()
+        logger.info("Indexed {} tweets under {} terms", index.size, len(index._compressed))
+        return index
+
+    def add(self, tweets):
+        """Index tweets as the next rows; returns the first new row id"""
+        first = self.size
+        pending = self._pending
+        # Retweets and copy-paste campaigns repeat texts; remember their posting lists
+        recent = {}
+        row = first
+        for tweet in tweets:
+            text = tweet["text"]
+            self.texts.append(text)
+            targets = recent.get(text)
+            if targets is None:
+                targets = []
+                for term in index_terms(tokenize(text)):
+                    postings = pending.get(term)
+                    if postings is None:
+                        postings = pending[term] = array("I")
+                    targets.append(postings)
+                if len(recent) >= TEXT_CACHE_SIZE:
+                    recent.clear()
+                recent[text] = targets
+            for postings in targets:
+                postings.append(row)
+            row += 1
+        self.size = row
+        return first
+
+    def compact(self):
+        """Append pending rows to the compressed posting lists
+
+        All pending lists are delta-encoded in one vectorized pass. New row
+        ids are always larger than existing ones, so each tail is encoded
+        relative to its list's last row and appended without decoding.
+        """
+        if not self._pending:
+            return
+        terms = list(self._pending)
+        counts = np.fromiter((len(self._pending[term]) for term in terms), dtype=np.int64, count=len(terms))
+        rows = np.frombuffer(b"".join(self._pending[term].tobytes() for term in terms),
+                             dtype=np.uint32).astype(np.uint64)
+        starts = np.cumsum(counts) - counts
+
+        previous = np.empty_like(rows)
+        previous[1:] = rows[:-1]
+        previous[starts] = np.fromiter((self._last_row.get(term, 0) for term in terms),
+                                       dtype=np.uint64, count=len(terms))
+        encoded, value_ends = encode_varints(rows - previous)
+
+        byte_ends = value_ends[starts + counts - 1].tolist()
+        byte_start = 0
+        last_rows = rows[starts + counts - 1].tolist()
+        for term, byte_end, last_row in zip(terms, byte_ends, last_rows):
+            self._compressed[term] = self._compressed.get(term, b"") + encoded[byte_start:byte_end]
+            self._last_row[term] = last_row
+            byte_start = byte_end
+        self._pending = {}
+
+    def postings(self, term):
+        """Sorted row ids containing term (a token such as "khan" or "#9thmay")"""
+        term = term.lower()
+        rows = decode_postings(self._compressed.get(term, b""))
+        pending = self._pending.get(term)
+        if pending:
+            rows = np.concatenate((rows, np.frombuffer(pending, dtype=np.uint32)))
+        return rows
+
+    def document_frequency(self, term):
+        """Number of rows containing term, counted without decoding"""
+        term = term.lower()
+        data = self._compressed.get(term, b"")
+        # Every encoded delta ends with exactly one byte below 0x80
+        count = int(np.count_nonzero(np.frombuffer(data, dtype=np.uint8) < 0x80)) if data else 0
+        return count + len(self._pending.get(term, ()))
+
+    def all_rows(self):
+        return np.arange(self.size, dtype=np.uint32)
+
+    def match_term(self, text):
+        """Rows matching a query word; multi-word input is treated as a phrase"""
+        tokens = tokenize(text)
+        if len(tokens) == 1:
+            return self.postings(tokens[0])
+        return self.match_phrase(text)
+
+    def match_phrase(self, phrase):
+        """Rows whose text contains the phrase's words consecutively"""
+        words = phrase_words(tokenize(phrase))
+        if len(words) < 2:
+            return self.postings(words[0]) if words else np.empty(0, dtype=np.uint32)
+        pairs = list(map(" ".join, zip(words, words[1:])))
+        candidates = self.match_all([self.postings(pair) for pair in set(pairs)])
+        if len(words) == 2:
+            return candidates
+
+        # Longer phrases: every word pair is present, now check they are in sequence
+        width = len(words)
+        verified = {}
+        matched = []
+        for row in candidates.tolist():
+            text = self.texts[row]
+            found = verified.get(text)
+            if found is None:
+                tokens = phrase_words(tokenize(text))
+                found = verified[text] = any(tokens[i:i + width] == words
+                                             for i in range(len(tokens) - width + 1))
+            if found:
+                matched.append(row)
+        return np.array(matched, dtype=np.uint32)
+
+    def _mask(self, rows):
+        mask = np.zeros(self.size, dtype=bool)
+        mask[rows] = True
+        return mask
+
+    def match_all(self, row_sets):
+        """AND: filter the smallest row set through a bitmap of each other set"""
+        row_sets = sorted(row_sets, key=len)
+        result = row_sets[0] if row_sets else np.empty(0, dtype=np.uint32)
+        for rows in row_sets[1:]:
+            if len(result) == 0:
+                break
+            result = result[self._mask(rows)[result]]
+        return result
+
+    def match_any(self, row_sets):
+        """OR: union of row sets via a bitmap (output stays sorted)"""
+        if not row_sets:
+            return np.empty(0, dtype=np.uint32)
+        if len(row_sets) == 1:
+            return row_sets[0]
+        mask = np.zeros(self.size, dtype=bool)
+        for rows in row_sets:
+            mask[rows] = True
+        return np.flatnonzero(mask).astype(np.uint32)
+
+    def match_none(self, rows, within=None):
+        """NOT: rows (of `within`, default every row) not in rows"""
+        if within is None:
+            mask = np.ones(self.size, dtype=bool)
+            mask[rows] = False
+            return np.flatnonzero(mask).astype(np.uint32)
+        return within[~self._mask(rows)[within]]
+
+    def evaluate(self, node):
+        """Evaluate a query tree of ("term", word), ("phrase", text), ("and", [nodes]),
+        ("or", [nodes]) and ("not", node) tuples to sorted row ids"""
+        kind = node[0]
+        if kind == "term":
+            return self.match_term(node[1])
+        if kind == "phrase":
+            return self.match_phrase(node[1])
+        if kind == "or":
+            return self.match_any([self.evaluate(child) for child in node[1]])
+        if kind == "not":
+            return self.match_none(self.evaluate(node[1]))
+        if kind == "and":
+            positive = [child for child in node[1] if child[0] != "not"]
+            negative = [child[1] for child in node[1] if child[0] == "not"]
+            rows = self.match_all([self.evaluate(child) for child in positive]) if positive else self.all_rows()
+            for child in negative:
+                if len(rows) == 0:
+                    break
+                rows = self.match_none(self.evaluate(child), within=rows)
+            return rows
+        raise ValueError(f"{kind}: filters need a TweetSearchIndex, not a bare TextIndex")
+
+    def search(self, query):
+        """Rows matching a boolean query string such as '#PTI OR "imran khan" -violence'
+
+        Text-only; TweetSearchIndex adds loc:, lang: and since:/until:.
+        """
+        return self.evaluate(parse_query(query))
+
+    def memory_bytes(self):
+        compressed = sum(len(data) for data in self._compressed.values())
+        pending = sum(rows.itemsize * len(rows) for rows in self._pending.values())
+        return compressed + pending
+
+
+def select_rows(tweets, rows):
+    """Tweets at the given row ids, e.g. to hand a query's matches to a processor"""
+    return [tweets[row] for row in rows.tolist()]
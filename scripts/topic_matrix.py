@@ -0,0 +1,133 @@
+import numpy as np
+from .categorical import POSITIVE, SENTIMENT_TYPES
+from .standing_queries import StandingQueryMatcher
+from .text_index import tokenize
+
+# Words left out of per-topic word clouds
+STOPWORDS = frozenset(("the", "and", "for", "with", "about", "this", "that", "are", "was", "not",
+                       "but", "you", "your", "from", "have", "has", "all", "our", "who", "its"))
+MIN_WORD_LENGTH = 3
+
+
+class TopicMembership:
+    """Sparse tweet x topic membership matrix in coordinate form
+
+    rows[i], topics[i] says tweet rows[i] matches topic topics[i]; entries
+    are sorted by (topic, row). Per-topic aggregations gather a column by
+    rows and group by topics, so every topic is aggregated in one
+    bincount instead of one pass over the data per topic.
+    """
+
+    def __init__(self, rows, topics, topic_count, tweet_count):
+        self.rows = rows
+        self.topics = topics
+        self.topic_count = topic_count
+        self.tweet_count = tweet_count
+
+    def __len__(self):
+        return len(self.rows)
+
+    @classmethod
+    def from_queries(cls, tweets, queries):
+        """Match every tweet against every query in one scan of the tweets"""
+        matcher = StandingQueryMatcher({i: query for i, query in enumerate(queries)})
+        rows = []
+        topics = []
+        for row, tweet in enumerate(tweets):
+            for standing in matcher.match(tweet):
+                rows.append(row)
+                topics.append(standing.topic)
+        rows = np.array(rows, dtype=np.int64)
+        topics = np.array(topics, dtype=np.int64)
+        order = np.lexsort((rows, topics))
+        return cls(rows[order], topics[order], len(queries), len(tweets))
+
+    def sizes(self):
+        return np.bincount(self.topics, minlength=self.topic_count)
+
+    def counts(self, codes, code_count, weights=None):
+        """topic x code matrix of (weighted) member counts for a per-tweet code column"""
+        keys = self.topics * code_count + codes[self.rows]
+        if weights is not None:
+            weights = weights[self.rows]
+        counts = np.bincount(keys, weights=weights, minlength=self.topic_count * code_count)
+        return counts.reshape(self.topic_count, code_count)
+
+    def distinct(self, codes, code_count, values):
+        """topic x code matrix of distinct values (e.g. user ids) among members; negative values are skipped"""
+        values = values[self.rows]
+        known = values >= 0
+        keys = np.stack(((self.topics * code_count + codes[self.rows])[known], values[known]))
+        keys = np.unique(keys, axis=1)[0]
+        return np.bincount(keys, minlength=self.topic_count * code_count).reshape(self.topic_count, code_count)
+
+    def rank_in_topic(self):
+        """Each entry's position among its topic's tweets, in row order"""
+        starts = np.cumsum(self.sizes()) - self.sizes()
+        return np.arange(len(self.rows)) - starts[self.topics]
+
+
+def term_matrix(tweets):
+    """Sparse tweet x word matrix in CSR form: (indptr, word ids, vocabulary)
+
+    Each tweet contributes each of its words once; hashtags, mentions,
+    short words and STOPWORDS are left out.
+    """
+    vocabulary = {}
+    indptr = np.zeros(len(tweets) + 1, dtype=np.int64)
+    word_ids = []
+    for row, tweet in enumerate(tweets):
+        for token in set(tokenize(tweet["text"])):
+            if token[0] in "#@" or len(token) < MIN_WORD_LENGTH or token in STOPWORDS:
+                continue
+            word_id = vocabulary.get(token)
+            if word_id is None:
+                word_id = vocabulary[token] = len(vocabulary)
+            word_ids.append(word_id)
+        indptr[row + 1] = len(word_ids)
+    return indptr, np.array(word_ids, dtype=np.int64), list(vocabulary)
+
+
+def topic_word_counts(membership, indptr, word_ids, word_count, sentiment_types):
+    """Sparse product membership^T x term matrix, split by tweet sentiment
+
+    Returns (topics, words, counts, sentiments): one entry per topic/word
+    pair that occurs, with the number of member tweets containing the word
+    and the sentiment type most of those tweets have.
+    """
+    starts = indptr[membership.rows]
+    lengths = indptr[membership.rows + 1] - starts
+    total = int(lengths.sum())
+    if total == 0:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, empty, empty
+
+    # Expand each (row, topic) entry into the row's word ids
+    entry_of = np.repeat(np.arange(len(lengths)), lengths)
+    positions = np.arange(total) - np.repeat(np.cumsum(lengths) - lengths, lengths) + starts[entry_of]
+    words = word_ids[positions]
+    topics = membership.topics[entry_of]
+    types = sentiment_types[membership.rows[entry_of]].astype(np.int64)
+
+    type_count = len(SENTIMENT_TYPES)
+    keys, per_type = np.unique((topics * word_count + words) * type_count + types, return_counts=True)
+    pairs = keys // type_count
+    pair_keys, first = np.unique(pairs, return_index=True)
+    counts = np.add.reduceat(per_type, first)
+    # Majority sentiment: the largest per-type count within each pair (ties go to the lower code)
+    order = np.lexsort((keys % type_count, -per_type, pairs))
+    sentiments = (keys[order] % type_count)[first]
+    return pair_keys // word_count, pair_keys % word_count, counts, sentiments
+
+
+def positive_trend(membership, sentiment_types):
+    """"up"/"down" per topic: positive share of its second half of tweets vs its first"""
+    sizes = membership.sizes()
+    mid = sizes // 2
+    positive = (sentiment_types[membership.rows] == POSITIVE).astype(np.float64)
+    first_half = membership.rank_in_topic() < mid[membership.topics]
+    first = np.bincount(membership.topics, weights=positive * first_half, minlength=membership.topic_count)
+    second = np.bincount(membership.topics, weights=positive * ~first_half, minlength=membership.topic_count)
+    first_share = np.divide(first, mid, out=np.zeros(len(mid)), where=mid > 0)
+    second_share = np.divide(second, sizes - mid, out=np.zeros(len(mid)), where=sizes - mid > 0)
+    return np.where(second_share > first_share, "up", "down")
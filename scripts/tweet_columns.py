@@ -0,0 +1,77 @@
+import numpy as np
+from .categorical import SENTIMENT_CODES, UNKNOWN_LOCATION, location_dictionary
+from .tweet_record import utc_created_at
+
+
+class TweetColumns:
+    """Column-oriented view of a list of tweet dicts backed by NumPy arrays"""
+
+    def __init__(self, columns, locations, days):
+        self.columns = columns
+        self.locations = locations
+        self.days = days
+
+    def __len__(self):
+        return len(self.columns["sentiment_score"])
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def take(self, rows):
+        """Columns restricted to the given row ids (e.g. TextIndex matches)"""
+        columns = {name: values[rows] for name, values in self.columns.items()}
+        return TweetColumns(columns, self.locations, self.days)
+
+    @classmethod
+    def from_tweets(cls, tweets, default_followers=None, locations=None):
+        """Build columns from tweet dicts in a single pass over the rows
+
+        Sentiment types are encoded through the shared SENTIMENT_CODES and
+        locations through a CategoricalDictionary: a new one per build by
+        default, or the caller's (as StreamingAggregator passes its own) so
+        codes stay stable across batches. .locations maps every code in that
+        dictionary back to its name.
+        """
+        if locations is None:
+            locations = location_dictionary()
+        count = len(tweets)
+        created_at = np.empty(count, dtype="datetime64[s]")
+        sentiment_type = np.empty(count, dtype=np.int8)
+        sentiment_score = np.empty(count, dtype=np.float64)
+        retweets = np.empty(count, dtype=np.int64)
+        likes = np.empty(count, dtype=np.int64)
+        replies = np.empty(count, dtype=np.int64)
+        followers = np.empty(count, dtype=np.float64)
+        location_codes = np.empty(count, dtype=np.int32)
+
+        encode_type = SENTIMENT_CODES.encode
+        encode_location = locations.encode
+        missing_followers = np.nan if default_followers is None else default_followers
+
+        for i, tweet in enumerate(tweets):
+            created_at[i] = utc_created_at(tweet["created_at"])
+            sentiment_type[i] = encode_type(tweet.get("sentiment_type"))
+            sentiment_score[i] = tweet.get("sentiment_score", 0.0)
+            retweets[i] = tweet.get("retweet_count", 0)
+            likes[i] = tweet.get("favorite_count", 0)
+            replies[i] = tweet.get("reply_count", 0)
+            followers[i] = tweet.get("user_followers_count", missing_followers)
+            location_codes[i] = encode_location(tweet.get("user_location", UNKNOWN_LOCATION))
+
+        day_values = created_at.astype("datetime64[D]")
+        days, day_codes = np.unique(day_values, return_inverse=True)
+        hours = (created_at - day_values).astype(np.int64) // 3600
+
+        columns = {
+            "created_at": created_at,
+            "day": day_codes.astype(np.int32),
+            "hour": hours.astype(np.int8),
+            "location": location_codes,
+            "sentiment_type": sentiment_type,
+            "sentiment_score": sentiment_score,
+            "retweet_count": retweets,
+            "favorite_count": likes,
+            "reply_count": replies,
+            "user_followers_count": followers
+        }
+        return cls(columns, locations.to_list(), [str(day) for day in days])
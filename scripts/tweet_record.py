@@ -0,0 +1,151 @@
+import sys
+from collections.abc import MutableMapping
+from datetime import datetime, timezone
+
+# Every field the generators, scorers and dedup write; anything else goes in "extra"
+TWEET_FIELDS = (
+    "id", "text", "created_at", "user_location", "retweet_count", "favorite_count", "reply_count",
+    "user_id", "user_followers_count", "sentiment_type", "sentiment_score", "keywords",
+    "dup_group", "is_canonical", "dup_count"
+)
+
+# Low-cardinality string fields shared between rows instead of copied per tweet
+CATEGORICAL_FIELDS = frozenset({"user_location", "sentiment_type"})
+
+_FIELD_SET = frozenset(TWEET_FIELDS)
+
+TWITTER_DATE_FORMAT = "%a %b %d %H:%M:%S %z %Y"  # v1.1 API, e.g. "Tue May 09 14:03:11 +0000 2023"
+
+
+class Tweet(MutableMapping):
+    """Compact tweet record with a slot per known field
+
+    Behaves like the dict form (tweet["sentiment_score"] = ..., tweet.get(...),
+    "key" in tweet), so it can be passed anywhere a tweet dict is accepted.
+    Unset slots take no storage; categorical strings and keywords are
+    interned (keywords kept as a tuple) and unknown keys fall back to a
+    small per-record dict.
+    """
+
+    __slots__ = TWEET_FIELDS + ("extra",)
+
+    def __init__(self, fields=None, **kwargs):
+        if fields:
+            for key, value in fields.items():
+                self[key] = value
+        for key, value in kwargs.items():
+            self[key] = value
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data)
+
+    def to_dict(self):
+        return dict(self.items())
+
+    def __getitem__(self, key):
+        if key in _FIELD_SET:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        try:
+            return self.extra[key]
+        except (AttributeError, KeyError):
+            raise KeyError(key) from None
+
+    def __setitem__(self, key, value):
+        if key in _FIELD_SET:
+            if key in CATEGORICAL_FIELDS and type(value) is str:
+                value = sys.intern(value)
+            elif key == "keywords" and value is not None:
+                value = tuple(sys.intern(word) for word in value)
+            setattr(self, key, value)
+            return
+        try:
+            self.extra[key] = value
+        except AttributeError:
+            self.extra = {key: value}
+
+    def __delitem__(self, key):
+        if key in _FIELD_SET:
+            try:
+                delattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+            return
+        try:
+            del self.extra[key]
+        except (AttributeError, KeyError):
+            raise KeyError(key) from None
+
+    def __iter__(self):
+        for key in TWEET_FIELDS:
+            if hasattr(self, key):
+                yield key
+        yield from getattr(self, "extra", ())
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __contains__(self, key):
+        if key in _FIELD_SET:
+            return hasattr(self, key)
+        return key in getattr(self, "extra", ())
+
+    def get(self, key, default=None):
+        if key in _FIELD_SET:
+            return getattr(self, key, default)
+        return getattr(self, "extra", {}).get(key, default)
+
+    def __reduce__(self):
+        return (self.__class__.from_dict, (self.to_dict(),))
+
+    def __repr__(self):
+        return f"Tweet({self.to_dict()!r})"
+
+
+def to_records(tweets):
+    """Convert tweet dicts to Tweet records (records pass through unchanged)"""
+    return [t if isinstance(t, Tweet) else Tweet.from_dict(t) for t in tweets]
+
+
+def to_dicts(tweets):
+    """Convert Tweet records back to plain dicts (dicts pass through unchanged)"""
+    return [t.to_dict() if isinstance(t, Tweet) else t for t in tweets]
+
+
+def json_default(value):
+    """json.dumps default= hook that serializes Tweet records as their dict form"""
+    if isinstance(value, Tweet):
+        return value.to_dict()
+    return str(value)
+
+
+def parse_created_at(value):
+    """Naive UTC datetime from ISO strings, v1.1 API strings or datetimes"""
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        parsed = value
+    else:
+        try:
+            parsed = datetime.fromisoformat(value)
+        except ValueError:
+            parsed = datetime.strptime(value, TWITTER_DATE_FORMAT)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def utc_created_at(value):
+    """created_at as a "YYYY-MM-DDTHH:MM:SS" UTC string, seconds precision
+
+    Naive ISO strings (what normalize_tweet and the simulators write) are
+    already UTC and are just truncated; anything carrying an offset or in
+    the v1.1 API format goes through parse_created_at.
+    """
+    if isinstance(value, str) and len(value) >= 19 and value[10] == "T" and not any(
+            c in value[19:] for c in "+-Z"):
+        return value[:19]
+    return parse_created_at(value).isoformat(timespec="seconds")
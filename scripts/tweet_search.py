@@ -0,0 +1,222 @@
+import re
+import sys
+from datetime import date, timedelta
+import numpy as np
+from .categorical import UNKNOWN_LOCATION, CategoricalDictionary, location_dictionary
+from .lexicon import get_pakistan_region_code, get_state_name
+from .query_language import PlanCache, normalize_query, parse_query, plan_query
+from .sentiment_logging import configure_logging, get_logger
+from .text_index import TextIndex, phrase_words, tokenize
+from .tweet_record import utc_created_at
+
+logger = get_logger(__name__)
+
+URDU_SCRIPT = re.compile(r"[\u0600-\u06FF]")
+
+# A cached plan is re-planned once the index has grown this much since planning
+REPLAN_GROWTH = 2.0
+
+
+def detect_language(tweet):
+    """Tweet language: the "lang" field when present, else "ur" for Arabic-script text"""
+    return tweet.get("lang") or ("ur" if URDU_SCRIPT.search(tweet["text"]) else "en")
+
+
+def _to_seconds(value):
+    return np.datetime64(value, "s")
+
+
+class TweetSearchIndex:
+    """Executes query-language searches over indexed tweets
+
+    Combines a TextIndex for terms, hashtags and phrases with a time index
+    (row order sorted by created_at) for since:/until:, and per-row
+    location and language codes for loc: and lang:. Each query is parsed
+    and planned once per normalized string; the plan runs its most
+    selective clause first and filters the surviving rows through the rest.
+    """
+
+    def __init__(self, plan_cache_size=256, locations=None):
+        self.text = TextIndex()
+        self.locations = locations if locations is not None else location_dictionary()
+        self.languages = CategoricalDictionary()
+        self.plans = PlanCache(plan_cache_size)
+        self._chunks = {"created_at": [], "location": [], "lang": []}
+        self._columns = None
+        self._time_order = None
+
+    @property
+    def size(self):
+        return self.text.size
+
+    @classmethod
+    def build(cls, tweets, **options):
+        index = cls(**options)
+        index.add(tweets)
+        index.compact()
+        return index
+
+    def add(self, tweets):
+        """Index tweets as the next rows; returns the first new row id"""
+        first = self.text.add(tweets)
+        count = self.text.size - first
+        created_at = np.empty(count, dtype="datetime64[s]")
+        location = np.empty(count, dtype=np.int32)
+        lang = np.empty(count, dtype=np.int16)
+        encode_location = self.locations.encode
+        encode_lang = self.languages.encode
+        for i, tweet in enumerate(tweets):
+            created_at[i] = utc_created_at(tweet["created_at"])
+            location[i] = encode_location(tweet.get("user_location", UNKNOWN_LOCATION))
+            lang[i] = encode_lang(detect_language(tweet))
+        self._chunks["created_at"].append(created_at)
+        self._chunks["location"].append(location)
+        self._chunks["lang"].append(lang)
+        self._columns = None
+        self._time_order = None
+        return first
+
+    def compact(self):
+        self.text.compact()
+        self._column("created_at")
+
+    def _column(self, name):
+        if self._columns is None:
+            self._columns = {}
+            for key, chunks in self._chunks.items():
+                merged = np.concatenate(chunks) if chunks else np.empty(0)
+                self._chunks[key] = [merged]
+                self._columns[key] = merged
+        return self._columns[name]
+
+    def _sorted_times(self):
+        if self._time_order is None:
+            times = self._column("created_at")
+            order = np.argsort(times, kind="stable").astype(np.uint32)
+            self._time_order = (order, times[order])
+        return self._time_order
+
+    def _location_codes(self, value):
+        """Codes of locations matching a loc: value by name, region code or state name"""
+        value = value.lower()
+        return [code for code, name in enumerate(self.locations.values)
+                if value in (name.lower(), get_pakistan_region_code(name).lower(), get_state_name(name).lower())]
+
+    def _language_codes(self, value):
+        code = self.languages.codes.get(value.lower())
+        return [] if code is None else [code]
+
+    def estimate(self, node):
+        """Expected matching rows for a leaf (None means every row)"""
+        if node is None:
+            return self.size
+        kind, value = node
+        if kind == "term":
+            tokens = tokenize(value)
+            if len(tokens) == 1:
+                return self.text.document_frequency(tokens[0])
+            kind = "phrase"
+        if kind == "phrase":
+            words = phrase_words(tokenize(value))
+            pairs = [" ".join(pair) for pair in zip(words, words[1:])] or words
+            return min((self.text.document_frequency(pair) for pair in pairs), default=0)
+        if kind in ("since", "until"):
+            sorted_times = self._sorted_times()[1]
+            position = int(np.searchsorted(sorted_times, _to_seconds(value)))
+            return self.size - position if kind == "since" else position
+        if kind == "loc":
+            counts = np.bincount(self._column("location"), minlength=len(self.locations))
+            return int(counts[self._location_codes(value)].sum())
+        if kind == "lang":
+            codes = self._language_codes(value)
+            return int(np.count_nonzero(self._column("lang") == codes[0])) if codes else 0
+        raise ValueError(f"Unknown query node: {kind!r}")
+
+    def _leaf(self, node, within):
+        """Rows matching one clause, restricted to `within` when given"""
+        kind, value = node
+        if kind in ("term", "phrase"):
+            rows = self.text.evaluate(node)
+            return rows if within is None else self.text.match_all([within, rows])
+
+        if kind in ("since", "until"):
+            bound = _to_seconds(value)
+            if within is not None:
+                times = self._column("created_at")[within]
+                return within[times >= bound] if kind == "since" else within[times < bound]
+            order, sorted_times = self._sorted_times()
+            position = np.searchsorted(sorted_times, bound)
+            return np.sort(order[position:] if kind == "since" else order[:position])
+
+        column = self._column("location" if kind == "loc" else "lang")
+        codes = self._location_codes(value) if kind == "loc" else self._language_codes(value)
+        if within is None:
+            return np.flatnonzero(np.isin(column, codes)).astype(np.uint32)
+        return within[np.isin(column[within], codes)]
+
+    def execute(self, node, within=None):
+        """Run a planned node tree; returns sorted row ids"""
+        kind = node[0]
+        if kind == "and":
+            rows = within
+            for child in node[1]:
+                if rows is not None and len(rows) == 0:
+                    break
+                if child[0] == "not":
+                    excluded = self.execute(child[1], rows)
+                    rows = self.text.match_none(excluded, within=rows)
+                else:
+                    rows = self.execute(child, rows)
+            return self.text.all_rows() if rows is None else rows
+        if kind == "or":
+            return self.text.match_any([self.execute(child, within) for child in node[1]])
+        if kind == "not":
+            return self.text.match_none(self.execute(node[1], within), within=within)
+        return self._leaf(node, within)
+
+    def compile(self, query):
+        """Parsed and planned query, from the plan cache when possible"""
+        key = normalize_query(query)
+        cached = self.plans.get(key)
+        if cached is not None and self.size <= max(cached[1], 1) * REPLAN_GROWTH:
+            return cached[0]
+        plan, _ = plan_query(parse_query(query), self.estimate)
+        self.plans.put(key, (plan, self.size))
+        return plan
+
+    def search(self, query):
+        """Sorted row ids matching query"""
+        return self.execute(self.compile(query))
+
+
+def search_examples_to_queries(examples):
+    """Turn create_search_query_examples() entries into query-language strings"""
+    queries = []
+    for example in examples:
+        start, end = (part.strip() for part in example["date_range"].split(" to "))
+        until = date.fromisoformat(end) + timedelta(days=1)  # date_range end is inclusive
+        queries.append(f"({example['query']}) since:{start} until:{until.isoformat()}")
+    return queries
+
+
+def main():
+    configure_logging()
+
+    from .pakistan_data_processor import PakistanSentimentProcessor
+    from .urdu_sentiment_analysis import create_search_query_examples
+
+    tweets = PakistanSentimentProcessor(data=[])._generate_pakistan_data(count=50000)
+    index = TweetSearchIndex.build(tweets)
+
+    queries = search_examples_to_queries(create_search_query_examples())
+    queries += ['"imran khan" loc:PB since:2023-05-09', "#9thMay -violence lang:en", "violence OR arrest loc:Karachi"]
+
+    print("\nSearch results:")
+    for query in queries:
+        rows = index.search(query)
+        print(f"{len(rows):>7} tweets  {query}")
+        print(f"         plan: {index.compile(query)}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,243 @@
+"""Embedded SQLite store for scored tweets and daily rollups
+
+Scored tweets are appended to a `tweets` table indexed on (created_at),
+(region, created_at) and (topic, created_at), and folded into
+`daily_rollups`: sentiment counts, score sums and engagement per topic,
+day, region and canonical flag. The processors' process_window() answers
+overview, timeline and region sections for any past window from these
+tables instead of recomputing from raw data. Whole-day windows read
+sentiment counts from the rollups alone.
+
+Appends run in batched transactions through a staging table, so re-appending
+a tweet (same topic, id and created_at) neither duplicates it nor double
+counts it. Ids alone are not trusted: generators restart them at 0 on every
+run. Tweets without an id are always added.
+"""
+import sqlite3
+from .categorical import NEGATIVE, NEUTRAL, POSITIVE, SENTIMENT_CODES, UNKNOWN_LOCATION
+from .sentiment_logging import get_logger
+from .tweet_record import utc_created_at
+
+logger = get_logger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tweets (
+    topic TEXT NOT NULL,
+    tweet_id INTEGER,
+    created_at TEXT NOT NULL,
+    day TEXT NOT NULL,
+    region TEXT NOT NULL,
+    user_id TEXT,
+    user_followers_count INTEGER,
+    sentiment_type INTEGER NOT NULL,
+    sentiment_score REAL NOT NULL,
+    retweet_count INTEGER NOT NULL,
+    favorite_count INTEGER NOT NULL,
+    reply_count INTEGER NOT NULL,
+    is_canonical INTEGER NOT NULL,
+    text TEXT,
+    UNIQUE (topic, tweet_id, created_at)
+);
+CREATE INDEX IF NOT EXISTS tweets_time ON tweets (created_at);
+CREATE INDEX IF NOT EXISTS tweets_region_time ON tweets (region, created_at);
+CREATE INDEX IF NOT EXISTS tweets_topic_time ON tweets (topic, created_at);
+
+CREATE TABLE IF NOT EXISTS daily_rollups (
+    topic TEXT NOT NULL,
+    day TEXT NOT NULL,
+    region TEXT NOT NULL,
+    is_canonical INTEGER NOT NULL,
+    tweets INTEGER NOT NULL,
+    positive INTEGER NOT NULL,
+    negative INTEGER NOT NULL,
+    neutral INTEGER NOT NULL,
+    score_sum REAL NOT NULL,
+    engagement INTEGER NOT NULL,
+    PRIMARY KEY (topic, day, region, is_canonical)
+);
+CREATE INDEX IF NOT EXISTS rollups_region_day ON daily_rollups (region, day);
+"""
+
+TWEET_COLUMNS = ("topic", "tweet_id", "created_at", "day", "region", "user_id", "user_followers_count",
+                 "sentiment_type", "sentiment_score", "retweet_count", "favorite_count", "reply_count",
+                 "is_canonical", "text")
+
+# Positive, negative and neutral counts of the selected tweets
+SENTIMENT_TOTALS = (f"TOTAL(sentiment_type = {POSITIVE}), TOTAL(sentiment_type = {NEGATIVE}), "
+                    f"TOTAL(sentiment_type = {NEUTRAL})")
+
+# Rolls the new (not yet stored) staged tweets into daily_rollups
+ROLLUP_STAGED = f"""
+INSERT INTO daily_rollups
+SELECT s.topic, s.day, s.region, s.is_canonical, COUNT(*),
+       SUM(s.sentiment_type = {POSITIVE}), SUM(s.sentiment_type = {NEGATIVE}), SUM(s.sentiment_type = {NEUTRAL}),
+       SUM(s.sentiment_score), SUM(s.retweet_count + s.favorite_count + s.reply_count)
+FROM staged s
+WHERE NOT EXISTS (SELECT 1 FROM tweets t
+                  WHERE t.topic = s.topic AND t.tweet_id = s.tweet_id AND t.created_at = s.created_at)
+GROUP BY s.topic, s.day, s.region, s.is_canonical
+ON CONFLICT (topic, day, region, is_canonical) DO UPDATE SET
+    tweets = tweets + excluded.tweets,
+    positive = positive + excluded.positive,
+    negative = negative + excluded.negative,
+    neutral = neutral + excluded.neutral,
+    score_sum = score_sum + excluded.score_sum,
+    engagement = engagement + excluded.engagement
+"""
+
+
+def _is_day(value):
+    return value is None or len(value) == 10
+
+
+class TweetStore:
+    """SQLite-backed history of scored tweets with indexed window queries
+
+    path=":memory:" keeps everything in process (useful for tests); any
+    other path persists across runs. Queries take unique=True to count only
+    canonical tweets (one per duplicate group), as count_mode="unique" does.
+    """
+
+    def __init__(self, path=":memory:", batch_size=5000, keep_text=False):
+        self.path = path
+        self.batch_size = batch_size
+        self.keep_text = keep_text
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript(SCHEMA)
+        self.connection.execute(f"CREATE TEMP TABLE IF NOT EXISTS staged ({', '.join(TWEET_COLUMNS)}, "
+                                "UNIQUE (topic, tweet_id, created_at))")
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _row(self, tweet, topic):
+        created_at = utc_created_at(tweet["created_at"])
+        user_id = tweet.get("user_id")
+        return (
+            topic, tweet.get("id"), created_at, created_at[:10],
+            tweet.get("user_location", UNKNOWN_LOCATION),
+            None if user_id is None else str(user_id),
+            tweet.get("user_followers_count"),
+            SENTIMENT_CODES.encode(tweet.get("sentiment_type")),
+            tweet.get("sentiment_score", 0.0),
+            tweet.get("retweet_count", 0), tweet.get("favorite_count", 0), tweet.get("reply_count", 0),
+            1 if tweet.get("is_canonical", True) else 0,
+            tweet["text"] if self.keep_text else None
+        )
+
+    def append(self, tweets, topic=""):
+        """Store scored tweets under topic and update the rollups; returns rows added"""
+        placeholders = ", ".join("?" * len(TWEET_COLUMNS))
+        added = 0
+        for start in range(0, len(tweets), self.batch_size):
+            rows = [self._row(tweet, topic) for tweet in tweets[start:start + self.batch_size]]
+            with self.connection:
+                self.connection.executemany(f"INSERT OR IGNORE INTO staged VALUES ({placeholders})", rows)
+                self.connection.execute(ROLLUP_STAGED)
+                added += self.connection.execute("INSERT OR IGNORE INTO tweets SELECT * FROM staged").rowcount
+                self.connection.execute("DELETE FROM staged")
+        logger.info("Stored {} of {} tweets under topic '{}'", added, len(tweets), topic)
+        if added < len(tweets) / 2:
+            logger.warning("Skipped {} of {} tweets already stored under topic '{}' (same id and created_at)",
+                           len(tweets) - added, len(tweets), topic)
+        return added
+
+    def _where(self, topic, since, until, unique=False, time_column="created_at"):
+        """WHERE clause and parameters for a topic and [since, until) window"""
+        clauses = ["topic = ?"]
+        params = [topic]
+        if since:
+            clauses.append(f"{time_column} >= ?")
+            params.append(since)
+        if until:
+            clauses.append(f"{time_column} < ?")
+            params.append(until)
+        if unique:
+            clauses.append("is_canonical")
+        return " AND ".join(clauses), params
+
+    def topics(self):
+        return [row[0] for row in self.connection.execute("SELECT DISTINCT topic FROM daily_rollups ORDER BY topic")]
+
+    def count(self, topic="", since=None, until=None):
+        where, params = self._where(topic, since, until)
+        return self.connection.execute(f"SELECT COUNT(*) FROM tweets WHERE {where}", params).fetchone()[0]
+
+    def totals(self, topic="", since=None, until=None, unique=False, default_followers=500):
+        """Tweet, sentiment, engagement, reach and distinct-author totals for a window"""
+        where, params = self._where(topic, since, until, unique)
+        row = self.connection.execute(f"""
+            SELECT COUNT(*), {SENTIMENT_TOTALS},
+                   TOTAL(sentiment_score), TOTAL(retweet_count + favorite_count + reply_count),
+                   TOTAL(COALESCE(user_followers_count, ?)), COUNT(DISTINCT user_id)
+            FROM tweets WHERE {where}""", [default_followers] + params).fetchone()
+        keys = ("tweets", "positive", "negative", "neutral", "scoreSum", "engagement", "followers", "distinctAuthors")
+        return dict(zip(keys, (int(v) if k != "scoreSum" else v for k, v in zip(keys, row))))
+
+    def positive_halves(self, topic="", since=None, until=None, unique=False):
+        """(tweets, positives) in the first and second half of the window's tweets, in time order"""
+        where, params = self._where(topic, since, until, unique)
+        row = self.connection.execute(f"""
+            WITH ordered AS (
+                SELECT sentiment_type = {POSITIVE} AS positive,
+                       ROW_NUMBER() OVER (ORDER BY created_at, rowid) AS n, COUNT(*) OVER () AS total
+                FROM tweets WHERE {where})
+            SELECT TOTAL(n <= total / 2), TOTAL(positive AND n <= total / 2),
+                   TOTAL(n > total / 2), TOTAL(positive AND n > total / 2)
+            FROM ordered""", params).fetchone()
+        return (int(row[0]), int(row[1])), (int(row[2]), int(row[3]))
+
+    def positive_split(self, split_at, topic="", since=None, until=None, unique=False):
+        """(tweets, positives) before and from split_at (an ISO timestamp) within the window"""
+        where, params = self._where(topic, since, until, unique)
+        row = self.connection.execute(f"""
+            SELECT TOTAL(created_at < ?), TOTAL(sentiment_type = {POSITIVE} AND created_at < ?),
+                   TOTAL(created_at >= ?), TOTAL(sentiment_type = {POSITIVE} AND created_at >= ?)
+            FROM tweets WHERE {where}""", [split_at] * 4 + params).fetchone()
+        return (int(row[0]), int(row[1])), (int(row[2]), int(row[3]))
+
+    def _grouped(self, key, topic, since, until, unique):
+        """(key, positive, negative, neutral, distinct authors) rows grouped by day or region
+
+        Sentiment counts come from daily_rollups when the window is whole
+        days, otherwise from the tweets table; distinct authors always come
+        from the tweets index.
+        """
+        if _is_day(since) and _is_day(until):
+            where, params = self._where(topic, since, until, unique, time_column="day")
+            counts = self.connection.execute(f"""
+                SELECT {key}, SUM(positive), SUM(negative), SUM(neutral)
+                FROM daily_rollups WHERE {where} GROUP BY {key}""", params).fetchall()
+        else:
+            where, params = self._where(topic, since, until, unique)
+            counts = self.connection.execute(f"""
+                SELECT {key}, {SENTIMENT_TOTALS}
+                FROM tweets WHERE {where} GROUP BY {key}""", params).fetchall()
+
+        where, params = self._where(topic, since, until, unique)
+        authors = {value: (count, first) for value, count, first in self.connection.execute(
+            f"SELECT {key}, COUNT(DISTINCT user_id), MIN(rowid) FROM tweets WHERE {where} GROUP BY {key}", params)}
+        rows = [(value, int(positive), int(negative), int(neutral), authors.get(value, (0, 0))[0])
+                for value, positive, negative, neutral in sorted(counts)]
+        if key == "region":
+            # First-seen order, as the in-memory aggregation lists locations
+            rows.sort(key=lambda row: authors.get(row[0], (0, 0))[1])
+        return rows
+
+    def by_day(self, topic="", since=None, until=None, unique=False):
+        """Rows per day, in date order"""
+        return self._grouped("day", topic, since, until, unique)
+
+    def by_region(self, topic="", since=None, until=None, unique=False):
+        """Rows per region, in the order each region was first stored"""
+        return self._grouped("region", topic, since, until, unique)
+
+    def explain(self, sql, params=()):
+        """SQLite's query plan, e.g. to confirm a window query uses an index"""
+        return [row[-1] for row in self.connection.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
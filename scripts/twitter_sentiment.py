@@ -1,16 +1,17 @@
 import json
 import random
 from datetime import datetime, timedelta
-import matplotlib.pyplot as plt
-import numpy as np
-from textblob import TextBlob
+from . import lexicon
+from .sentiment_logging import configure_logging, get_logger
+
+logger = get_logger(__name__)
 
 # This is a simulation script since we can't actually connect to Twitter API in this environment
 # In a real application, you would use Tweepy to connect to the Twitter API
 
 def simulate_twitter_data(query, count=100, days=7):
     """Simulate Twitter data for a given query"""
-    print(f"Simulating Twitter data for query: {query}")
+    logger.info("Simulating Twitter data for query: {}", query)
     
     # Generate random dates within the last N days
     end_date = datetime.now()
@@ -76,7 +77,7 @@ def simulate_twitter_data(query, count=100, days=7):
 
 def analyze_sentiment(tweets):
     """Analyze sentiment of tweets using TextBlob"""
-    print("Analyzing sentiment of tweets...")
+    logger.info("Analyzing sentiment of tweets...")
     
     for tweet in tweets:
         # In a real app, we would use TextBlob to analyze sentiment
@@ -90,9 +91,13 @@ def analyze_sentiment(tweets):
     
     return tweets
 
-def generate_sentiment_timeline(tweets):
-    """Generate sentiment timeline data"""
-    print("Generating sentiment timeline...")
+def generate_sentiment_timeline(tweets, unique_only=False):
+    """Generate sentiment timeline data (unique_only counts one tweet per duplicate group)"""
+    logger.info("Generating sentiment timeline...")
+    
+    if unique_only:
+        from .dedup import unique_voices
+        tweets = unique_voices(tweets)
     
     # Group tweets by day
     tweets_by_day = {}
@@ -119,9 +124,13 @@ def generate_sentiment_timeline(tweets):
     
     return timeline_data
 
-def generate_wordcloud_data(tweets):
-    """Generate word cloud data"""
-    print("Generating word cloud data...")
+def generate_wordcloud_data(tweets, unique_only=False):
+    """Generate word cloud data (unique_only counts one tweet per duplicate group)"""
+    logger.info("Generating word cloud data...")
+    
+    if unique_only:
+        from .dedup import unique_voices
+        tweets = unique_voices(tweets)
     
     # Extract words from tweets
     all_words = []
@@ -173,7 +182,7 @@ def generate_wordcloud_data(tweets):
 
 def generate_region_data(tweets):
     """Generate region-based sentiment data"""
-    print("Generating region data...")
+    logger.info("Generating region data...")
     
     # Group tweets by location
     tweets_by_location = {}
@@ -204,49 +213,21 @@ def generate_region_data(tweets):
 
 def get_state_name(state_code):
     """Convert state code to full name"""
-    state_names = {
-        "CA": "California",
-        "TX": "Texas",
-        "FL": "Florida",
-        "NY": "New York",
-        "PA": "Pennsylvania",
-        "IL": "Illinois",
-        "OH": "Ohio",
-        "GA": "Georgia",
-        "NC": "North Carolina",
-        "MI": "Michigan"
-    }
-    return state_names.get(state_code, state_code)
+    return lexicon.get_state_name(state_code, lexicon.SIMULATED_STATE_NAMES)
 
-def visualize_sentiment(tweets):
-    """Create a simple visualization of sentiment distribution"""
-    sentiments = [tweet["sentiment_score"] for tweet in tweets]
-    
-    plt.figure(figsize=(10, 6))
-    plt.hist(sentiments, bins=20, color='skyblue', edgecolor='black')
-    plt.title('Sentiment Distribution')
-    plt.xlabel('Sentiment Score (-1 to 1)')
-    plt.ylabel('Frequency')
-    plt.grid(True, alpha=0.3)
+def visualize_sentiment(tweets, path="sentiment_distribution.png", renderer=None):
+    """Render the sentiment distribution to an image file (headless)"""
+    from .plotting import ChartRenderer, score_histogram
     
-    # Calculate statistics
-    mean_sentiment = np.mean(sentiments)
-    median_sentiment = np.median(sentiments)
+    renderer = renderer or ChartRenderer()
     
-    # Add vertical lines for mean and median
-    plt.axvline(mean_sentiment, color='red', linestyle='dashed', linewidth=1, label=f'Mean: {mean_sentiment:.2f}')
-    plt.axvline(median_sentiment, color='green', linestyle='dashed', linewidth=1, label=f'Median: {median_sentiment:.2f}')
-    
-    plt.legend()
-    plt.tight_layout()
-    
-    # In a real app, we would save this to a file
-    # plt.savefig('sentiment_distribution.png')
-    
-    # For this demo, we'll just display the plot
-    plt.show()
+    # Plot from histogram bins rather than the raw score list
+    histogram = score_histogram(tweets, bins=20)
+    return renderer.render_distribution(histogram, path)
 
 def main():
+    configure_logging()
+    
     query = "climate policy"  # Example query
     
     # Simulate Twitter data
@@ -275,7 +256,8 @@ def main():
     
     # Visualize sentiment distribution
     try:
-        visualize_sentiment(analyzed_tweets)
+        path = visualize_sentiment(analyzed_tweets)
+        print(f"\nSaved sentiment distribution to {path}")
     except Exception as e:
         print(f"Could not create visualization: {e}")
     
@@ -1,58 +1,15 @@
 import json
 import random
 from datetime import datetime, timedelta
-import matplotlib.pyplot as plt
-import numpy as np
+from .lexicon import URDU_KEYWORDS
+from .sentiment_logging import configure_logging, get_logger
+
+logger = get_logger(__name__)
 
 def generate_urdu_keywords():
     """Generate Urdu keywords that were popular during 9th May 2023"""
     
-    urdu_keywords = {
-        # Political terms
-        "عمران خان": {"sentiment": "positive", "frequency": 12500},
-        "پی ٹی آئی": {"sentiment": "positive", "frequency": 8900},
-        "نو مئی": {"sentiment": "negative", "frequency": 15200},
-        "گرفتاری": {"sentiment": "negative", "frequency": 7800},
-        "انصاف": {"sentiment": "positive", "frequency": 5200},
-        
-        # Violence related
-        "تشدد": {"sentiment": "negative", "frequency": 9800},
-        "توڑ پھوڑ": {"sentiment": "negative", "frequency": 4500},
-        "حملہ": {"sentiment": "negative", "frequency": 6200},
-        "افراتفری": {"sentiment": "negative", "frequency": 3800},
-        "انتہا پسندی": {"sentiment": "negative", "frequency": 4200},
-        
-        # Locations
-        "لاہور": {"sentiment": "neutral", "frequency": 6800},
-        "اسلام آباد": {"sentiment": "neutral", "frequency": 5500},
-        "کراچی": {"sentiment": "neutral", "frequency": 4200},
-        "پاکستان": {"sentiment": "neutral", "frequency": 8900},
-        
-        # Support/Opposition
-        "حامی": {"sentiment": "positive", "frequency": 3500},
-        "مخالف": {"sentiment": "negative", "frequency": 2800},
-        "احتجاج": {"sentiment": "neutral", "frequency": 5800},
-        "مظاہرہ": {"sentiment": "neutral", "frequency": 4200},
-        
-        # Government/Military
-        "فوج": {"sentiment": "negative", "frequency": 4800},
-        "حکومت": {"sentiment": "negative", "frequency": 5200},
-        "عدالت": {"sentiment": "neutral", "frequency": 3800},
-        "پولیس": {"sentiment": "negative", "frequency": 4500},
-        
-        # Emotions/Reactions
-        "غصہ": {"sentiment": "negative", "frequency": 3200},
-        "خوشی": {"sentiment": "positive", "frequency": 2100},
-        "غم": {"sentiment": "negative", "frequency": 2800},
-        "امید": {"sentiment": "positive", "frequency": 2500},
-        "ڈر": {"sentiment": "negative", "frequency": 3500},
-        
-        # Democratic terms
-        "جمہوریت": {"sentiment": "positive", "frequency": 3800},
-        "آزادی": {"sentiment": "positive", "frequency": 3200},
-        "حقوق": {"sentiment": "positive", "frequency": 2800},
-        "قانون": {"sentiment": "neutral", "frequency": 3500},
-    }
+    urdu_keywords = {word: dict(data) for word, data in URDU_KEYWORDS.items()}
     
     return urdu_keywords
 
@@ -61,9 +18,9 @@ def analyze_urdu_sentiment_patterns():
     
     keywords = generate_urdu_keywords()
     
-    print("=== اردو کلیدی الفاظ کا جذباتی تجزیہ - ۹ مئی ۲۰۲۳ ===")
-    print("Urdu Keywords Sentiment Analysis - 9th May 2023")
-    print("=" * 60)
+    logger.info("=== اردو کلیدی الفاظ کا جذباتی تجزیہ - ۹ مئی ۲۰۲۳ ===")
+    logger.info("Urdu Keywords Sentiment Analysis - 9th May 2023")
+    logger.info("=" * 60)
     
     # Categorize by sentiment
     positive_words = []
@@ -83,17 +40,17 @@ def analyze_urdu_sentiment_patterns():
     negative_words.sort(key=lambda x: x[1], reverse=True)
     neutral_words.sort(key=lambda x: x[1], reverse=True)
     
-    print("\n🟢 مثبت جذبات (Positive Sentiment):")
+    logger.info("\n🟢 مثبت جذبات (Positive Sentiment):")
     for word, freq in positive_words[:5]:
-        print(f"   {word}: {freq:,} mentions")
+        logger.info("   {}: {:,} mentions", word, freq)
     
-    print("\n🔴 منفی جذبات (Negative Sentiment):")
+    logger.info("\n🔴 منفی جذبات (Negative Sentiment):")
     for word, freq in negative_words[:5]:
-        print(f"   {word}: {freq:,} mentions")
+        logger.info("   {}: {:,} mentions", word, freq)
     
-    print("\n⚪ غیر جانبدار (Neutral Sentiment):")
+    logger.info("\n⚪ غیر جانبدار (Neutral Sentiment):")
     for word, freq in neutral_words[:5]:
-        print(f"   {word}: {freq:,} mentions")
+        logger.info("   {}: {:,} mentions", word, freq)
     
     # Calculate overall statistics
     total_positive = sum(data["frequency"] for data in keywords.values() if data["sentiment"] == "positive")
@@ -101,10 +58,10 @@ def analyze_urdu_sentiment_patterns():
     total_neutral = sum(data["frequency"] for data in keywords.values() if data["sentiment"] == "neutral")
     total_all = total_positive + total_negative + total_neutral
     
-    print(f"\n📊 مجموعی اعداد و شمار (Overall Statistics):")
-    print(f"   مثبت الفاظ (Positive): {total_positive:,} ({total_positive/total_all*100:.1f}%)")
-    print(f"   منفی الفاظ (Negative): {total_negative:,} ({total_negative/total_all*100:.1f}%)")
-    print(f"   غیر جانبدار الفاظ (Neutral): {total_neutral:,} ({total_neutral/total_all*100:.1f}%)")
+    logger.info("\n📊 مجموعی اعداد و شمار (Overall Statistics):")
+    logger.info("   مثبت الفاظ (Positive): {:,} ({:.1f}%)", total_positive, total_positive/total_all*100)
+    logger.info("   منفی الفاظ (Negative): {:,} ({:.1f}%)", total_negative, total_negative/total_all*100)
+    logger.info("   غیر جانبدار الفاظ (Neutral): {:,} ({:.1f}%)", total_neutral, total_neutral/total_all*100)
     
     return keywords
 
@@ -124,9 +81,9 @@ def generate_hashtag_combinations():
         "#جمہوریت OR #Democracy"
     ]
     
-    print("\n🔍 مقبول ہیش ٹیگ امتزاج (Popular Hashtag Combinations):")
+    logger.info("\n🔍 مقبول ہیش ٹیگ امتزاج (Popular Hashtag Combinations):")
     for i, combo in enumerate(hashtag_combinations, 1):
-        print(f"   {i}. {combo}")
+        logger.info("   {}. {}", i, combo)
     
     return hashtag_combinations
 
@@ -145,15 +102,15 @@ def simulate_hourly_urdu_trends():
         "پی ٹی آئی": [250, 350, 450, 650, 900, 800, 650, 500, 400]
     }
     
-    print(f"\n⏰ گھنٹہ وار رجحانات - ۹ مئی (Hourly Trends - May 9th):")
-    print("=" * 50)
+    logger.info("\n⏰ گھنٹہ وار رجحانات - ۹ مئی (Hourly Trends - May 9th):")
+    logger.info("=" * 50)
     
     for hour_urdu, hour_eng in zip(hours, english_hours):
-        print(f"\n{hour_urdu} ({hour_eng}):")
+        logger.info("\n{} ({}):", hour_urdu, hour_eng)
         hour_index = english_hours.index(hour_eng)
         
         for term, values in urdu_trends.items():
-            print(f"   {term}: {values[hour_index]:,} mentions")
+            logger.info("   {}: {:,} mentions", term, values[hour_index])
     
     return urdu_trends
 
@@ -188,17 +145,19 @@ def create_search_query_examples():
         }
     ]
     
-    print(f"\n🔍 تجویز کردہ تلاش کی مثالیں (Suggested Search Examples):")
-    print("=" * 60)
+    logger.info("\n🔍 تجویز کردہ تلاش کی مثالیں (Suggested Search Examples):")
+    logger.info("=" * 60)
     
     for i, example in enumerate(search_examples, 1):
-        print(f"\n{i}. {example['description']}")
-        print(f"   Query: {example['query']}")
-        print(f"   Date Range: {example['date_range']}")
+        logger.info("\n{}. {}", i, example['description'])
+        logger.info("   Query: {}", example['query'])
+        logger.info("   Date Range: {}", example['date_range'])
     
     return search_examples
 
 def main():
+    configure_logging()
+    
     print("🇵🇰 Pakistan Social Media Sentiment Analysis - Urdu Keywords")
     print("=" * 70)
     